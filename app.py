@@ -1,18 +1,98 @@
+import os
+import re
+
 import streamlit as st
-import pandas as pd
-from report_parser import parse_report
+from background import ParsePool
+from export import FORMATS
+from frames import footprint, human, object_frame
+from incremental import ParseState
+from parse_cache import ParseCache
+from profiling import Profile
+from reextract import Reextraction
+from store import SqliteDataset
+from study_import import import_sheet
+
+# Datensätze liegen als SQLite-Dateien hier (überstehen Neuladen und Neustart)
+DATA_DIR = os.environ.get("ECHO_DATA_DIR", "data")
+PAGE_SIZES = [100, 500, 1000]
+# so viele neu zu parsende Briefe werden direkt im Klick erledigt (z.B. Korrektur im Text)
+SYNC_LETTERS = 3
 
 st.set_page_config(page_title="Echo Extractor — Paste & Parse", layout="wide")
 st.title("🫀 Echo Extractor — Paste & Parse")
 
-# Session-DF initialisieren
-if "df" not in st.session_state:
-    st.session_state.df = pd.DataFrame()
+@st.cache_resource
+def parse_cache():
+    # prozessweit geteilt; ECHO_PARSE_CACHE=pfad.db aktiviert zusätzlich den Platten-Cache
+    return ParseCache(max_items=512, path=os.environ.get("ECHO_PARSE_CACHE"))
+
+@st.cache_resource
+def parse_pool():
+    # ein Worker-Pool für alle Sitzungen; ECHO_PARSE_WORKERS=n legt die Prozesszahl fest
+    workers = os.environ.get("ECHO_PARSE_WORKERS")
+    return ParsePool(int(workers) if workers else None, cache=parse_cache())
+
+@st.cache_resource
+def open_dataset(name):
+    # eine Verbindung pro Datensatz-Datei, von allen Sitzungen geteilt
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return SqliteDataset(os.path.join(DATA_DIR, name + ".db"))
+
+if "jobs" not in st.session_state:
+    st.session_state.jobs = []  # laufende Hintergrund-Jobs: (ParseJob, overwrite, Datensatz)
+    st.session_state.notices = []  # Meldungen abgeschlossener Jobs bis zum nächsten Einfügen
+    st.session_state.reextract = None  # Neu-Extraktion aus dem Quellarchiv (reextract.Reextraction)
+
+def busy():
+    job = st.session_state.reextract
+    return bool(st.session_state.jobs) or (job is not None and not job.finished)
 
 with st.sidebar:
     st.header("⚙️ Optionen")
+    name = st.text_input("Datensatz", value="echo_dataset", help=f"SQLite-Datei in {DATA_DIR}/")
+    dataset = open_dataset(re.sub(r"[^\w-]", "_", name.strip()) or "echo_dataset")
     overwrite = st.checkbox("Vorhandene Zellen überschreiben", value=False)
     st.caption("Wenn aus: nur leere Zellen werden befüllt.")
+    if st.button("👥 Duplikate zusammenführen", help="Zeilen desselben Patienten vereinen "
+                 "(Müller/Mueller, fehlendes Geburtsdatum, gleiche AufnahmeNr)"):
+        st.info(f"{dataset.dedup(overwrite)} doppelte Zeile(n) zusammengeführt.")
+    with st.expander("📥 Studienblatt importieren"):
+        # bestehendes Blatt (CSV/XLSX) blockweise übernehmen; nur beim Klick, nicht bei jedem Rerun
+        sheet = st.file_uploader("CSV oder XLSX mit den Kopfzeilen des Studienblatts", type=["csv", "xlsx"])
+        if sheet is not None and st.button("Importieren"):
+            imported = st.session_state.setdefault("imported", set())
+            if (dataset.path, sheet.file_id) in imported:
+                st.info("Dieses Blatt wurde schon importiert.")
+            else:
+                bar = st.progress(0.0, text="Import läuft …")
+                try:
+                    report = import_sheet(dataset, sheet, overwrite=overwrite,
+                                          progress=lambda n: bar.progress(0.0, text=f"{n} Zeilen übernommen …"))
+                except (ValueError, RuntimeError) as e:
+                    st.error(str(e))
+                else:
+                    imported.add((dataset.path, sheet.file_id))
+                    bar.progress(1.0, text=f"{report['rows']} Zeilen, {report['columns']} Spalten übernommen")
+                    if report["unmapped"]:
+                        st.caption("Nicht zugeordnet: " + ", ".join(report["unmapped"]))
+    with st.expander("🗄️ Quellarchiv"):
+        # Brieftexte liegen komprimiert im Datensatz; nach Regeländerungen neu extrahieren
+        arch = dataset.archive_stats()
+        st.caption(f"{arch['letters']} Briefe, {human(arch['chars'])} Text in {human(arch['bytes'])}; "
+                   f"{arch['stale']} mit älterer Regelversion")
+        if arch["stale"] and not busy() and st.button("🔁 Neu extrahieren", help="geänderte Zellen werden "
+                                                       "zurückgeschrieben, von Hand korrigierte bleiben"):
+            workers = os.environ.get("ECHO_PARSE_WORKERS")
+            st.session_state.reextract = Reextraction(dataset, int(workers) if workers else None).start()
+    profiling = st.checkbox("Profiling (Zeit pro Extraktor)", value=False)
+    if profiling:
+        profile = st.session_state.setdefault("profile", Profile())
+        with st.expander("⏱️ Extraktor-Profil", expanded=True):
+            st.caption(f"{profile.documents} Dokumente geparst, {profile.cache_hits} aus dem Cache")
+            if profile.stats:
+                st.dataframe(profile.table(), use_container_width=True, hide_index=True)
+            if st.button("Profil zurücksetzen"):
+                st.session_state.profile = Profile()
 
 st.subheader("1) Arztbrief/Freitext hier einfügen")
 text = st.text_area(
@@ -27,38 +107,124 @@ with col_a:
         if not text.strip():
             st.warning("Bitte zuerst Text einfügen.")
         else:
-            parsed = parse_report(text)
-
-            # in bestehende Tabelle einfügen (Upsert)
-            key = f"{parsed.get('surname','')}|{parsed.get('first name','')}|{parsed.get('DOB','')}"
-            if key.strip("|") == "":
-                # Fallback-Key, falls Name/DOB nicht erkannt
-                key = f"row_{len(st.session_state.df)+1}"
-            if key in st.session_state.df.index:
-                for col, val in parsed.items():
-                    if overwrite or pd.isna(st.session_state.df.loc[key, col]) or st.session_state.df.loc[key, col] == "":
-                        st.session_state.df.loc[key, col] = val
+            # ein Eintrag pro erkanntem Dokument (Patientenkopf / geb. / AufnahmeNr),
+            # Upsert über Nachname|Vorname|DOB. Geparst wird im Hintergrund-Pool;
+            # die Zeilen kommen unten Brief für Brief in die Tabelle. Nach einer kleinen
+            # Korrektur im Text parst ParseState nur die geänderten Briefe/Abschnitte neu.
+            state = st.session_state.setdefault("parse_state", ParseState(cache=parse_cache()))
+            before = state.stats["parsed"]
+            # Brieftexte kommen ins Quellarchiv des Datensatzes (für die Neu-Extraktion)
+            letters = None if profiling else state.update(text, limit=SYNC_LETTERS, by_letter=True)
+            if letters is not None:
+                dataset.upsert_letters(letters, overwrite)
+                st.session_state.notices = [("success", f"✅ {len(letters)} Brief(e) eingefügt "
+                                                        f"({state.stats['parsed'] - before} neu analysiert)")]
             else:
-                row = pd.DataFrame([parsed])
-                row.index = [key]
-                st.session_state.df = pd.concat([st.session_state.df, row], axis=0)
-            st.success("✅ Eingefügt")
+                job = parse_pool().submit(text, profile=profiling)
+                st.session_state.jobs.append((job, overwrite, dataset))
+                st.session_state.notices = []
 
 with col_b:
     if st.button("🧹 Tabelle leeren", use_container_width=True):
-        st.session_state.df = pd.DataFrame()
+        for job, _, _ in st.session_state.jobs:
+            job.cancel()
+        st.session_state.jobs = []
+        dataset.clear()
         st.info("Tabelle geleert.")
 
-st.subheader("2) Ergebnis-Tabelle (editierbar)")
-st.caption("Du kannst hier manuell korrigieren. Mit dem Download-Button exportierst du alles als CSV.")
-st.dataframe(st.session_state.df, use_container_width=True)
+def collect_jobs():
+    # fertige Zeilen übernehmen, Fortschritt anzeigen; -> True, solange noch Jobs laufen
+    running = []
+    for job, job_overwrite, target in st.session_state.jobs:
+        letters = job.take_letters()
+        if letters:
+            target.upsert_letters(letters, job_overwrite)
+        if not job.finished:
+            done, total = job.progress()
+            st.progress(done / total, text=f"{done}/{total} Briefe analysiert")
+            if st.button("⏹️ Abbrechen", key=f"cancel_{id(job)}"):
+                job.cancel()
+            running.append((job, job_overwrite, target))
+            continue
+        if job.profile is not None:
+            st.session_state.setdefault("profile", Profile()).merge(job.profile)
+        notices = st.session_state.notices
+        notices.extend(("warning", f"Brief {nr}: {err}") for nr, err in job.errors)
+        done, total = job.progress()
+        if job.cancelled:
+            notices.append(("info", f"Abgebrochen – {done}/{total} Briefe eingefügt."))
+        else:
+            notices.append(("success", f"✅ {total} Brief(e) eingefügt"))
+    st.session_state.jobs = running
+    for kind, msg in st.session_state.notices:
+        getattr(st, kind)(msg)
+    return bool(running)
 
-st.download_button(
-    "⬇️ Download CSV",
-    st.session_state.df.to_csv(index=False).encode("utf-8"),
-    file_name="echo_dataset.csv",
-    mime="text/csv"
-)
+def reextract_status():
+    # Fortschritt bzw. Änderungsbericht der Neu-Extraktion
+    job = st.session_state.reextract
+    if job is None:
+        return
+    done, total = job.progress()
+    if not job.finished:
+        st.progress(done / max(total, 1), text=f"Neu-Extraktion: {done}/{total} Briefe")
+        if st.button("⏹️ Neu-Extraktion abbrechen"):
+            job.cancel()
+        return
+    with st.expander(f"🔁 Neu-Extraktion: {done} Briefe in {job.seconds:.0f} s, {job.rows} Zeilen geändert",
+                     expanded=True):
+        for h, err in job.errors[:20]:
+            st.warning(f"{h[:12]}: {err}")
+        report = job.report()
+        if report:
+            st.table({"Spalte": [cid for cid, *_ in report], "geändert": [c for _, _, c, _ in report],
+                      "übersprungen (von Hand / anderer Brief)": [k for *_, k in report]})
+        else:
+            st.caption("Keine Zelle hat sich geändert.")
+        if st.button("Bericht schließen"):
+            st.session_state.reextract = None
+
+def results():
+    st.subheader("2) Ergebnis-Tabelle (editierbar)")
+    st.caption("Du kannst hier manuell korrigieren. Mit dem Download-Button exportierst du alles als CSV, Parquet oder XLSX.")
+    was_running = busy()
+    collect_jobs()
+    reextract_status()
+    still_running = busy()
+    # seitenweise aus SQLite – auch bei 100k+ Zeilen wird nur eine Seite geladen
+    total = len(dataset)
+    c1, c2 = st.columns([1, 3])
+    size = c1.selectbox("Zeilen pro Seite", PAGE_SIZES)
+    pages = max(1, -(-total // size))
+    page = c2.number_input(f"Seite (von {pages}, {total} Zeilen)", min_value=1, max_value=pages, value=1)
+    frame = dataset.page_frame((page - 1) * size, size)
+    st.dataframe(frame, use_container_width=True)
+    # Spalten sind typisiert (frames.py: Int8, float32, datetime64, category statt object)
+    with st.expander("📏 Speicherbedarf"):
+        st.caption(f"Diese Seite: {human(sum(footprint(frame).values()))}")
+        if st.button("Ganzen Datensatz messen"):
+            usage = footprint(dataset.to_frame())
+            before = object_frame(dataset.keys, dataset.columns()).memory_usage(deep=True).sum()
+            st.caption(f"{total} Zeilen: {human(sum(usage.values()))} typisiert, {human(before)} als object")
+            st.table({"Typ": list(usage), "Speicher": [human(n) for n in usage.values()]})
+
+    # Export wird nur für das gewählte Format erzeugt und bis zur nächsten Änderung gecacht
+    fmt = st.radio("Format", list(FORMATS), horizontal=True, format_func=str.upper)
+    suffix, mime = FORMATS[fmt]
+    try:
+        st.download_button(
+            f"⬇️ Download {fmt.upper()}",
+            dataset.export(fmt),
+            file_name="echo_dataset" + suffix,
+            mime=mime
+        )
+    except RuntimeError as e:  # pyarrow / openpyxl fehlt
+        st.warning(str(e))
+    if was_running and not still_running:
+        st.rerun()  # ganze Seite neu: Abfrage-Intervall aus, Profil in der Sidebar aktuell
+
+# nur der Ergebnisbereich wird abgefragt, solange Jobs laufen – Eingaben bleiben bedienbar
+st.fragment(run_every=0.5 if busy() else None)(results)()
 
 st.divider()
 st.caption("Tipp: Du kannst beliebig viele Texte hintereinander einfügen und jeweils auf **Analysieren & einfügen** klicken.")
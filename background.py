@@ -0,0 +1,161 @@
+# background.py
+# Hintergrund-Parsing für die App. Ein ParsePool (Prozess-Pool, in app.py per
+# st.cache_resource von allen Sitzungen geteilt) nimmt pro Einfügen einen ParseJob
+# mit einem Auftrag pro Brief an. Die Seite fragt den Fortschritt ab, übernimmt
+# fertige Zeilen schrittweise (take) und kann den Rest abbrechen (cancel).
+#
+# Die Briefe werden reihum über alle offenen Jobs verteilt: ein großer Einfügevorgang
+# einer Sitzung hält die Briefe der anderen Sitzungen nicht auf.
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bulk_extract import parse_chunk
+from parse_cache import normalize
+from profiling import Profile
+from segmenter import segment
+
+def split_letters(text):
+    # -> Texte der einzelnen Briefe (gleiche Trennung wie parse_reports)
+    text = normalize(text)
+    if not text:
+        return []
+    return [normalize(text[d.start:d.end]) for d in segment(text)]
+
+class ParseJob:
+    def __init__(self, total, profile=False):
+        self.total = total
+        self.letters = []         # Brieftexte in Reihenfolge (für take_letters)
+        self.profile = Profile() if profile else None
+        self.errors = []          # (brief-nr, fehler)
+        self.cancelled = False
+        self._todo = deque()      # (i, text), noch nicht an den Pool gegeben
+        self._running = 0         # im Pool
+        self._results = {}        # i -> [Row]
+        self._next = 0            # erster noch nicht abgeholter Brief
+        self._lock = threading.Lock()
+
+    def _finish(self, i, rows, err=None, prof=None):
+        with self._lock:
+            self._running -= 1
+            self._results[i] = rows
+            if err is not None:
+                self.errors.append((i + 1, err))
+            if prof is not None and self.profile is not None:
+                self.profile.merge(prof)
+
+    def take(self):
+        # fertige Zeilen in Brief-Reihenfolge, jede nur einmal
+        return [r for _, rows in self.take_letters() for r in rows]
+
+    def take_letters(self):
+        # wie take, aber [(brieftext, [Row])] – für das Quellarchiv (store.upsert_letters)
+        out = []
+        with self._lock:
+            while self._next in self._results:
+                out.append((self.letters[self._next], self._results.pop(self._next)))
+                self._next += 1
+        return out
+
+    def progress(self):
+        # -> (fertige Briefe, alle Briefe)
+        with self._lock:
+            return self._next + len(self._results), self.total
+
+    @property
+    def finished(self):
+        with self._lock:
+            if self.cancelled:
+                return not self._running
+            return self._next + len(self._results) >= self.total
+
+    def cancel(self):
+        # noch nicht gestartete Briefe verwerfen; laufende werden noch fertig und abgeholt
+        with self._lock:
+            self.cancelled = True
+            self._todo.clear()
+
+class ParsePool:
+    def __init__(self, workers=None, cache=None):
+        # cache: parse_cache.ParseCache im App-Prozess – Treffer brauchen keinen Worker
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.cache = cache
+        # spawn: der App-Prozess hat schon Threads (Streamlit), fork wäre dort unsicher
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        self._jobs = deque()
+        self._inflight = 0
+        self._wake = threading.Condition()
+        threading.Thread(target=self._dispatch, name="parse-dispatch", daemon=True).start()
+
+    def submit(self, text, profile=False):
+        letters = split_letters(text)
+        job = ParseJob(len(letters), profile)
+        job.letters = letters
+        for i, letter in enumerate(letters):
+            rows = self.cache.get(letter) if self.cache is not None else None
+            if rows is not None:
+                job._results[i] = rows
+                if job.profile is not None:
+                    job.profile.cache_hits += 1
+            else:
+                job._todo.append((i, letter))
+        if job._todo:
+            with self._wake:
+                self._jobs.append(job)
+                self._wake.notify()
+        return job
+
+    def _dispatch(self):
+        # eigener Thread: submit() aus Done-Callbacks heraus vermeiden
+        while True:
+            with self._wake:
+                while not (self._jobs and self._inflight < self.workers):
+                    self._wake.wait()
+                job = self._jobs.popleft()
+                with job._lock:
+                    item = job._todo.popleft() if job._todo else None
+                    more = bool(job._todo)
+                    job._running += item is not None
+                if item is None:
+                    continue
+                if more:
+                    self._jobs.append(job)  # reihum: hinten wieder anstellen
+                self._inflight += 1
+            i, letter = item
+            try:
+                fut = self._executor.submit(parse_chunk, [(i, letter)], profile=job.profile is not None)
+            except Exception as e:  # Pool kaputt / heruntergefahren: Brief als Fehler melden
+                self._release(job, i, [], f"{type(e).__name__}: {e}")
+                continue
+            fut.add_done_callback(lambda f, job=job, i=i, letter=letter: self._done(job, i, letter, f))
+
+    def _done(self, job, i, letter, fut):
+        try:
+            result = fut.result()
+            prof = None
+            if job.profile is not None:
+                result, prof = result
+            rows = [row for _, row, _ in result if row is not None]
+            err = next((e for _, _, e in result if e is not None), None)
+        except Exception as e:  # z.B. abgestürzter Worker-Prozess
+            rows, err, prof = [], f"{type(e).__name__}: {e}", None
+        if err is None and self.cache is not None:
+            self.cache.put(letter, rows)
+        self._release(job, i, rows, err, prof)
+
+    def _release(self, job, i, rows, err=None, prof=None):
+        job._finish(i, rows, err, prof)
+        with self._wake:
+            self._inflight -= 1
+            self._wake.notify()
+
+    def queued(self):
+        # Briefe, die noch auf einen Worker warten (alle Sitzungen)
+        with self._wake:
+            return sum(len(j._todo) for j in self._jobs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
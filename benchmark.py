@@ -0,0 +1,225 @@
+# benchmark.py
+# Durchsatz / Latenz / Speicher / Extraktionsgüte von parse_report auf einem
+# synthetischen Korpus (synthetic_corpus.py) – optional im Vergleich zweier Stände.
+#
+#   python benchmark.py --generate 1000                      # Korpus erzeugen + messen
+#   python benchmark.py corpus.jsonl
+#   python benchmark.py corpus.jsonl --baseline HEAD~3       # git-Revision oder Verzeichnis
+#   python benchmark.py corpus.jsonl --baseline ../alt --json bericht.json
+#
+# Jeder Stand läuft in einem eigenen Prozess (saubere Importe, eigener Speicher).
+# Exitcode 1, wenn im Vergleich ein Feld mehr als --tolerance an F1 verliert
+# oder der Durchsatz unter --max-slowdown fällt.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# ---------- Messung (läuft im Kindprozess) ----------
+def _worker(job_path, out_path):
+    with open(job_path, encoding="utf-8") as f:
+        job = json.load(f)
+    # nur der zu messende Stand darf importiert werden, nicht dieses Verzeichnis
+    sys.path[:] = [job["parser_dir"]] + [p for p in sys.path if p and os.path.abspath(p) != HERE]
+    import resource
+    import tracemalloc
+    t0 = time.perf_counter()
+    import report_parser
+    import_s = time.perf_counter() - t0
+    texts, headers = job["texts"], job["headers"]
+
+    def pick(row):
+        # aktuelle Zeilen: Spalten-IDs; ältere Stände: dict mit Kopfzeilen
+        if "surname" in row and "first name" not in row:
+            return {cid: row.get(cid) for cid in headers}
+        return {cid: row.get(h) for cid, h in headers.items()}
+
+    if texts:
+        report_parser.parse_report(texts[0])  # Aufwärmen
+    preds, lat = [], []
+    t0 = time.perf_counter()
+    for text in texts:
+        s = time.perf_counter()
+        row = report_parser.parse_report(text)
+        lat.append(time.perf_counter() - s)
+        preds.append(pick(row))
+    total_s = time.perf_counter() - t0
+
+    tracemalloc.start()
+    peak = 0
+    for text in texts:
+        tracemalloc.reset_peak()
+        report_parser.parse_report(text)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Linux: KiB
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"import_s": import_s, "total_s": total_s, "latencies": lat,
+                   "peak_doc_kb": peak / 1024, "max_rss_kb": rss, "preds": preds}, f, default=str)
+
+def run_version(parser_dir, docs):
+    from schema import SCHEMA
+    from synthetic_corpus import LABELED
+    with tempfile.TemporaryDirectory() as tmp:
+        job, out = os.path.join(tmp, "job.json"), os.path.join(tmp, "out.json")
+        with open(job, "w", encoding="utf-8") as f:
+            json.dump({"parser_dir": parser_dir, "texts": [d["text"] for d in docs],
+                       "headers": {cid: SCHEMA[cid].header for cid in LABELED}}, f)
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--_worker", job, out],
+                       check=True, cwd=tmp)
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+
+def checkout(rev, dest):
+    # git-Revision in ein Verzeichnis entpacken
+    data = subprocess.run(["git", "-C", HERE, "archive", "--format=tar", rev],
+                          check=True, capture_output=True).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tf:
+            tf.extractall(dest)
+    return dest
+
+# ---------- Auswertung ----------
+def _norm(v):
+    if v is None or v == "":
+        return ""
+    s = str(v).strip()
+    try:
+        return f"{float(s.replace(',', '.')):g}"
+    except ValueError:
+        return s
+
+def _quantile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+def field_scores(docs, preds):
+    # pro Feld: tp = richtig befüllt, fp = befüllt aber falsch, fn = Soll-Wert verfehlt
+    counts = {}
+    for doc, pred in zip(docs, preds):
+        for cid, want in doc["truth"].items():
+            c = counts.setdefault(cid, [0, 0, 0])
+            w, g = _norm(want), _norm(pred.get(cid))
+            if g and g == w:
+                c[0] += 1
+            else:
+                if g:
+                    c[1] += 1
+                if w:
+                    c[2] += 1
+    scores = {}
+    for cid, (tp, fp, fn) in counts.items():
+        p = tp / (tp + fp) if tp + fp else 1.0
+        r = tp / (tp + fn) if tp + fn else 1.0
+        scores[cid] = {"precision": p, "recall": r, "f1": 2 * p * r / (p + r) if p + r else 0.0,
+                       "tp": tp, "fp": fp, "fn": fn}
+    return scores
+
+def summarize(docs, res):
+    lat = sorted(res["latencies"])
+    scores = field_scores(docs, res["preds"])
+    tp, fp, fn = (sum(s[k] for s in scores.values()) for k in ("tp", "fp", "fn"))
+    return {
+        "documents": len(docs),
+        "docs_per_sec": len(docs) / res["total_s"] if res["total_s"] else 0.0,
+        "p50_ms": _quantile(lat, 0.50) * 1000,
+        "p99_ms": _quantile(lat, 0.99) * 1000,
+        "import_ms": res["import_s"] * 1000,
+        "peak_doc_kb": res["peak_doc_kb"],
+        "max_rss_kb": res["max_rss_kb"],
+        "micro_precision": tp / (tp + fp) if tp + fp else 1.0,
+        "micro_recall": tp / (tp + fn) if tp + fn else 1.0,
+        "fields": scores,
+    }
+
+# ---------- Ausgabe ----------
+PERF = [("docs_per_sec", "Dok/s", "{:10.1f}"), ("p50_ms", "p50 ms", "{:10.2f}"), ("p99_ms", "p99 ms", "{:10.2f}"),
+        ("import_ms", "Import ms", "{:10.1f}"), ("peak_doc_kb", "Peak/Dok KiB", "{:10.0f}"),
+        ("max_rss_kb", "max RSS KiB", "{:10.0f}"), ("micro_precision", "Precision", "{:10.3f}"),
+        ("micro_recall", "Recall", "{:10.3f}")]
+
+def report(cur, base=None, show_all=False, out=sys.stdout):
+    print(f"{cur['documents']} Dokumente", file=out)
+    print(f"{'':14s}{'aktuell':>10s}" + (f"{'baseline':>10s}{'Δ':>9s}" if base else ""), file=out)
+    for key, label, fmt in PERF:
+        line = f"{label:14s}" + fmt.format(cur[key])
+        if base:
+            line += fmt.format(base[key])
+            if base[key]:
+                line += f"{(cur[key] / base[key] - 1) * 100:+8.1f}%"
+        print(line, file=out)
+    print(f"\n{'Feld':28s}{'P':>7s}{'R':>7s}{'F1':>7s}" + (f"{'F1 base':>9s}{'Δ':>8s}" if base else ""), file=out)
+    fields = cur["fields"]
+    for cid in sorted(fields, key=lambda c: (fields[c]["f1"], c)):
+        s = fields[cid]
+        b = base["fields"].get(cid) if base else None
+        changed = b is not None and abs(s["f1"] - b["f1"]) > 1e-9
+        if not show_all and s["f1"] >= 1.0 and not changed:
+            continue
+        line = f"{cid:28s}{s['precision']:7.3f}{s['recall']:7.3f}{s['f1']:7.3f}"
+        if b is not None:
+            line += f"{b['f1']:9.3f}{s['f1'] - b['f1']:+8.3f}"
+        print(line, file=out)
+
+def regressions(cur, base, tolerance=0.0, max_slowdown=None):
+    bad = [f"{cid}: F1 {base['fields'][cid]['f1']:.3f} -> {s['f1']:.3f}"
+           for cid, s in cur["fields"].items()
+           if cid in base["fields"] and s["f1"] < base["fields"][cid]["f1"] - tolerance]
+    if max_slowdown and cur["docs_per_sec"] < base["docs_per_sec"] / max_slowdown:
+        bad.append(f"Durchsatz {base['docs_per_sec']:.1f} -> {cur['docs_per_sec']:.1f} Dok/s")
+    return bad
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--_worker"]:
+        _worker(*argv[1:3])
+        return 0
+    ap = argparse.ArgumentParser(description="Benchmark für parse_report auf synthetischen Briefen.")
+    ap.add_argument("corpus", nargs="?", help="JSONL aus synthetic_corpus.py")
+    ap.add_argument("--generate", type=int, metavar="N", help="statt corpus: N Briefe erzeugen")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--noise", type=float, default=0.1)
+    ap.add_argument("--parser", default=HERE, help="Verzeichnis des zu messenden Stands (Standard: dieser)")
+    ap.add_argument("--baseline", help="Vergleichsstand: Verzeichnis oder git-Revision")
+    ap.add_argument("--tolerance", type=float, default=0.0, help="erlaubter F1-Verlust pro Feld")
+    ap.add_argument("--max-slowdown", type=float, help="z.B. 1.2: Fehler, wenn >20 %% langsamer als baseline")
+    ap.add_argument("--all", action="store_true", help="auch fehlerfreie Felder anzeigen")
+    ap.add_argument("--json", help="Bericht zusätzlich als JSON speichern")
+    args = ap.parse_args(argv)
+
+    from synthetic_corpus import generate, load
+    if args.corpus:
+        docs = load(args.corpus)
+    elif args.generate:
+        docs = list(generate(args.generate, args.seed, noise=args.noise))
+    else:
+        ap.error("corpus oder --generate N angeben")
+
+    cur = summarize(docs, run_version(os.path.abspath(args.parser), docs))
+    base = None
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            bdir = args.baseline if os.path.isdir(args.baseline) else checkout(args.baseline, tmp)
+            base = summarize(docs, run_version(os.path.abspath(bdir), docs))
+    report(cur, base, args.all)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"current": cur, "baseline": base}, f, indent=2)
+    if base:
+        bad = regressions(cur, base, args.tolerance, args.max_slowdown)
+        if bad:
+            print("\nRegressionen:\n  " + "\n  ".join(bad), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+# bulk_extract.py
+# Headless Massen-Extraktion: Verzeichnis / Glob / Archiv -> CSV oder Parquet.
+#
+#   python bulk_extract.py briefe/ -o echo_dataset.csv
+#   python bulk_extract.py "export/**/*.txt" -o echo_dataset.parquet --workers 8
+#   python bulk_extract.py briefe.zip -o echo_dataset.csv --errors fehler.csv
+#   python bulk_extract.py briefe/ -o echo_dataset.csv --profile profil.json
+#   python bulk_extract.py export.txt --dump -o echo_dataset.csv --checkpoint export.ckpt
+#   python bulk_extract.py export.jsonl -o echo_dataset.csv --checkpoint export.ckpt --resume
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from dump_reader import JSONL_SUFFIXES, iter_dump
+from parse_cache import ParseCache
+from profiling import Profile
+from report_parser import parse_reports
+from rule_engine import Budget
+from schema import SCHEMA
+
+TEXT_SUFFIXES = (".txt", ".text")
+SOURCE_COL = "source"
+
+def columns(ids=False):
+    # Spaltenreihenfolge wie das Studienblatt (SCHEMA.layout), davor die Herkunft des Dokuments.
+    # ids=False: Kopfzeilen wie im Studienblatt (CSV), ids=True: eindeutige IDs (Parquet)
+    return [SOURCE_COL] + list(SCHEMA.layout_ids if ids else SCHEMA.layout_headers)
+
+# ---------- Eingabe ----------
+def decode(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace")  # ältere KIS-Exporte
+
+def _is_text(name):
+    return name.lower().endswith(TEXT_SUFFIXES)
+
+def iter_documents(source):
+    # -> (quelle, text); lazy, damit auch riesige Archive nicht komplett im Speicher landen
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if _is_text(name):
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        yield path, decode(f.read())
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and _is_text(info.filename):
+                    yield f"{source}:{info.filename}", decode(zf.read(info))
+    elif os.path.isfile(source) and tarfile.is_tarfile(source):
+        with tarfile.open(source) as tf:
+            for member in tf:
+                if member.isfile() and _is_text(member.name):
+                    yield f"{source}:{member.name}", decode(tf.extractfile(member).read())
+    elif os.path.isfile(source):
+        with open(source, "rb") as f:
+            yield source, decode(f.read())
+    else:
+        for path in sorted(glob.glob(source, recursive=True)):
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    yield path, decode(f.read())
+
+def is_dump(source, dump=False):
+    # einzelne große Datei mit vielen Briefen (verkettet oder JSONL) -> gestreamt per mmap
+    return os.path.isfile(source) and (dump or source.lower().endswith(JSONL_SUFFIXES))
+
+def iter_dump_documents(source, delimiter=None, start=0):
+    # -> (quelle@byte-offset, text, ende, fehler); ende = Wiederaufsetzpunkt,
+    # fehler: nicht lesbarer Eintrag (text None), z.B. kaputte JSONL-Zeile
+    for doc in iter_dump(source, delimiter, start=start):
+        yield f"{source}@{doc.start}", doc.text, doc.end, doc.error
+
+def chunked(it, size):
+    chunk = []
+    for item in it:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# ---------- Worker ----------
+def _source(source, i):
+    # Dateien mit mehreren Briefen liefern mehrere Zeilen: quelle#2, quelle#3, …
+    return source if i == 0 else f"{source}#{i + 1}"
+
+_CACHES = {}
+
+def _cache(path):
+    # ein ParseCache (SQLite-Verbindung) pro Worker-Prozess
+    if path not in _CACHES:
+        _CACHES[path] = ParseCache(path=path)
+    return _CACHES[path]
+
+def parse_chunk(chunk, rule_s=None, doc_s=None, cache_path=None, profile=False):
+    # läuft im Worker-Prozess; Fehler pro Dokument abfangen, damit ein kaputter
+    # Brief (oder ein Bug in einer Regel) nicht den ganzen Lauf beendet.
+    # -> [(quelle, zeile|None, fehler|None)]; Zeitüberschreitungen liefern Zeile + Fehler.
+    # profile=True: -> (liste, Profile.to_dict()) zum Zusammenführen im Hauptprozess
+    parse = _cache(cache_path).parse if cache_path else parse_reports
+    prof = Profile() if profile else None
+    out = []
+    for source, text in chunk:
+        budget = Budget(rule_s, doc_s) if (rule_s or doc_s) else None
+        try:
+            rows = parse(text, budget, prof)
+        except Exception as e:
+            out.append((source, None, f"{type(e).__name__}: {e}"))
+            continue
+        timeouts = {}
+        for doc, group, label, kind in (budget.timeouts if budget else ()):
+            timeouts.setdefault(doc, []).append(f"{group}/{label} ({kind})")
+        for i, row in enumerate(rows):
+            err = "Timeout: " + ", ".join(timeouts[i]) if i in timeouts else None
+            out.append((_source(source, i), row, err))
+    return (out, prof.to_dict()) if profile else out
+
+# ---------- Ausgabe ----------
+# write() bekommt [(quelle, Row), …]; Row.values steht schon in Spaltenreihenfolge
+class CsvSink:
+    def __init__(self, path, append=False):
+        # append: Fortsetzung eines abgebrochenen Laufs (Kopfzeile nur in neuer Datei)
+        header = not (append and os.path.exists(path) and os.path.getsize(path))
+        self._f = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        if header:
+            self._w.writerow(columns())
+
+    def write(self, rows):
+        self._w.writerows([src, *(row.values[i] for i in SCHEMA.layout_index)] for src, row in rows)
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+class ParquetSink:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet-Export benötigt pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self.schema = pa.schema([(c, pa.string()) for c in columns(ids=True)])
+        self._w = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        data = {SOURCE_COL: [src for src, _ in rows]}
+        cols = SCHEMA.columnar([row for _, row in rows])
+        for cid in SCHEMA.layout_ids:
+            data[cid] = [_str(v) for v in cols[cid]]
+        self._w.write_table(self._pa.table(data, schema=self.schema))
+
+    def close(self):
+        self._w.close()
+
+def _str(v):
+    return None if v is None or v == "" else str(v)
+
+def open_sink(path, fmt=None, append=False):
+    fmt = fmt or ("parquet" if path.lower().endswith((".parquet", ".pq")) else "csv")
+    if fmt == "parquet":
+        if append:
+            raise SystemExit("Fortsetzen (--resume) geht nur mit CSV-Ausgabe")
+        return ParquetSink(path)
+    return CsvSink(path, append)
+
+# ---------- Wiederaufsetzen ----------
+def load_checkpoint(path, source):
+    # -> Byte-Offset, ab dem weitergelesen wird (0, wenn es keinen Checkpoint gibt)
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        ckpt = json.load(f)
+    if os.path.abspath(ckpt["source"]) != os.path.abspath(source):
+        raise SystemExit(f"Checkpoint {path} gehört zu {ckpt['source']}, nicht zu {source}")
+    return ckpt["offset"]
+
+def save_checkpoint(path, source, offset):
+    # atomar ersetzen – ein Abbruch mitten im Schreiben hinterlässt den alten Stand
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "offset": offset}, f)
+    os.replace(tmp, path)
+
+# ---------- Lauf ----------
+def run(source, output, fmt=None, workers=None, chunk_size=64, errors_path=None, progress=True,
+        rule_budget_s=None, doc_budget_s=None, cache_path=None, profile_path=None,
+        dump=False, delimiter=None, checkpoint=None, resume=False):
+    # profile_path: JSON-Bericht mit Zeit/Treffern pro Extraktor-Gruppe (profiling.Profile)
+    # dump: source ist eine große verkettete Datei (JSONL wird automatisch erkannt), gestreamt
+    #   per dump_reader; delimiter: Trenner-Regex statt Patientenkopf.
+    # checkpoint: Datei mit dem Byte-Offset bis zu dem alles geschrieben ist; resume: dort
+    #   weitermachen und an output anhängen
+    workers = workers or os.cpu_count() or 1
+    profile = Profile() if profile_path else None
+    dump = is_dump(source, dump)
+    if resume and not dump:
+        raise SystemExit("Fortsetzen (--resume) geht nur mit einem Dump (--dump oder .jsonl)")
+    start = load_checkpoint(checkpoint, source) if resume else 0
+    append = bool(start)
+    sink = open_sink(output, fmt, append)
+    err_f = open(errors_path, "a" if append else "w", newline="", encoding="utf-8") if errors_path else None
+    err_w = csv.writer(err_f) if err_f else None
+    if err_w and not append: err_w.writerow([SOURCE_COL, "error"])
+
+    done = failed = timed_out = 0
+    t0 = time.perf_counter()
+    if dump:
+        docs = iter_dump_documents(source, delimiter, start)
+    else:
+        docs = ((src, text, None, None) for src, text in iter_documents(source))
+    chunks = chunked(docs, chunk_size)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending, seq = {}, 0     # future -> (nr, byte-ende des chunks, unlesbare Einträge)
+            results, written = {}, 0  # fertige, noch nicht geschriebene Chunks (nr -> …)
+            exhausted = False
+            while pending or not exhausted:
+                # höchstens 2 Chunks pro Worker unterwegs oder gepuffert -> Speicher bleibt beschränkt
+                while not exhausted and len(pending) + len(results) < 2 * workers:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                    else:
+                        # unlesbare Einträge gehen nicht an die Worker, sondern direkt als Fehlerzeile raus
+                        bad = [(src, None, err) for src, _, _, err in chunk if err is not None]
+                        fut = pool.submit(parse_chunk, [(src, text) for src, text, _, err in chunk if err is None],
+                                          rule_budget_s, doc_budget_s, cache_path, profile is not None)
+                        pending[fut] = (seq, chunk[-1][2], bad)
+                        seq += 1
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    nr, end, bad = pending.pop(fut)
+                    results[nr] = (fut.result(), end, bad)
+                # in Eingabereihenfolge schreiben: der Checkpoint deckt dann genau das Geschriebene ab
+                while written in results:
+                    result, end, bad = results.pop(written)
+                    written += 1
+                    if profile is not None:
+                        result, prof = result
+                        profile.merge(prof)
+                    rows = []
+                    for src, row, err in bad + result:
+                        if row is not None:
+                            rows.append((src, row))
+                        if err is not None:
+                            if row is None: failed += 1
+                            else: timed_out += 1
+                            if err_w: err_w.writerow([src, err])
+                    sink.write(rows)
+                    done += len(rows)
+                    if checkpoint and end is not None:
+                        if err_f: err_f.flush()
+                        save_checkpoint(checkpoint, source, end)
+                if progress:
+                    rate = (done + failed) / max(time.perf_counter() - t0, 1e-9)
+                    print(f"\r{done + failed} Dokumente ({failed} Fehler) – {rate:.1f} Dok/s",
+                          end="", file=sys.stderr, flush=True)
+    finally:
+        sink.close()
+        if err_f: err_f.close()
+
+    elapsed = time.perf_counter() - t0
+    summary = {"documents": done + failed, "ok": done, "failed": failed, "timeouts": timed_out,
+               "seconds": round(elapsed, 2),
+               "docs_per_sec": round((done + failed) / elapsed, 1) if elapsed else 0.0}
+    if profile is not None:
+        profile.save(profile_path)
+    if progress:
+        print(file=sys.stderr)
+        print(f"Fertig: {summary['ok']} ok ({timed_out} mit Timeout), {summary['failed']} Fehler in {summary['seconds']} s "
+              f"({summary['docs_per_sec']} Dok/s) -> {output}", file=sys.stderr)
+    return summary
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Arztbriefe massenhaft mit parse_report extrahieren.")
+    ap.add_argument("source", help="Verzeichnis, Glob-Muster, .zip/.tar(.gz), einzelne Textdatei oder Dump (.jsonl)")
+    ap.add_argument("-o", "--output", required=True, help="Zieldatei (.csv oder .parquet)")
+    ap.add_argument("--format", choices=["csv", "parquet"], help="Ausgabeformat (Standard: aus Dateiendung)")
+    ap.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: CPU-Kerne)")
+    ap.add_argument("--chunk-size", type=int, default=64, help="Dokumente pro Worker-Auftrag")
+    ap.add_argument("--errors", help="CSV mit Dokumenten, bei denen das Parsen fehlschlug")
+    ap.add_argument("--rule-budget-ms", type=float, help="Zeitlimit pro Regel; Überschreitung wird protokolliert")
+    ap.add_argument("--doc-budget-ms", type=float, help="Zeitlimit pro Dokument; Rest wird übersprungen und protokolliert")
+    ap.add_argument("--cache", metavar="DB", help="SQLite-Parse-Cache (wird bei Regeländerungen automatisch ungültig)")
+    ap.add_argument("--profile", metavar="JSON", help="Zeit und Trefferquote pro Extraktor-Gruppe als JSON speichern")
+    ap.add_argument("--dump", action="store_true", help="source ist ein großer Export mit vielen Briefen (gestreamt)")
+    ap.add_argument("--delimiter", metavar="REGEX", help="Trenner zwischen Briefen im Dump (Standard: Patientenkopf), z.B. '\\f'")
+    ap.add_argument("--checkpoint", metavar="DATEI", help="Byte-Offset des Dumps speichern, bis zu dem alles geschrieben ist")
+    ap.add_argument("--resume", action="store_true", help="ab --checkpoint fortsetzen und an die Ausgabe anhängen (nur Dump)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="keine Fortschrittsanzeige")
+    args = ap.parse_args(argv)
+    summary = run(args.source, args.output, args.format, args.workers, args.chunk_size,
+                  args.errors, progress=not args.quiet,
+                  rule_budget_s=args.rule_budget_ms / 1000 if args.rule_budget_ms else None,
+                  doc_budget_s=args.doc_budget_ms / 1000 if args.doc_budget_ms else None,
+                  cache_path=args.cache, profile_path=args.profile,
+                  dump=args.dump, delimiter=args.delimiter, checkpoint=args.checkpoint, resume=args.resume)
+    return 1 if summary["failed"] and not summary["ok"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# dataset.py
+# Sitzungs-Datensatz: sammelt geparste Zeilen ohne pd.concat / .loc pro Zelle.
+# Schlüssel -> Zeilenindex als dict, Werte spaltenweise in vorab angelegten
+# Listen (Kapazität wird verdoppelt). Ein (typisierter) DataFrame entsteht erst beim
+# Anzeigen bzw. Exportieren und wird bis zur nächsten Änderung wiederverwendet.
+# Ohne expliziten Schlüssel landen Briefe desselben Patienten (linkage.py:
+# „Müller“/„Mueller“, fehlendes DOB, AufnahmeNr) in derselben Zeile.
+from derive import DERIVED, INPUTS, changed_rows, derive_columns, derive_row
+from export import export_bytes
+from frames import typed_frame
+from linkage import IDENT_COLS, LinkIndex, clusters, merge_values
+from schema import SCHEMA, Row
+
+INITIAL_CAPACITY = 64
+_IDENT = [SCHEMA.index[c] for c in IDENT_COLS]
+
+def ident_key(row):
+    # Upsert-Schlüssel wie bisher: Nachname|Vorname|DOB, sonst AufnahmeNr, sonst None
+    key = f"{row['surname']}|{row['first_name']}|{row['dob']}"
+    if key.strip("|"):
+        return key
+    return f"aufnahme_{row['aufnahmenr']}" if row["aufnahmenr"] else None
+
+def row_key(row, n):
+    # ident_key, sonst fortlaufend row_{n+1}. n ist ein Zähler, der nie zurückgeht –
+    # nicht die Zeilenzahl, sonst bekäme nach einem dedup ein neuer Brief einen vergebenen Schlüssel
+    return ident_key(row) or f"row_{n + 1}"
+
+class Dataset:
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.ids = SCHEMA.ids
+        self.keys = []
+        self.index = {}
+        self._cap = capacity
+        self._cols = [[""] * capacity for _ in self.ids]
+        self.link = LinkIndex()
+        self.version = 0
+        self.serial = 0     # Zähler für row_key (angelegte Zeilen; dedup setzt ihn nicht zurück)
+        self._frame = None
+        self._exports = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def _grow(self):
+        for col in self._cols:
+            col.extend([""] * self._cap)
+        self._cap *= 2
+
+    def upsert(self, row, overwrite=False, key=None):
+        # neue Zeile anhängen oder bestehende ergänzen (overwrite=False: nur leere Zellen)
+        values = row.values
+        if not key:
+            key = row_key(row, self.serial)
+            if key not in self.index:
+                key = self.link.match([values[j] for j in _IDENT]) or key
+        i = self.index.get(key)
+        if i is None:
+            i = len(self.keys)
+            if i == self._cap:
+                self._grow()
+            self.index[key] = i
+            self.keys.append(key)
+            self.serial += 1
+            for col, v in zip(self._cols, values):
+                col[i] = v
+        else:
+            # wie merge_values (dedup): eine leere Zelle des Briefs überschreibt nie einen Wert,
+            # auch nicht mit overwrite (z.B. fehlendes DOB im späteren Brief desselben Patienten)
+            for col, v in zip(self._cols, values):
+                if v not in ("", None) and (overwrite or col[i] in ("", None)):
+                    col[i] = v
+        self.link.add(key, [self._cols[j][i] for j in _IDENT])
+        self.version += 1
+        self._frame = None
+        self._exports.clear()
+        return key
+
+    def upsert_many(self, rows, overwrite=False, keys=None):
+        if keys is None:
+            return [self.upsert(r, overwrite) for r in rows]
+        return [self.upsert(r, overwrite, k) for r, k in zip(rows, keys)]
+
+    def clear(self):
+        self.__init__(INITIAL_CAPACITY)
+
+    def dedup(self, overwrite=False):
+        # Bulk-Dedup: Zeilen desselben Patienten zusammenführen (erste Zeile bleibt, Zellen
+        # nach der Upsert-Regel) -> Anzahl entfernter Zeilen
+        n = len(self.keys)
+        groups = clusters(zip(*(self._cols[j][:n] for j in _IDENT)), overwrite)
+        drop = set()
+        for keep, *others in groups:
+            values = [col[keep] for col in self._cols]
+            for i in others:
+                values = merge_values(values, [col[i] for col in self._cols], overwrite)
+            derive_row(Row(values))  # z.B. Größe aus einem, Gewicht aus dem anderen Brief
+            for col, v in zip(self._cols, values):
+                col[keep] = v
+            drop.update(others)
+        if drop:
+            kept = [i for i in range(n) if i not in drop]
+            keys, cols = [self.keys[i] for i in kept], [[col[i] for i in kept] for col in self._cols]
+            version, serial = self.version, self.serial
+            self.clear()
+            self.version, self.serial = version + 1, serial
+            while self._cap < len(keys):
+                self._grow()
+            self.keys, self.index = keys, {k: i for i, k in enumerate(keys)}
+            for col, vals in zip(self._cols, cols):
+                col[:len(vals)] = vals
+            for i, k in enumerate(keys):
+                self.link.add(k, [cols[j][i] for j in _IDENT])
+        return len(drop)
+
+    def rederive(self, **thresholds):
+        # abgeleitete Spalten (KOF, AS-Grad, …) mit neuen Grenzwerten, ohne Neu-Parsen
+        # -> Anzahl geänderter Zeilen
+        n = len(self.keys)
+        cols = {cid: self._cols[SCHEMA.index[cid]][:n] for cid in INPUTS + DERIVED}
+        new = derive_columns(cols, **thresholds)
+        changed = sum(changed_rows(new, cols))
+        for cid, vals in new.items():
+            self._cols[SCHEMA.index[cid]][:n] = vals
+        self.version += 1
+        self._frame = None
+        self._exports.clear()
+        return changed
+
+    def row(self, key):
+        i = self.index[key]
+        return {cid: col[i] for cid, col in zip(self.ids, self._cols)}
+
+    def columns(self):
+        # {id: [werte…]} ohne Reserve-Kapazität
+        n = len(self.keys)
+        return {cid: col[:n] for cid, col in zip(self.ids, self._cols)}
+
+    def chunks(self, size):
+        # -> (schlüssel, {id: [werte…]}) in Blöcken zu size Zeilen
+        n = len(self.keys)
+        for s in range(0, n, size):
+            e = min(s + size, n)
+            yield self.keys[s:e], {cid: col[s:e] for cid, col in zip(self.ids, self._cols)}
+
+    def to_frame(self):
+        # typisiert (frames.py): Int8/float32/datetime64/category statt object
+        if self._frame is None:
+            self._frame = typed_frame(self.keys, self.columns())
+        return self._frame
+
+    def export(self, fmt="csv"):
+        # Bytes für den Download; gecacht bis zur nächsten Änderung
+        data = self._exports.get(fmt)
+        if data is None:
+            data = self._exports[fmt] = export_bytes(self, fmt)
+        return data
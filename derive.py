@@ -0,0 +1,131 @@
+# derive.py
+# Abgeleitete Spalten, getrennt von der Extraktion: die Regeln in report_parser
+# schreiben nur Rohwerte (Größe, Gewicht, E/e', TR Vmax, Pmean, KÖF), KOF,
+# e' reduced, TR-Vmax-Flag und AS-Grad entstehen hier aus den Grenzwerten in
+# THRESHOLDS. Zwei Wege mit denselben Regeln:
+#   derive_row(row)                   – pro Zeile, am Ende von parse_report
+#   derive_columns(cols, **grenzen)   – ein NumPy-Durchlauf über ganze Spalten,
+#                                       z.B. nach geänderten Grenzwerten ohne Neu-Parsen
+#
+#   dataset.rederive(as_pmean_severe=45)   # Dataset / store.SqliteDataset
+THRESHOLDS = {
+    "ee_reduced": 14.0,         # E/e' ab hier -> e' reduced = 1
+    "trvmax_high": 2.8,         # TR Vmax (m/s) ab hier -> Flag = 1
+    "as_pmean_severe": 40.0,    # AS Grad 3: Pmean (mmHg) ab …
+    "as_koef_severe": 1.0,      #            … oder KÖF (cm²) unter
+    "as_pmean_moderate": 20.0,  # AS Grad 2
+    "as_koef_moderate": 1.5,
+}
+
+# Eingaben (Rohwerte) und Ausgaben; echo_bl_as ist beides („keine AS“ = 0 ohne Messwerte)
+INPUTS = ("size", "weight", "echo_bl_ee", "echo_bl_trvmax", "echo_bl_as_pmean", "echo_bl_as_koef", "echo_bl_as")
+DERIVED = ("kof", "echo_bl_e_reduced", "echo_bl_trvmax_high", "echo_bl_as")
+
+def _thresholds(overrides):
+    unknown = set(overrides) - set(THRESHOLDS)
+    if unknown:
+        raise ValueError(f"unbekannte Grenzwerte: {', '.join(sorted(unknown))}")
+    return {**THRESHOLDS, **overrides}
+
+def bsa_mosteller(height_cm, weight_kg):
+    if not height_cm or not weight_kg: return None
+    try:
+        return round(((height_cm * weight_kg) / 3600.0) ** 0.5, 2)
+    except: return None
+
+# ---------- pro Zeile ----------
+def _float(v):
+    # Rohwert (int, "1,2", "1.2", "") -> float oder None; 0 zählt wie fehlend
+    if v in ("", None): return None
+    try: v = float(str(v).replace(",", "."))
+    except ValueError: return None
+    return v or None
+
+def _as_grade(pmean, koef, t):
+    if pmean and pmean >= t["as_pmean_severe"] or koef and koef < t["as_koef_severe"]: return "3"
+    if pmean and pmean >= t["as_pmean_moderate"] or koef and koef < t["as_koef_moderate"]: return "2"
+    return "1"
+
+def derive_row(row, **thresholds):
+    t = _thresholds(thresholds) if thresholds else THRESHOLDS
+    size, weight = _float(row["size"]), _float(row["weight"])
+    if size and weight:
+        row["kof"] = bsa_mosteller(size, weight)
+    if row["echo_bl_ee"] not in ("", None):
+        ee = _float(row["echo_bl_ee"])
+        row["echo_bl_e_reduced"] = 1 if ee and ee >= t["ee_reduced"] else 0
+    if row["echo_bl_trvmax"] not in ("", None):
+        vmax = _float(row["echo_bl_trvmax"])
+        row["echo_bl_trvmax_high"] = 1 if vmax and vmax >= t["trvmax_high"] else 0
+    # AS-Grad aus Pmean/KÖF, sobald gemessen (geht „keine AS“ vor)
+    pmean, koef = _float(row["echo_bl_as_pmean"]), _float(row["echo_bl_as_koef"])
+    if pmean or koef:
+        row["echo_bl_as"] = _as_grade(pmean, koef, t)
+    return row
+
+# ---------- ganze Spalten ----------
+def _np():
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("derive_columns benötigt numpy (pip install numpy)")
+    return np
+
+def _floats(np, values):
+    # Spalte -> float-Array, fehlend/ungültig/0 = NaN (wie _float)
+    a = np.array(values, dtype=object)
+    a[np.equal(a, "") | np.equal(a, None)] = np.nan
+    try:
+        out = a.astype(float)
+    except ValueError:  # Dezimalkomma / kaputte Zellen: Zelle für Zelle
+        out = np.fromiter((_float(v) or np.nan for v in values), float, len(values))
+    out[out == 0] = np.nan
+    return out
+
+def _same(a, b):
+    # gleicher Zellinhalt, egal ob als Text, int oder float ("2" / 2 / 2.0 aus Parser bzw. Import)
+    if a == b:
+        return True
+    try:
+        return float(str(a).replace(",", ".")) == float(str(b).replace(",", "."))
+    except ValueError:
+        return False
+
+def changed_rows(new, old):
+    # DERIVED-Spalten {id: [werte…]} vorher/nachher -> Liste bool je Zeile (nur echte Wertänderungen)
+    return [not all(map(_same, a, b)) for a, b in zip(zip(*(new[c] for c in DERIVED)), zip(*(old[c] for c in DERIVED)))]
+
+def _present(np, values):
+    a = np.asarray(values, dtype=object)
+    return ~(np.equal(a, "") | np.equal(a, None))
+
+def _merge(np, old, mask, new):
+    # Liste mit neuen Werten an den Stellen von mask (Python-Typen wie derive_row)
+    out = np.empty(len(old), dtype=object)
+    out[:] = old
+    vals = np.empty(int(mask.sum()), dtype=object)
+    vals[:] = new[mask].tolist()
+    out[mask] = vals
+    return out.tolist()
+
+def derive_columns(cols, **thresholds):
+    # cols: {id: [werte…]} mit INPUTS und DERIVED -> {id: [werte…]} für DERIVED
+    # (gleiches Ergebnis wie derive_row pro Zeile, ohne Python-Schleife über Zeilen)
+    np, t = _np(), _thresholds(thresholds)
+    size, weight = _floats(np, cols["size"]), _floats(np, cols["weight"])
+    ee, vmax = _floats(np, cols["echo_bl_ee"]), _floats(np, cols["echo_bl_trvmax"])
+    pmean, koef = _floats(np, cols["echo_bl_as_pmean"]), _floats(np, cols["echo_bl_as_koef"])
+    with np.errstate(invalid="ignore"):
+        has_kof = ~np.isnan(size) & ~np.isnan(weight) & (size * weight > 0)
+        kof = np.round(np.sqrt(size * weight / 3600.0), 2)
+        e_reduced = (ee >= t["ee_reduced"]).astype(int)
+        vmax_high = (vmax >= t["trvmax_high"]).astype(int)
+        severe = (pmean >= t["as_pmean_severe"]) | (koef < t["as_koef_severe"])
+        moderate = (pmean >= t["as_pmean_moderate"]) | (koef < t["as_koef_moderate"])
+    grade = np.where(severe, "3", np.where(moderate, "2", "1")).astype(object)
+    return {
+        "kof": _merge(np, cols["kof"], has_kof, kof),
+        "echo_bl_e_reduced": _merge(np, cols["echo_bl_e_reduced"], _present(np, cols["echo_bl_ee"]), e_reduced),
+        "echo_bl_trvmax_high": _merge(np, cols["echo_bl_trvmax_high"], _present(np, cols["echo_bl_trvmax"]), vmax_high),
+        "echo_bl_as": _merge(np, cols["echo_bl_as"], ~np.isnan(pmean) | ~np.isnan(koef), grade),
+    }
@@ -0,0 +1,90 @@
+# drug_lexicon.py
+# Medikamente -> Wirkstoffklasse aus drug_lexicon.csv (Wirkstoffe und Handelsnamen).
+# Neue Namen kommen nur in die CSV, nicht in Regexe: die Namen werden als Anker
+# in den Scanner von report_parser aufgenommen, die Medikation ist damit schon
+# nach dem einen Scan über den Brief bekannt.
+#
+# CSV: name,class,whole_word,in_word – Treffer müssen am Wortanfang stehen; whole_word=1
+# verlangt zusätzlich ein Wortende (z.B. "ASS", aber nicht "Klasse"/"Assistenz"),
+# in_word=1 erlaubt Treffer mitten im Wort (Wortstamm, z.B. "Diuret" in "Schleifendiuretikum").
+#
+#   python drug_lexicon.py      # prüft, dass alle Namen der früheren Klassen-Regexe erkannt werden
+import csv
+import os
+import sys
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "drug_lexicon.csv")
+
+class Lexicon:
+    def __init__(self, entries):
+        # entries: [(name, klasse, whole_word, in_word)]
+        self.entries = {}
+        for name, cls, whole, in_word in entries:
+            self.entries[name.lower()] = (cls, bool(whole), bool(in_word))
+        self.words = frozenset(self.entries)
+        self.classes = sorted({cls for cls, _, _ in self.entries.values()})
+
+    @classmethod
+    def load(cls, path=LEXICON_PATH):
+        def flag(r, col):
+            return (r.get(col) or "").strip() in ("1", "yes", "true")
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls((r["name"].strip(), r["class"].strip(), flag(r, "whole_word"), flag(r, "in_word"))
+                       for r in csv.DictReader(f) if r.get("name", "").strip())
+
+    def matches(self, hits):
+        # -> [(position, name, klasse)] im Abschnitt von hits, in Textreihenfolge
+        text, out = hits.text, []
+        for name in self.words.intersection(hits.pos):
+            cls, whole, in_word = self.entries[name]
+            for p in hits.positions((name,)):
+                if not in_word and p > 0 and text[p - 1].isalnum():
+                    continue
+                e = p + len(name)
+                if whole and e < len(text) and text[e].isalnum():
+                    continue
+                out.append((p, name, cls))
+        out.sort()
+        return out
+
+LEXICON = Lexicon.load()
+
+# Namen, die die früheren Klassen-Regexe in report_parser trafen (dort ohne Wortgrenzen,
+# also auch "Fluvastatin" über "Statin" oder "Schleifendiuretikum" über "Diuret")
+BASELINE = {
+    "ass": ["ASS", "Aspirin"],
+    "p2y12": ["Clopidogrel", "Prasugrel", "Ticagrelor"],
+    "oak": ["Apixaban", "Rivaroxaban", "Edoxaban", "Dabigatran", "Phenprocoumon", "Falithrom", "Warfarin"],
+    "raasi": ["Ramipril", "Enalapril", "Lisinopril", "Perindopril", "Candesartan", "Valsartan", "Olmesartan",
+              "Losartan"],
+    "arni": ["Sacubitril", "Entresto"],
+    "betablocker": ["Bisoprolol", "Nebivolol", "Metoprolol", "Carvedilol", "Atenolol", "Betablocker"],
+    "mra": ["Spironolacton", "Eplerenon"],
+    "sglt2": ["Dapagliflozin", "Empagliflozin", "Ertugliflozin", "SGLT2"],
+    "diuretic": ["Torasemid", "Furosemid", "Hydrochlorothiazid", "HCT", "Diuretikum", "Schleifendiuretikum",
+                 "Thiaziddiuretikum"],
+    "statin": ["Simvastatin", "Atorvastatin", "Rosuvastatin", "Pravastatin", "Statin", "Fluvastatin",
+               "Lovastatin", "Pitavastatin", "Cerivastatin"],
+}
+
+def check(out=sys.stdout):
+    # jeder Name aus BASELINE muss über report_parser seine Klassen-Spalte setzen -> [(klasse, name)]
+    from report_parser import APT, CLASS_COLS, parse_report
+    failed = []
+    for cls, names in BASELINE.items():
+        for name in names:
+            for form in (name, name.lower(), f"{name}-Therapie"):
+                row = parse_report(f"Medikation:\n{form} 1-0-0\n")
+                if cls == "ass":
+                    ok = row[APT] in (1, 3)
+                elif cls == "p2y12":
+                    ok = row[APT] in (2, 3)
+                else:
+                    ok = row[CLASS_COLS[cls]] == 1
+                if not ok:
+                    failed.append((cls, form))
+                    print(f"{cls:12s} {form}: nicht erkannt", file=out)
+    return failed
+
+if __name__ == "__main__":
+    sys.exit(1 if check() else 0)
@@ -0,0 +1,126 @@
+# dump_reader.py
+# Streaming-Leser für große KIS-Exporte (mehrere GB): verkettete Textbriefe oder
+# JSONL. Die Datei wird per mmap gelesen und Dokument für Dokument als
+# DumpDoc(start, end, text) geliefert – start/end sind Byte-Offsets in der Datei,
+# end ist zugleich der Wiederaufsetzpunkt nach einer Unterbrechung (start=...).
+# Eine kaputte JSONL-Zeile (abgeschnitten, kein JSON) beendet den Lauf nicht: sie kommt
+# als DumpDoc(start, end, None, fehler) und es geht mit der nächsten Zeile weiter.
+# Gelesene Seiten werden wieder freigegeben, der Speicherbedarf hängt also nur von
+# Fenster- und Dokumentgröße ab, nicht von der Dateigröße.
+#
+#   for doc in iter_dump("export.txt"):                       # Trennung am Patientenkopf
+#   for doc in iter_dump("export.txt", delimiter=r"\f"):      # oder an eigenem Trenner (Regex)
+#   for doc in iter_dump("export.jsonl", start=123456789):    # JSONL, ab Byte-Offset
+import json
+import mmap
+import os
+import re
+from collections import namedtuple
+
+from segmenter import doc_bounds
+
+DumpDoc = namedtuple("DumpDoc", "start end text error", defaults=(None,))
+
+WINDOW = 8 * 2**20       # Bytes, die für die Kopf-Erkennung auf einmal dekodiert werden
+MAX_DOC = 64 * 2**20     # größere „Dokumente“ werden hart geteilt (kaputter Export)
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+def _decode(raw):
+    # wie bulk_extract.decode; -> (text, bytes_pro_zeichen_fest)
+    try:
+        return raw.decode("utf-8"), False
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace"), True
+
+def _release(mm, upto, state):
+    # bereits verarbeitete Seiten freigeben (RSS bleibt konstant)
+    if not hasattr(mm, "madvise"):
+        return
+    upto -= upto % mmap.PAGESIZE
+    if upto > state[0]:
+        mm.madvise(mmap.MADV_DONTNEED, state[0], upto - state[0])
+        state[0] = upto
+
+def iter_dump(path, delimiter=None, fmt=None, start=0, field="text", window=WINDOW, max_doc=MAX_DOC):
+    # fmt: "text" | "jsonl" (Standard: nach Dateiendung). delimiter (nur Text): Regex
+    # zwischen zwei Dokumenten; None = Patientenkopf wie segmenter (wiederholte
+    # Seitenköpfe desselben Patienten trennen nicht)
+    fmt = fmt or ("jsonl" if path.lower().endswith(JSONL_SUFFIXES) else "text")
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if start == 0 and mm[:3] == b"\xef\xbb\xbf":
+            start = 3
+        if fmt == "jsonl":
+            yield from _iter_jsonl(mm, start, field)
+        elif delimiter is not None:
+            yield from _iter_delimited(mm, start, re.compile(delimiter.encode("utf-8"), re.MULTILINE), max_doc)
+        else:
+            yield from _iter_headers(mm, start, window, max_doc)
+
+def _iter_jsonl(mm, pos, field):
+    size, freed = len(mm), [0]
+    while pos < size:
+        end = mm.find(b"\n", pos)
+        end = size if end < 0 else end + 1
+        line = mm[pos:end].strip()
+        if line:
+            try:
+                rec = json.loads(line)
+            except ValueError as e:  # auch UnicodeDecodeError
+                yield DumpDoc(pos, end, None, f"{type(e).__name__}: {e}")
+                pos = end
+                continue
+            text = rec.get(field) if isinstance(rec, dict) else rec
+            if isinstance(text, str) and text.strip():
+                yield DumpDoc(pos, end, text)
+        pos = end
+        _release(mm, pos, freed)
+
+def _iter_delimited(mm, pos, rx, max_doc):
+    size, freed = len(mm), [0]
+    while pos < size:
+        m = rx.search(mm, pos, min(size, pos + max_doc))
+        end, nxt = (m.start(), m.end()) if m else (min(size, pos + max_doc),) * 2
+        if m and m.end() == m.start():  # leerer Treffer: mindestens ein Byte weiter
+            nxt += 1
+        text, _ = _decode(mm[pos:end])
+        if text.strip():
+            yield DumpDoc(pos, end, text)
+        pos = nxt
+        _release(mm, pos, freed)
+
+def _iter_headers(mm, pos, window, max_doc):
+    # Fenster dekodieren, Dokumentgrenzen wie segmenter bestimmen, alle bis auf das
+    # letzte (evtl. unvollständige) liefern; das nächste Fenster beginnt an dessen Start
+    size, freed, want = len(mm), [0], window
+    while pos < size:
+        end = min(size, pos + want)
+        if end < size:
+            nl = mm.rfind(b"\n", pos, end)  # an Zeilenende schneiden (keine halben UTF-8-Zeichen)
+            if nl > pos:
+                end = nl + 1
+        text, single_byte = _decode(mm[pos:end])
+        bounds = doc_bounds(text)
+        if end < size and len(bounds) < 2 and end - pos < max_doc:
+            want *= 2  # Dokument größer als das Fenster
+            continue
+        if end < size and len(bounds) >= 2:
+            bounds = bounds[:-1]
+            done_chars = bounds[-1][1]
+        else:
+            done_chars = len(text)
+        offset, chars = pos, 0
+        for s, e in bounds:
+            # Zeichen- -> Byte-Offsets: Stück für Stück kodieren (linear)
+            if s > chars:
+                offset += _nbytes(text[chars:s], single_byte)
+            n = _nbytes(text[s:e], single_byte)
+            yield DumpDoc(offset, offset + n, text[s:e])
+            offset, chars = offset + n, e
+        pos = offset + _nbytes(text[chars:done_chars], single_byte)
+        want = window
+        _release(mm, pos, freed)
+
+def _nbytes(s, single_byte):
+    return len(s) if single_byte else len(s.encode("utf-8"))
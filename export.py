@@ -0,0 +1,72 @@
+# export.py
+# Export des Sitzungs-Datensatzes als CSV / Parquet / XLSX. Geschrieben wird
+# blockweise direkt aus den Spaltenpuffern (kein DataFrame); das Ergebnis cacht
+# Dataset.export() pro Format bis zur nächsten Änderung (Dataset.version).
+# Spalten wie im Studienblatt (SCHEMA.layout, ohne interne Spalten).
+import csv
+import io
+
+from schema import SCHEMA
+
+CHUNK_ROWS = 2000
+
+# format -> (dateiendung, mime)
+FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def _str(v):
+    return None if v is None or v == "" else str(v)
+
+def write_csv(dataset, out, chunk_rows=CHUNK_ROWS):
+    # Kopfzeilen wie im Studienblatt (mehrzeilig, csv quotet sie)
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    w = csv.writer(text)
+    w.writerow(SCHEMA.layout_headers)
+    for _, cols in dataset.chunks(chunk_rows):
+        w.writerows(zip(*(cols[cid] for cid in SCHEMA.layout_ids)))
+    text.detach()
+
+def write_parquet(dataset, out, chunk_rows=CHUNK_ROWS):
+    # Spaltennamen = eindeutige IDs (wie bulk_extract); ein Row-Group pro Block
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet-Export benötigt pyarrow (pip install pyarrow)")
+    schema = pa.schema([(cid, pa.string()) for cid in SCHEMA.layout_ids])
+    with pq.ParquetWriter(out, schema) as w:
+        for _, cols in dataset.chunks(chunk_rows):
+            w.write_table(pa.table({c: [_str(v) for v in cols[c]] for c in SCHEMA.layout_ids}, schema=schema))
+
+def write_xlsx(dataset, out, chunk_rows=CHUNK_ROWS):
+    # write_only: Zeilen werden direkt gestreamt statt als Zellobjekte gehalten
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Font
+    except ImportError:
+        raise RuntimeError("XLSX-Export benötigt openpyxl (pip install openpyxl)")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("echo_dataset")
+    ws.freeze_panes = "A2"
+    wrap, bold = Alignment(wrap_text=True, vertical="top"), Font(bold=True)
+    header = []
+    for h in SCHEMA.layout_headers:
+        cell = WriteOnlyCell(ws, value=h)
+        cell.alignment, cell.font = wrap, bold
+        header.append(cell)
+    ws.append(header)
+    for _, cols in dataset.chunks(chunk_rows):
+        for values in zip(*(cols[cid] for cid in SCHEMA.layout_ids)):
+            ws.append([None if v == "" else v for v in values])
+    wb.save(out)
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+def export_bytes(dataset, fmt):
+    out = io.BytesIO()
+    WRITERS[fmt](dataset, out)
+    return out.getvalue()
@@ -0,0 +1,102 @@
+# frames.py
+# Typisierte DataFrames aus den Spaltenpuffern. Die Zellen kommen als Python-Objekte
+# ("", ints, "1.2"), ein DataFrame daraus ist komplett object – bei zehntausenden
+# Zeilen x ~190 Spalten Hunderte MB. Hier bekommt jede Spalte den kleinsten Typ
+# passend zum Schema:
+#   FLAG / ORDINAL -> Int8 (nullable; Int16/Int32, falls die Werte nicht passen)
+#   FLOAT          -> float32
+#   DATE           -> datetime64 (TT.MM.JJJJ)
+#   TEXT           -> category (wenige verschiedene Werte) bzw. Arrow-Strings
+# Leere Zellen werden NA. Eine Spalte mit Werten, die nicht zum Typ passen (z.B.
+# "II-III" in einer Zahlenspalte nach einem Import), bleibt object – lieber weniger
+# kompakt als Inhalt verlieren.
+#
+#   df = typed_frame(keys, cols)      # cols: {id: [werte…]} wie Dataset.columns()
+#   footprint(df)                     # -> {dtype: bytes}
+from schema import DATE, FLAG, FLOAT, ORDINAL, SCHEMA, TEXT
+
+DATE_FORMAT = "%d.%m.%Y"
+# Text mit höchstens so vielen verschiedenen Werten je Zeile -> category
+CATEGORY_RATIO = 0.5
+
+def _pd():
+    import pandas as pd
+    return pd
+
+def _np():
+    import numpy as np
+    return np
+
+def _arrow_strings(pd):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return pd.StringDtype("pyarrow")
+
+def _numbers(np, values):
+    # -> float-Array (leer = NaN) oder None, wenn ein Wert keine Zahl ist
+    a = np.array([np.nan if v == "" or v is None else v for v in values], dtype=object)
+    try:
+        return a.astype(float)
+    except (TypeError, ValueError):
+        return None
+
+def _ints(pd, np, a):
+    # ganzzahliges float-Array mit NaN -> nullable Int8 (bzw. Int16/Int32, falls nötig)
+    missing = np.isnan(a)
+    filled = a[~missing]
+    lo, hi = (filled.min(), filled.max()) if len(filled) else (0, 0)
+    dtype = next(t for t in (np.int8, np.int16, np.int32)
+                 if np.iinfo(t).min <= lo and hi <= np.iinfo(t).max)
+    return pd.arrays.IntegerArray(np.where(missing, 0, a).astype(dtype), missing)
+
+def typed_column(dtype, values, pd=None):
+    # Werteliste einer Spalte -> pandas.Series im kompakten Typ (siehe oben)
+    pd = pd or _pd()
+    np = _np()
+    if dtype in (FLAG, ORDINAL, FLOAT):
+        a = _numbers(np, values)
+        if a is None:
+            return pd.Series(values, dtype=object)
+        if dtype == FLOAT or (a[~np.isnan(a)] % 1 != 0).any():
+            return pd.Series(a.astype(np.float32))
+        return pd.Series(_ints(pd, np, a))
+    raw = pd.Series([None if v == "" else v for v in values], dtype=object)
+    blank = raw.isna()
+    if dtype == DATE:
+        out = pd.to_datetime(raw, format=DATE_FORMAT, errors="coerce")
+        return pd.Series(values, dtype=object) if (out.isna() & ~blank).any() else out.astype("datetime64[ns]")
+    filled = raw[~blank]
+    if filled.nunique() <= CATEGORY_RATIO * max(len(raw), 1):
+        return raw.astype("category")
+    strings = _arrow_strings(pd)
+    return raw.astype(strings) if strings is not None and filled.map(type).eq(str).all() else raw
+
+def typed_frame(keys, cols):
+    # {id: [werte…]} -> DataFrame (Index = Upsert-Schlüssel, Spalten wie im Studienblatt, ohne interne)
+    pd = _pd()
+    data = {cid: typed_column(SCHEMA[cid].dtype, cols[cid], pd) for cid in SCHEMA.layout_ids}
+    df = pd.DataFrame(data, columns=list(SCHEMA.layout_ids))
+    df.index = pd.Index(list(keys))
+    return df
+
+def object_frame(keys, cols):
+    # bisherige Form (alles object) – nur zum Vergleich des Speicherbedarfs
+    return _pd().DataFrame(cols, index=list(keys), columns=list(SCHEMA.layout_ids))
+
+def footprint(df):
+    # -> {dtype: bytes} inkl. Index, größte zuerst
+    usage = df.memory_usage(deep=True)
+    out = {"index": int(usage.pop("Index"))}
+    for cid, n in usage.items():
+        name = str(df[cid].dtype)
+        out[name] = out.get(name, 0) + int(n)
+    return dict(sorted(out.items(), key=lambda kv: -kv[1]))
+
+def human(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
@@ -0,0 +1,133 @@
+# incremental.py
+# Inkrementelles Neu-Parsen: Brief einfügen, Ergebnis ansehen, einen Wert im Text
+# korrigieren, nochmal klicken. ParseState merkt sich pro Brief die Zeilen und pro
+# Extraktor-Gruppe den Text ihres Abschnitts, den Zeilenstand davor und die Zellen,
+# die sie gesetzt hat. Eine neue Fassung wird Brief für Brief und Abschnitt für
+# Abschnitt mit der alten verglichen: unveränderte Briefe werden übernommen, in
+# geänderten laufen nur die Gruppen neu, deren Abschnitt berührt wurde (plus die
+# Gruppen über das ganze Dokument).
+#
+#   state = ParseState(cache=ParseCache())
+#   rows = state.update(text)                # wie parse_reports, Brief für Brief
+#   rows = state.update(text_korrigiert)     # nur Geändertes wird neu geparst
+#   state.update(text, limit=3)              # None, wenn mehr als 3 Briefe neu zu parsen wären
+from background import split_letters
+from derive import derive_row
+from report_parser import GROUPS, SCANNER, Rule, _group_view, init_row
+from schema import SCHEMA, Row
+from segmenter import segment
+
+# Anker können über das Abschnittsende hinausragen -> so viel Text gehört zum Vergleich dazu
+MARGIN = max(map(len, SCANNER.words), default=0)
+INDEX = SCHEMA.index
+
+class _Letter:
+    __slots__ = ("rows", "groups")
+
+    def __init__(self, rows, groups):
+        self.rows = rows      # [Row]
+        self.groups = groups  # (gruppe, abschnittstext) -> [(gelesene zellen, gesetzte zellen)]
+
+class _TracedRow(Row):
+    # merkt sich, welche Zellen eine Gruppe von außen liest (z.B. fill-Regeln,
+    # Klappen-Historie) und welche sie setzt
+    __slots__ = ("reads", "writes")
+
+    def __init__(self, values):
+        super().__init__(values)
+        self.reads, self.writes = {}, set()
+
+    def __getitem__(self, cid):
+        v = Row.__getitem__(self, cid)
+        if cid not in self.writes:
+            self.reads.setdefault(cid, v)
+        return v
+
+    def get(self, cid, default=None):
+        v = Row.get(self, cid, default)
+        if cid in INDEX and cid not in self.writes:
+            self.reads.setdefault(cid, v)
+        return v
+
+    def __setitem__(self, cid, value):
+        self.writes.add(cid)
+        Row.__setitem__(self, cid, value)
+
+class ParseState:
+    def __init__(self, cache=None):
+        # cache: parse_cache.ParseCache – Briefe, die schon der Hintergrund-Pool geparst hat
+        self.cache = cache
+        self._letters = {}    # brieftext -> _Letter (nur die zuletzt geparste Fassung)
+        self.stats = {"letters": 0, "reused": 0, "cached": 0, "parsed": 0, "groups_run": 0, "groups_reused": 0}
+
+    def update(self, text, limit=None, by_letter=False):
+        # -> Zeilen wie parse_reports (je Brief einzeln geparst, wie im Hintergrund-Pool);
+        # limit: höchstens so viele Briefe neu parsen, sonst None (Zustand bleibt unverändert)
+        # by_letter: [(brieftext, [Row])] statt einer flachen Liste (für das Quellarchiv)
+        letters = split_letters(text)
+        old, new, todo = self._letters, {}, []
+        reused = cached = 0
+        for letter in dict.fromkeys(letters):
+            hit = old.get(letter)
+            if hit is not None:
+                reused += 1
+            elif self.cache is not None:
+                rows = self.cache.get(letter)
+                if rows is not None:
+                    hit, cached = _Letter(rows, {}), cached + 1
+            if hit is None:
+                todo.append(letter)
+            else:
+                new[letter] = hit
+        if limit is not None and len(todo) > limit:
+            return None
+        # Gruppen geänderter bzw. verschwundener Briefe: Vorrat für die neuen Fassungen
+        spare = {}
+        for letter, state in old.items():
+            if letter not in new:
+                for key, runs in state.groups.items():
+                    spare.setdefault(key, []).extend(runs)
+        for letter in todo:
+            new[letter] = self._parse(letter, spare)
+            if self.cache is not None:
+                self.cache.put(letter, new[letter].rows)
+        for k, n in (("letters", len(letters)), ("reused", reused), ("cached", cached), ("parsed", len(todo))):
+            self.stats[k] += n
+        self._letters = new
+        if by_letter:
+            return [(letter, [Row(list(r.values)) for r in new[letter].rows]) for letter in letters]
+        return [Row(list(r.values)) for letter in letters for r in new[letter].rows]
+
+    def _parse(self, text, spare):
+        hits = SCANNER.scan(text)
+        groups = {}
+        return _Letter([self._parse_document(hits, doc, spare, groups) for doc in segment(text)], groups)
+
+    def _parse_document(self, hits, doc, spare, groups):
+        # wie report_parser._parse_document. Eine Gruppe hängt nur von ihrem Abschnittstext
+        # und den Zellen ab, die sie liest: stimmen beide mit einem alten Lauf überein,
+        # werden dessen Zellen übernommen, statt die Regeln erneut auszuführen
+        row, text = _TracedRow(init_row().values), hits.text
+        values = row.values
+        for group, kinds, steps in GROUPS:
+            view = _group_view(hits, doc, group, kinds)
+            if view is None:
+                continue
+            key = (group, text[max(view.start - 1, 0):view.end + MARGIN])
+            for reads, delta in spare.get(key, ()):
+                if all(values[i] == v for i, v in reads):
+                    for i, v in delta:
+                        values[i] = v
+                    self.stats["groups_reused"] += 1
+                    break
+            else:
+                row.reads, row.writes = {}, set()
+                for step in steps:
+                    (step.apply if isinstance(step, Rule) else step)(view, row)
+                reads = [(INDEX[c], v) for c, v in row.reads.items()]
+                delta = [(INDEX[c], values[INDEX[c]]) for c in row.writes]
+                self.stats["groups_run"] += 1
+            groups.setdefault(key, []).append((reads, delta))
+        row = Row(values)
+        derive_row(row)
+        return row
@@ -0,0 +1,178 @@
+# linkage.py
+# Patientenabgleich für den Upsert-Schlüssel: „Müller“ = „Mueller“, fehlendes
+# Geburtsdatum oder ein zweiter Brief zum selben Patienten sollen keine neue Zeile
+# erzeugen. Statt alle Paare zu vergleichen, bekommt jede Zeile Blocking-Schlüssel
+# (AufnahmeNr, Kölner Phonetik des Nachnamens + DOB, normalisierter Name); nur
+# Zeilen mit gemeinsamem Schlüssel werden mit same_patient() verglichen.
+#
+#   index = LinkIndex()
+#   index.match(ident)           # -> Schlüssel einer passenden Zeile oder None
+#   index.add(schlüssel, ident)
+#   clusters(idents)             # Bulk-Dedup: [[i, j, …], …] (Gruppen mit > 1 Zeile)
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+IDENT_COLS = ("surname", "first_name", "dob", "aufnahmenr")
+Ident = namedtuple("Ident", IDENT_COLS)
+
+_TRANSLIT = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NON_ALPHA = re.compile(r"[^a-z]")
+_DOB = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{2,4})")
+
+def normalize_name(name):
+    # „Müller-Lüdenscheidt“ / „Mueller Luedenscheidt“ -> "muellerluedenscheidt"
+    if not name:
+        return ""
+    name = str(name).strip().lower().translate(_TRANSLIT)
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return _NON_ALPHA.sub("", name)
+
+@lru_cache(maxsize=2**16)
+def normalize_dob(dob):
+    # "1.2.1950" -> "01.02.1950"; sonst unverändert (ohne Leerraum)
+    m = _DOB.fullmatch(str(dob or "").strip())
+    if not m:
+        return str(dob or "").strip()
+    d, mo, y = m.groups()
+    return f"{int(d):02d}.{int(mo):02d}.{y}"
+
+# ---------- Kölner Phonetik ----------
+_CODES = {**dict.fromkeys("aeijouy", "0"), "b": "1", "f": "3", "v": "3", "w": "3",
+          **dict.fromkeys("gkq", "4"), "l": "5", "m": "6", "n": "6", "r": "7", "s": "8", "z": "8"}
+
+def cologne(name):
+    # Kölner Phonetik (deutsche Aussprache): "Müller", "Mueller", "Miller" -> "657"
+    s = normalize_name(name).replace("ae", "a").replace("oe", "o").replace("ue", "u")
+    out, prev = [], None
+    for i, c in enumerate(s):
+        nxt = s[i + 1] if i + 1 < len(s) else ""
+        if c == "h":
+            code = None
+        elif c == "p":
+            code = "3" if nxt == "h" else "1"
+        elif c in "dt":
+            code = "8" if nxt in ("c", "s", "z") else "2"
+        elif c == "c":
+            if i == 0:
+                code = "4" if nxt and nxt in "ahkloqrux" else "8"
+            else:
+                code = "4" if nxt and nxt in "ahkoqux" and prev not in ("s", "z") else "8"
+        elif c == "x":
+            code = "8" if prev in ("c", "k", "q") else "48"
+        else:
+            code = _CODES.get(c)
+        prev = c
+        if code is not None:
+            out.append(code)
+    digits = "".join(out)
+    collapsed = [d for i, d in enumerate(digits) if i == 0 or d != digits[i - 1]]
+    return "".join(d for i, d in enumerate(collapsed) if d != "0" or i == 0)
+
+# ---------- Vergleich ----------
+Key = namedtuple("Key", "surname first phon_surname phon_first dob aufnahmenr")
+
+@lru_cache(maxsize=2**16)
+def _name(name):
+    # Namen wiederholen sich ständig -> normalisierte Form + Phonetik nur einmal rechnen
+    norm = normalize_name(name)
+    return norm, cologne(norm)
+
+def link_key(ident):
+    # Ident (Rohwerte) -> normalisierte Vergleichsform
+    return _link_key(tuple(ident))
+
+@lru_cache(maxsize=2**16)
+def _link_key(ident):
+    (surname, phon_surname), (first, phon_first) = _name(ident[0] or ""), _name(ident[1] or "")
+    return Key(surname, first, phon_surname, phon_first, normalize_dob(ident[2]), str(ident[3] or "").strip())
+
+def blocks(k):
+    # Blocking-Schlüssel: zwei Zeilen desselben Patienten (same_patient) teilen mindestens einen
+    out = []
+    if k.aufnahmenr:
+        out.append("a:" + k.aufnahmenr)
+    if k.phon_surname and k.dob:
+        out.append(f"d:{k.phon_surname}|{k.dob}")
+    if k.surname and k.first:
+        out.append(f"n:{k.surname}|{k.first}")
+    return out
+
+def same_patient(a, b):
+    # a, b: Key. Gleiche AufnahmeNr genügt; verschiedene Geburtsdaten schließen aus.
+    if a.aufnahmenr and a.aufnahmenr == b.aufnahmenr:
+        return True
+    if not (a.surname and b.surname):
+        return False
+    if a.dob and b.dob:
+        # Geburtsdatum gleich: Nachname klingt gleich, Vorname klingt gleich / fehlt / ist Initiale
+        if a.dob != b.dob or a.phon_surname != b.phon_surname:
+            return False
+        if not a.first or not b.first or a.phon_first == b.phon_first:
+            return True
+        return a.first.startswith(b.first) or b.first.startswith(a.first)
+    # ohne Geburtsdatum auf einer Seite: vollständiger Name muss (normalisiert) gleich sein
+    return bool(a.first) and (a.surname, a.first) == (b.surname, b.first)
+
+def pick(k, candidates):
+    # candidates: (schlüssel, Key) -> eindeutiger Treffer; gleiche AufnahmeNr entscheidet sofort,
+    # sonst lieber eine neue Zeile als zwei gleichnamige Patienten zu vermischen
+    found = set()
+    for key, other in candidates:
+        if k.aufnahmenr and k.aufnahmenr == other.aufnahmenr:
+            return key
+        if same_patient(k, other):
+            found.add(key)
+    return found.pop() if len(found) == 1 else None
+
+def merge_values(old, new, overwrite=False):
+    # Zellen zweier Zeilen desselben Patienten: leere füllen, mit overwrite gewinnt der neue Wert
+    return [n if n not in ("", None) and (overwrite or o in ("", None)) else o for o, n in zip(old, new)]
+
+def merge_ident(old, new, overwrite=False):
+    return Ident(*merge_values(old, new, overwrite))
+
+class LinkIndex:
+    # Blocking-Schlüssel -> Datensatz-Schlüssel; Kandidatensuche über dict statt Paarvergleich
+    def __init__(self):
+        self._blocks = {}   # block -> [schlüssel…]
+        self._idents = {}   # schlüssel -> Ident (aktueller, zusammengeführter Stand)
+        self._keys = {}     # schlüssel -> Key
+
+    def __len__(self):
+        return len(self._idents)
+
+    def match(self, ident):
+        # -> Schlüssel der passenden Zeile oder None (auch wenn mehrere in Frage kommen)
+        k = link_key(ident)
+        cands = dict.fromkeys(key for block in blocks(k) for key in self._blocks.get(block, ()))
+        return pick(k, ((key, self._keys[key]) for key in cands))
+
+    def add(self, key, ident):
+        # Eintrag setzen (aktueller Stand der Zeile); alte Blöcke bleiben, match prüft ja nach
+        ident = Ident(*ident)
+        self._idents[key] = ident
+        self._keys[key] = k = link_key(ident)
+        for block in blocks(k):
+            keys = self._blocks.setdefault(block, [])
+            if key not in keys:
+                keys.append(key)
+        return ident
+
+    def ident(self, key):
+        return self._idents[key]
+
+def clusters(idents, overwrite=False):
+    # Bulk-Dedup: idents in Tabellenreihenfolge -> Gruppen von Indizes desselben Patienten
+    # (nur Gruppen mit mehr als einer Zeile; erster Index = bleibende Zeile)
+    index, groups = LinkIndex(), {}
+    for i, ident in enumerate(idents):
+        j = index.match(ident)
+        if j is None:
+            j, groups[i] = i, [i]
+            index.add(i, ident)
+        else:
+            groups[j].append(i)
+            index.add(j, merge_ident(index.ident(j), ident, overwrite))
+    return [g for g in groups.values() if len(g) > 1]
@@ -0,0 +1,158 @@
+# parse_cache.py
+# Inhaltsadressierter Cache für parse_reports: Schlüssel = Hash aus normalisiertem
+# Text + Regelwerk-Version. Zwei Stufen: LRU im Speicher und optional SQLite auf
+# der Platte (mit Größenlimit). Ändert sich eine Regel-/Parser-Datei, ändert sich
+# RULES_VERSION und alte Einträge werden nie mehr getroffen (und später verdrängt).
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from report_parser import parse_reports
+from schema import Row
+
+# Dateien, deren Inhalt das Parse-Ergebnis bestimmt
+_VERSIONED = ("report_parser.py", "rule_engine.py", "segmenter.py", "schema.py", "derive.py",
+              "drug_lexicon.py", "drug_lexicon.csv")
+
+def _rules_version():
+    h = hashlib.sha256()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for name in _VERSIONED:
+        with open(os.path.join(base, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+RULES_VERSION = _rules_version()
+
+def normalize(text):
+    # Zeilenenden vereinheitlichen, Rand-Leerraum weg – sonst identische Briefe
+    # (z.B. aus Windows-Export oder mit Leerzeile am Ende) sollen denselben Schlüssel haben
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+def cache_key(text, version=RULES_VERSION):
+    return hashlib.sha256(f"{version}\0{text}".encode("utf-8", "surrogatepass")).hexdigest()
+
+class MemoryTier:
+    def __init__(self, max_items=256):
+        self.max_items = max_items
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            v = self._d.get(key)
+            if v is not None:
+                self._d.move_to_end(key)
+            return v
+
+    def put(self, key, value):
+        with self._lock:
+            self._d[key] = value
+            self._d.move_to_end(key)
+            while len(self._d) > self.max_items:
+                self._d.popitem(last=False)
+
+    def __len__(self):
+        return len(self._d)
+
+class SqliteTier:
+    # Einträge als zlib-komprimiertes JSON; über max_bytes werden die am längsten
+    # nicht gelesenen Einträge gelöscht. Mehrere Prozesse dürfen dieselbe Datei nutzen.
+    def __init__(self, path, max_bytes=256 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS parse_cache ("
+                         "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, atime REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS parse_cache_atime ON parse_cache(atime)")
+
+    def get(self, key):
+        with self._lock:
+            r = self._db.execute("SELECT value FROM parse_cache WHERE key=?", (key,)).fetchone()
+            if r is None:
+                return None
+            self._db.execute("UPDATE parse_cache SET atime=? WHERE key=?", (time.time(), key))
+        return json.loads(zlib.decompress(r[0]))
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?, ?)",
+                             (key, blob, len(blob), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # bis auf 90 % des Limits herunter, damit nicht bei jedem put gelöscht wird
+        excess = total - int(self.max_bytes * 0.9)
+        doomed, freed = [], 0
+        for key, size in self._db.execute("SELECT key, size FROM parse_cache ORDER BY atime"):
+            if freed >= excess:
+                break
+            doomed.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM parse_cache WHERE key=?", doomed)
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+class ParseCache:
+    # parse(text) wie parse_reports(text), aber gecacht. Gespeichert werden nur die
+    # Wertelisten der Zeilen; jeder Aufruf bekommt frische Row-Objekte.
+    def __init__(self, max_items=256, path=None, max_bytes=256 * 2**20, version=RULES_VERSION):
+        self.version = version
+        self.memory = MemoryTier(max_items)
+        self.disk = SqliteTier(path, max_bytes) if path else None
+        self.hits = self.misses = 0
+
+    def get(self, text):
+        # -> frische Rows oder None (text wie von normalize() geliefert)
+        key = cache_key(text, self.version)
+        values = self.memory.get(key)
+        if values is None and self.disk is not None:
+            values = self.disk.get(key)
+            if values is not None:
+                self.memory.put(key, values)
+        if values is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [Row(list(v)) for v in values]
+
+    def put(self, text, rows):
+        key = cache_key(text, self.version)
+        values = [list(r.values) for r in rows]
+        self.memory.put(key, values)
+        if self.disk is not None:
+            self.disk.put(key, values)
+
+    def parse(self, text, budget=None, profile=None):
+        if not text or not isinstance(text, str):
+            return []
+        text = normalize(text)
+        rows = self.get(text)
+        if rows is not None:
+            if profile is not None:
+                profile.cache_hits += 1
+            return rows
+        rows = parse_reports(text, budget, profile)
+        # abgebrochene Regeln -> unvollständiges Ergebnis, nicht cachen
+        if budget is None or not budget.timeouts:
+            self.put(text, rows)
+        return rows
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "memory": len(self.memory),
+                "disk": len(self.disk) if self.disk is not None else None, "version": self.version}
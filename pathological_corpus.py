@@ -0,0 +1,103 @@
+# pathological_corpus.py
+# Bösartige Eingaben für report_parser: Schlüsselwörter ohne passenden Abschluss,
+# die bei unbeschränkten Kontextsuchen (".*", ".*?" mit DOTALL) zu quadratischem
+# Backtracking führen. Prüft, dass die Parse-Zeit linear mit der Größe wächst.
+# Dazu Einfügefälle für die Dokumenttrennung (segmenter.py): kurze Briefe
+# verschiedener Patienten direkt hintereinander müssen getrennt bleiben.
+#
+#   python pathological_corpus.py            # Bericht + Exitcode 1 bei Superlinearität / falscher Trennung
+#   python pathological_corpus.py --sizes 25000 100000 200000
+import argparse
+import sys
+import time
+
+from report_parser import parse_reports
+
+# Bausteine: jeweils ein Stichwort, dessen Kontextmuster nie abgeschlossen wird
+UNITS = {
+    "rr_without_bis": "RR 120 ",
+    "cath_without_date": "Herzkatheter HK Koronarangiographie ",
+    "stenosis_without_grade": "LAD LCX RCA ",
+    "pci_without_vessel": "PCI Stent ",
+    "stress_without_end": "Stressechokardiographie unter Dobutamin Abbruchgrund Zielfrequenz Herzfrequenz ",
+    "date_lab_lookahead": "12.03.2023 " + "x" * 100 + "\n",
+    "echo_without_vom": "Echokardiographie CT MRT ",
+    "lab_without_colon": "GFR/CKD LDL-Cholesterin Hämoglobin NT-pro-BNP ",
+    "ratio_whitespace": "E" + " " * 200 + "/",
+    "name_like": "Aaaaaaaaaaaaaaaaaaaaaaaaaaaaaa Bbbbbbbbbbbbb ",
+}
+
+# Eingefügte Briefe -> erwartete Nachnamen je Zeile (Reihenfolge wie im Text)
+_SHORT_A = ("Muster, Anna geb. 01.02.1950 AufnahmeNr.: 123456\n"
+            "Sehr geehrte Kollegen, wir berichten über die o.g. Patientin.\n"
+            "Echokardiographie: LVEF 60 %.\n")
+_SHORT_B = ("Beispiel, Bernd geb. 03.04.1960 AufnahmeNr.: 654321\n"
+            "Sehr geehrte Kollegen, wir berichten über den o.g. Patient.\n"
+            "Echokardiographie: LVEF 35 %.\n")
+PASTED = {
+    "two_short_letters": (_SHORT_A + _SHORT_B, ["Muster", "Beispiel"]),
+    "trailing_page_header": (_SHORT_A + "Muster, Anna geb. 01.02.1950\n" + _SHORT_B, ["Muster", "Beispiel"]),
+    "same_dob_other_nr": (_SHORT_A + _SHORT_A.replace("Muster, Anna", "Meier, Anna").replace("123456", "777777"),
+                          ["Muster", "Meier"]),
+    "repeated_page_header": (_SHORT_A + "Muster, Anna geb. 01.02.1950\nLabor: Hb 12,1 g/dl\n", ["Muster"]),
+}
+
+def check_split(out=sys.stdout):
+    failed = []
+    for name, (text, expected) in PASTED.items():
+        got = [row["surname"] for row in parse_reports(text)]
+        if got != expected:
+            failed.append(name)
+        print(f"{name:32s} {'ok' if got == expected else f'FALSCH: {got} statt {expected}'}", file=out)
+    return failed
+
+def build(unit, size, newlines=False):
+    # Einheit wiederholen bis size Zeichen; newlines=False -> eine einzige Riesenzeile
+    sep = "\n" if newlines else ""
+    n = max(1, size // (len(unit) + len(sep)))
+    return (unit + sep) * n
+
+def corpus(sizes=(20_000, 80_000)):
+    for name, unit in UNITS.items():
+        for newlines in (False, True):
+            yield name + ("_lines" if newlines else ""), [build(unit, s, newlines) for s in sizes]
+
+def timed(text, repeat=1):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse_reports(text)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+def check(sizes=(20_000, 80_000), tolerance=2.5, repeat=3, out=sys.stdout):
+    # linear heißt: t(groß)/t(klein) <= (größe-verhältnis) * tolerance
+    # (quadratisch wäre (größe-verhältnis)²); kleine Zeiten werden nach unten begrenzt
+    growth = sizes[-1] / sizes[0]
+    failed = []
+    for name, texts in corpus(sizes):
+        times = [timed(t, repeat) for t in texts]
+        ratio = max(times[-1], 1e-3) / max(times[0], 1e-3)
+        ok = ratio <= growth * tolerance
+        if not ok:
+            failed.append(name)
+        print(f"{name:32s} " + " ".join(f"{t * 1000:9.1f} ms" for t in times)
+              + f"   x{ratio:5.1f} {'ok' if ok else 'SUPERLINEAR'}", file=out)
+    return failed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Prüft lineare Laufzeit von parse_report auf bösartigen Eingaben.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[20_000, 80_000])
+    ap.add_argument("--tolerance", type=float, default=2.5)
+    args = ap.parse_args(argv)
+    failed = check(tuple(args.sizes), args.tolerance)
+    if failed:
+        print(f"superlinear: {', '.join(failed)}", file=sys.stderr)
+    split = check_split()
+    if split:
+        print(f"falsch getrennt: {', '.join(split)}", file=sys.stderr)
+    return 1 if failed or split else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
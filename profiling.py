@@ -0,0 +1,113 @@
+# profiling.py
+# Opt-in Messung pro Extraktor-Gruppe / Regel: Laufzeit, Aufrufe, Treffer.
+# parse_report(s)(…, profile=Profile()) sammelt; ohne profile läuft der Parser
+# unverändert (eine None-Prüfung pro Schritt).
+#
+# Treffer = der Schritt hat mindestens eine Zelle mit einem echten Wert befüllt
+# (nicht "", 0 oder "0" – Flags/Defaults, die „nichts gefunden“ bedeuten).
+import json
+import time
+from contextlib import contextmanager
+
+_EMPTY = ("", None, 0, "0")
+
+def _account(stat, seconds, before, after):
+    stat[0] += 1
+    stat[1] += seconds
+    if any(a != b and b not in _EMPTY for a, b in zip(before, after)):
+        stat[2] += 1
+
+class Profile:
+    def __init__(self):
+        self.stats = {}       # (gruppe, regel) -> [aufrufe, sekunden, treffer]; regel "*" = ganze Gruppe
+        self.documents = 0
+        self.cache_hits = 0
+
+    def _stat(self, group, label):
+        stat = self.stats.get((group, label))
+        if stat is None:
+            stat = self.stats[(group, label)] = [0, 0.0, 0]
+        return stat
+
+    @contextmanager
+    def group(self, group, row):
+        # misst den ganzen Block einer Extraktor-Gruppe für ein Dokument
+        stat, before = self._stat(group, "*"), row.values.copy()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            _account(stat, time.perf_counter() - t0, before, row.values)
+
+    def timed(self, group, label, fn):
+        # fn(view, row) -> gemessene Variante mit Treffer-Erkennung
+        stat = self._stat(group, label)
+
+        def run(view, row):
+            before = row.values.copy()
+            t0 = time.perf_counter()
+            try:
+                fn(view, row)
+            finally:
+                _account(stat, time.perf_counter() - t0, before, row.values)
+        return run
+
+    def record(self, group, label, seconds, hit=False):
+        stat = self._stat(group, label)
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] += bool(hit)
+
+    # ---------- Auswertung ----------
+    def groups(self):
+        # -> {gruppe: {calls, seconds, hits}}; calls/hits = Dokumente, in denen die Gruppe lief/traf
+        return {g: {"calls": c, "seconds": s, "hits": h}
+                for (g, l), (c, s, h) in self.stats.items() if l == "*"}
+
+    def table(self, by="group"):
+        # Zeilen für Anzeige (st.dataframe / print): nach Zeit absteigend
+        if by == "group":
+            items = [{"group": g, **v} for g, v in self.groups().items()]
+        else:
+            items = [{"group": g, "rule": l, "calls": c, "seconds": s, "hits": h}
+                     for (g, l), (c, s, h) in self.stats.items() if l != "*"]
+        total = sum(i["seconds"] for i in items) or 1.0
+        for i in items:
+            i["ms_per_call"] = round(i["seconds"] * 1000 / i["calls"], 4) if i["calls"] else 0.0
+            i["share"] = round(i["seconds"] / total, 4)
+            i["hit_rate"] = round(i["hits"] / i["calls"], 4) if i["calls"] else 0.0
+            i["seconds"] = round(i["seconds"], 6)
+        return sorted(items, key=lambda i: -i["seconds"])
+
+    def merge(self, other):
+        # other: Profile oder to_dict()-Ergebnis (z.B. aus einem Worker-Prozess)
+        if isinstance(other, dict):
+            other = Profile.from_dict(other)
+        for key, (c, s, h) in other.stats.items():
+            stat = self._stat(*key)
+            stat[0] += c
+            stat[1] += s
+            stat[2] += h
+        self.documents += other.documents
+        self.cache_hits += other.cache_hits
+        return self
+
+    def to_dict(self):
+        return {"documents": self.documents, "cache_hits": self.cache_hits,
+                "stats": [[g, l, c, s, h] for (g, l), (c, s, h) in self.stats.items()]}
+
+    @classmethod
+    def from_dict(cls, d):
+        p = cls()
+        p.documents = d.get("documents", 0)
+        p.cache_hits = d.get("cache_hits", 0)
+        p.stats = {(g, l): [c, s, h] for g, l, c, s, h in d.get("stats", ())}
+        return p
+
+    def report(self):
+        return {"documents": self.documents, "cache_hits": self.cache_hits,
+                "groups": self.table("group"), "rules": self.table("rule")}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
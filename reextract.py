@@ -0,0 +1,146 @@
+# reextract.py
+# Neu-Extraktion aus dem Quellarchiv (store.py) nach Regeländerungen: alle Briefe,
+# die mit einer älteren RULES_VERSION geparst wurden, laufen parallel durch den
+# aktuellen Parser. Pro Zelle wird mit dem damaligen Ergebnis des Briefs verglichen,
+# zurückgeschrieben werden nur geänderte Zellen (von Hand korrigierte bleiben, siehe
+# SqliteDataset.apply_reparse). Bereits verarbeitete Briefe tragen danach die neue
+# Version – ein abgebrochener Lauf setzt beim nächsten Start einfach fort.
+#
+#   job = Reextraction(dataset, workers=8).start()   # Hintergrund-Thread (App)
+#   job.progress(); job.report()                     # -> (fertig, gesamt); [(spalte, geändert, übersprungen)]
+#   python reextract.py data/echo_dataset.db --workers 8 --report aenderungen.csv
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bulk_extract import parse_chunk
+from parse_cache import RULES_VERSION
+from schema import SCHEMA
+
+CHUNK_LETTERS = 32
+
+def _group(result):
+    # parse_chunk -> {hash: [wertelisten je dokument]} (quelle "hash", "hash#2", …), fehler
+    out, errors = {}, []
+    for source, row, err in result:
+        h = source.partition("#")[0]
+        if row is None:
+            errors.append((h, err))
+            out.pop(h, None)
+            continue
+        out.setdefault(h, []).append(list(row.values))
+    bad = {h for h, _ in errors}
+    return {h: rows for h, rows in out.items() if h not in bad}, errors
+
+class Reextraction:
+    def __init__(self, dataset, workers=None, chunk=CHUNK_LETTERS, version=RULES_VERSION):
+        self.dataset = dataset
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk = chunk
+        self.version = version
+        self.total = dataset.archive_stats(version)["stale"]
+        self.done = 0
+        self.rows = 0             # geänderte Zeilen
+        self.unmatched = 0        # Verknüpfungen, deren Dokument es nicht mehr gibt
+        self.changed, self.skipped = Counter(), Counter()
+        self.errors = []          # (hash, fehler) – bleiben auf alter Version, nächster Lauf versucht erneut
+        self.cancelled = False
+        self.finished = False
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.run, name="reextract", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def progress(self):
+        with self._lock:
+            return self.done, self.total
+
+    def run(self):
+        t0 = time.perf_counter()
+        # spawn wie background.ParsePool: in der App laufen schon Threads
+        ex = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        # Ergebnisse in Archiv-Reihenfolge anwenden: füllen zwei Briefe desselben Patienten
+        # dieselbe leere Zelle, gewinnt wie beim Einfügen der frühere
+        pending, after = deque(), 0
+        try:
+            while True:
+                while not self.cancelled and len(pending) < 2 * self.workers:
+                    letters = self.dataset.stale_letters(self.version, after, self.chunk)
+                    if not letters:
+                        break
+                    after = letters[-1][0]
+                    pending.append(ex.submit(parse_chunk, [(h, text) for _, h, text in letters]))
+                if not pending:
+                    break
+                self._apply(pending.popleft().result())
+        except Exception as e:  # z.B. abgestürzter Worker-Prozess: Rest bleibt für den nächsten Lauf
+            with self._lock:
+                self.errors.append(("", f"{type(e).__name__}: {e}"))
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+            self.seconds = time.perf_counter() - t0
+            self.finished = True
+
+    def _apply(self, result):
+        results, errors = _group(result)
+        out = self.dataset.apply_reparse(results, self.version)
+        with self._lock:
+            self.done += len(results) + len({h for h, _ in errors})
+            self.rows += out["rows"]
+            self.unmatched += out["unmatched"]
+            self.changed.update(out["changed"])
+            self.skipped.update(out["skipped"])
+            self.errors.extend(errors)
+
+    def report(self):
+        # -> [(spalten-id, kopfzeile, geändert, übersprungen)] in Schema-Reihenfolge, nur betroffene Spalten
+        with self._lock:
+            return [(cid, SCHEMA[cid].header, self.changed[cid], self.skipped[cid])
+                    for cid in SCHEMA.ids if self.changed[cid] or self.skipped[cid]]
+
+def write_report(job, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["column", "header", "changed", "skipped"])
+        w.writerows(job.report())
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Briefe aus dem Quellarchiv mit den aktuellen Regeln neu extrahieren.")
+    ap.add_argument("dataset", help="SQLite-Datei des Datensatzes (wie in der App unter data/)")
+    ap.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: CPU-Kerne)")
+    ap.add_argument("--chunk", type=int, default=CHUNK_LETTERS, help="Briefe pro Worker-Auftrag")
+    ap.add_argument("--report", metavar="CSV", help="Änderungen pro Spalte als CSV speichern")
+    ap.add_argument("-q", "--quiet", action="store_true", help="keine Fortschrittsanzeige")
+    args = ap.parse_args(argv)
+    from store import SqliteDataset
+    dataset = SqliteDataset(args.dataset)
+    job = Reextraction(dataset, args.workers, args.chunk).start()
+    while not job.finished:
+        time.sleep(0.5)
+        if not args.quiet:
+            print("\r%d/%d Briefe" % job.progress(), end="", file=sys.stderr)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"{job.done} Briefe in {job.seconds:.1f} s, {job.rows} Zeilen geändert, "
+          f"{sum(job.changed.values())} Zellen geschrieben, {sum(job.skipped.values())} übersprungen, "
+          f"{len(job.errors)} Fehler", file=sys.stderr)
+    for cid, _, changed, skipped in job.report():
+        print(f"  {cid:32} {changed:6} geändert {skipped:6} übersprungen", file=sys.stderr)
+    if args.report:
+        write_report(job, args.report)
+    dataset.close()
+    return 1 if job.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
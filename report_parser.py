@@ -1,6 +1,12 @@
 # parser.py
 import re
-from datetime import datetime
+import time
+
+from derive import derive_row
+from drug_lexicon import LEXICON
+from rule_engine import DATE, Hits, Rule, Flag, Choice, DateNear, Scanner, iter_rules
+from schema import SCHEMA
+from segmenter import segment
 
 # ---------- Helpers ----------
 DEC = r"\d+(?:[.,]\d+)?"
@@ -11,21 +17,6 @@ def num(s):
 def to_int(s):
     try: return int(float(str(s).replace(",", ".")))
     except: return None
-def bsa_mosteller(height_cm, weight_kg):
-    if not height_cm or not weight_kg: return None
-    try:
-        return round(((height_cm * weight_kg) / 3600.0) ** 0.5, 2)
-    except: return None
-def first(txt, *groups):
-    for g in groups:
-        if g: return g
-    return None
-def find_date_near_keyword(text, kw_regex):
-    m = re.search(rf"{kw_regex}[^0-9]{{0,40}}(\d{{2}}\.\d{{2}}\.\d{{4}})", text, re.IGNORECASE|re.DOTALL)
-    return m.group(1) if m else None
-def find_any_date(text):
-    m = re.search(r"(\d{2}\.\d{2}\.\d{4})", text)
-    return m.group(1) if m else None
 
 # Roman/arabisch (I–V oder 1–5)
 def _grade_from_roman_or_digit(token: str, max_scale=5):
@@ -38,470 +29,478 @@ def _grade_from_roman_or_digit(token: str, max_scale=5):
         return token
     return None
 
-def _extract_grade(text, pattern, max_scale=5):
-    # … „Grad II“, „II°“, römisch/arabisch, MR/MI, TR/TI etc.
-    regex = rf"(?:{pattern})\s*(?:Grad\s*)?(I{{1,3}}|IV|V|\d)"
-    m = re.search(regex, text, re.IGNORECASE)
-    if not m: return None
-    return _grade_from_roman_or_digit(m.group(1), max_scale=max_scale)
-
 # ---------- Row template (ALL columns) ----------
+# Spalten, IDs und Datentypen: schema.py. Regeln schreiben in Spalten-IDs;
+# die Kopfzeilen des Studienblatts (auch doppelte wie "date") gibt es über
+# SCHEMA.headers bzw. Row.by_header().
 def init_row():
-    cols = [
-        "surname","first name","DOB","Aufnahmenr",
-        "Date \nStressecho; positiv-> mark green",
-        "kind of FU\n1=in house\n2=tel/Tod\n3=to be done",
-        "Follow-Up\ndeceased=0\nHKU/CT only=1\nTTE/clinical only=2\nboth=3",
-        "Indikation\nStressecho\n0=khk\n1=AS\n2=AV-Klappen\n3=HFpEF",
-        "sex\n0=male\n1=female","size","weight","KOF","CVRF",
-        "hyperten\nno=0\nyes=1","diabetes\nno=0\nyes=1","dyslipid\nno=0\nyes=1",
-        "Heart failure diagnosis?","AF\nno=0\nparox=1\npers=2\nperm=3",
-        "PM\nno=0\n1-C-PM=1\n2-C-PM=2\nCRT=3\nICD=4",
-        "chronic lung\n disease\nno=0\nyes=1",
-        "previous known ICM\nno=0\n1-GE=1; 2-GE=2; 3-GE=3",
-        "prior MI\nno=0\nyes=1","prior PCI\nno=0\nyes=1","prior CABG\nno=0\nyes=1",
-        "valve intervention/ surgery\nno=0\nyes=1","valve history freetext","NYHA",
-        "smoking\nnever=0\nformer=1\ncurrent=2\n","Medication",
-        "APT\nno=0\nASS=1\nP2y=2\nDAPT=3","OAK","RAASi","ARNI","Betablocker","MRA","SGLT2","Diuretics","Statin",
-        "labs\nbaseline","GFR","LDL-C","Hb","NTproBNP",
-        "labs latest\nfollow-up","date","GFR","LDL-C","Hb","NTproBNP",
-        "rest echo\nbaseline","date","rhythm\nSR=0\nAF=1\nHSM=2","LVEF","LVEDV","LVESV","TAPSE","LAVI",
-        "MR\n0-3","TR\n0-5","E/A","E/e'","e' reduced\nno=0\nyes=1",
-        "TR Vmax\n0= <2,8\n1= >2,8","AS\n0-3","AS\nPmean","AS\nKÖF","AI\n0-3",
-        "wall motion\nrest ","anterior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "antero- \nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "antero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "inferior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "infero-\nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "infero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "global hypokinesie\nno=0\nyes=1","number of segments with ischemia",
-        "stress echo\nbaseline","date","dynamic=0\ndobut=1","dobutamin max dose ug/kgKG",
-        "Heart rate max","Heart rate aim reached?\nNo=0\nyes=1",
-        "RR sys rest","RR dia rest","RR sys max","RR dia max","Watt","MET",
-        "dyspnoe\nno=0\nyes=1","AP\nno=0\nyes=1","muscular \nfatigue\nno=0\nyes=1",
-        "ended prema-turely\nno=0; dyspnoe=1; AP=2; muscular=3; other=4",
-        "insufficient image quality\nno=0\nyes=1","Freetext ",
-        "LA-reservoir \nstrain BL","LA conduit-\nstrain","LA booster \npump","LV-strain \n(GLS)",
-        "MR 0-3","TR 0-5","LVOT SV\nrest","LVOT SVI rest\nRechner","LVOT SVI \nrest",
-        "LVOT SV\nmax","LVOT SVI max\nRechner","SVI max",
-        "AS Pmean max\n(mmHg)","AS KÖF min\n(cm2)",
-        "wall motion\nstress ","anterior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "antero- \nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "antero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "inferior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "infero-\nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "infero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        "number of segments with ischemia",
-        "first CT after \nbaseline echo","date of CT",
-        "stenosis >50%\nLAD\nno=0\nyes=1","stenosis >50%\nLCX\nno=0\nyes=1",
-        "stenosis >50%\nLM\nno=0\nyes=1","stenosis >50%\nRCA\nno=0\nyes=1",
-        "wall motion abnormality in baseline SE aligns\nno=0\nyes=1",
-        "first MRT after baseline SE","date of MRT","perfusion deficit LAD","perfusion deficit LCX","perfusion deficit RCA","deficit aligns with SE",
-        "first cath after \nbaseline echo","date of cath",
-        "stenosis >50%\nLAD\nno=0\nyes=1","stenosis >/=50%\nLCX\nno=0\nyes=1","stenosis >50%\nLM\nno=0\nyes=1","stenosis >50%\nRCA\nno=0\nyes=1",
-        "wall motion abnormality in baseline SE aligns\nno=0\nyes=1",
-        "revasc\nno=0\nyes=1","Bypass\nno=0\nyes=1","revasc/ surgery freetext",
-        "PCI\nLAD\nno=0\nyes=1 ","PCI\nLCX\nno=0\nyes=1 ","PCI\nLM\nno=0\nyes=1 ","PCI\nRCA\nno=0\nyes=1 ",
-        "AS\nONLY (discharge=   hospitalization for TAVI)","TAVI\nno=0\nyes=date ","Aortenkl- surgery\nno=0\nyes=date",
-        "Pmean discharge","KÖF discharge","AS 0-3 discharge","AR 0-3 discharge",
-        "latest\nfollow-up","date of \nlatest FU","alive=0\ndeceased= date","cause of death",
-        "heart failure hospitalisation\nnumber since baseline","date of first\n HF hospitalisation after baseline",
-        "myocardial infarction after baseline\nno=0\nyes=1","coronary intervention since initial cath\nno=0\nyes=1",
-        "CABG since initial cath\nno=0\nyes=1","freetext intervention/ surgery",
-        "heart Failure diagnosis\nno=0\nyes=1 ","date of HF diagnosis if new since baseline ",
-        "AF\nno=0\nparox=1\npers=2\nperm=3","NYHA class",
-        "echo\nlatest follow up","date of latest follow up echo","rhythm\nSR=0\nAF=1\nHSM=2, others=3",
-        "LVEF","LVEDV","LVESV","TAPSE","LAVI","MR\n0-3","TR\n0-5",
-        "AV-valve intervention new, freetext ","E/A","E/e'","e' reduced\nno=0\nyes=1",
-        "TR Vmax","AS\n0-3","AS\nPmean","AS\nKÖF (nicht indiziert)","AI\n0-3"
-    ]
-    return {c: "" for c in cols}
-
-# ---------- Main parser ----------
-def parse_report(text: str) -> dict:
-    row = init_row()
-    if not text or not isinstance(text, str):
-        return row
+    return SCHEMA.new_row()
+
+# ---------- Regelwerk ----------
+# Deklarativ: Zielspalte -> kompiliertes Muster (+ Nachbearbeitung). Alle Regeln
+# werden einmal beim Import kompiliert; parse_report scannt den Text genau einmal
+# (siehe rule_engine.Scanner) und füllt die Zeile dann aus den Treffern.
+SEX = "sex"
+AF = "af"
+PM = "pm"
+ICM = "icm"
+VALVE = "valve_intervention"
+SMOKING = "smoking"
+APT = "apt"
+RHYTHM = "echo_bl_rhythm"
+ENDED = "se_ended_early"
+NYHA_MAP = {"I":"1","II":"2","III":"3","IV":"4"}
+
+# Kontextfenster (Zeichen) für alle „Stichwort … Wert“-Suchen. Statt ".*" / ".*?"
+# (mit DOTALL über den ganzen Brief) bleibt jede Regel so im schlechtesten Fall
+# linear in der Textlänge – siehe pathological_corpus.py.
+NEAR = 80     # Angabe in derselben Zeile / im selben Satz
+WINDOW = 250  # über mehrere Zeilen (Stressecho-Protokoll)
+def _gap(n): return f".{{0,{n}}}?"   # kürzester Abstand (ersetzt .*?)
+def _span(n): return f".{{0,{n}}}"   # längster Abstand (ersetzt .*)
+
+STENOSIS = r"(> ?50|signifikant|Stenose)"
+def _vessel_pci(vessel): return "PCI"+_span(NEAR)+vessel+"|Stent"+_span(NEAR)+vessel
+
+# Segment-Spalten (Ruhe); Stress-Spalten: gleiche Namen mit Präfix wm_stress_
+SEG_COLS = {
+    r"antero[- ]?septal": "wm_rest_anteroseptal",
+    r"antero[- ]?lateral": "wm_rest_anterolateral",
+    r"\banterior\b":       "wm_rest_anterior",
+    r"infero[- ]?septal":  "wm_rest_inferoseptal",
+    r"infero[- ]?lateral": "wm_rest_inferolateral",
+    r"\binferior\b":       "wm_rest_inferior",
+}
+
+def _int(m): return to_int(next((g for g in m.groups() if g), None))
+def _dec(m): return str(num(m.group(1)))
+
+def _grade(col, pattern, max_scale=5):
+    # … „Grad II“, „II°“, römisch/arabisch, MR/MI, TR/TI etc.
+    return Rule(col, rf"(?:{pattern})\s*(?:Grad\s*)?(I{{1,3}}|IV|V|\d)",
+                lambda m: _grade_from_roman_or_digit(m.group(1), max_scale=max_scale))
 
-    # --- Personen/Meta ---
-    m_name = re.search(r"([A-ZÄÖÜ][a-zäöüß-]+),\s*([A-ZÄÖÜ][a-zäöüß-]+)", text)
-    if m_name:
-        row["surname"] = m_name.group(1)
-        row["first name"] = m_name.group(2)
+def _nyha(m):
+    a, b = (g.upper() if g else g for g in m.group(1, 2))
+    if a not in NYHA_MAP or (b and b not in NYHA_MAP): return None
+    return str((float(NYHA_MAP[a])+float(NYHA_MAP[b]))/2) if b else NYHA_MAP[a]
 
-    m_dob = re.search(r"geb\.?\s*(\d{2}\.\d{2}\.\d{4})", text, re.IGNORECASE)
-    if m_dob: row["DOB"] = m_dob.group(1)
+def _rr_max(m):
+    vals = [g for g in m.group(0, *range(1, 5))[1:] if g]
+    return (to_int(vals[0]), to_int(vals[1])) if len(vals)>=2 else None
 
-    m_aufn = re.search(r"AufnahmeNr\.?\s*:\s*(\d+)", text, re.IGNORECASE)
-    if m_aufn: row["Aufnahmenr"] = m_aufn.group(1)
+def _valve_hist(m): return re.sub(r"\s+", " ", m.group(1)).strip()
 
+# --- Personen/Meta ---
+DEMOGRAPHICS = [
+    Rule(("surname","first_name"), r"([A-ZÄÖÜ][a-zäöüß-]+),\s*([A-ZÄÖÜ][a-zäöüß-]+)", lambda m: m.group(1, 2), flags=0),
+    Rule("dob", rf"geb\.?\s*({DATE})"),
+    Rule("aufnahmenr", r"AufnahmeNr\.?\s*:\s*(\d+)"),
     # Sex aus „Patientin/Patient“
-    if re.search(r"\bPatientin\b", text, re.IGNORECASE):
-        row["sex\n0=male\n1=female"] = 1
-    elif re.search(r"\bPatient\b", text, re.IGNORECASE):
-        row["sex\n0=male\n1=female"] = 0
-
-    # Größe / Gewicht / KOF
-    m_height = re.search(r"Größ(?:e|\.)\s*(\d{2,3})\s*cm", text, re.IGNORECASE)
-    if m_height: row["size"] = to_int(m_height.group(1))
-    m_weight = re.search(r"Gewicht\s*(\d{2,3})\s*kg", text, re.IGNORECASE)
-    if m_weight: row["weight"] = to_int(m_weight.group(1))
-    if row["size"] and row["weight"]:
-        row["KOF"] = bsa_mosteller(row["size"], row["weight"])
-
-    # CVRFs
-    row["hyperten\nno=0\nyes=1"] = 1 if re.search(r"Hyperton", text, re.IGNORECASE) else 0
-    row["diabetes\nno=0\nyes=1"] = 1 if re.search(r"Diabetes|HbA1c", text, re.IGNORECASE) else 0
-    row["dyslipid\nno=0\nyes=1"] = 1 if re.search(r"Hyperlipid|LDL|Statin", text, re.IGNORECASE) else 0
-    row["chronic lung\n disease\nno=0\nyes=1"] = 1 if re.search(r"COPD|Asthma", text, re.IGNORECASE) else 0
-
-    # HF Diagnose
-    row["Heart failure diagnosis?"] = 1 if re.search(r"Herzinsuffizienz|HFmrEF|HFrEF|HFpEF", text, re.IGNORECASE) else 0
-
-    # AF
-    if re.search(r"permanent(?:es)? Vorhofflimmern|perm\.*\s*VHF", text, re.IGNORECASE):
-        row["AF\nno=0\nparox=1\npers=2\nperm=3"] = 3
-    elif re.search(r"persistierend(?:es)? Vorhofflimmern|persist", text, re.IGNORECASE):
-        row["AF\nno=0\nparox=1\npers=2\nperm=3"] = 2
-    elif re.search(r"paroxysmal(?:es)? Vorhofflimmern|parox", text, re.IGNORECASE):
-        row["AF\nno=0\nparox=1\npers=2\nperm=3"] = 1
-    elif re.search(r"Vorhofflimmern|VHF|AF", text, re.IGNORECASE):
-        row["AF\nno=0\nparox=1\npers=2\nperm=3"] = 1  # fallback
-
-    # Devices
-    if re.search(r"\bCRT(?:-D|D)?\b", text, re.IGNORECASE):
-        row["PM\nno=0\n1-C-PM=1\n2-C-PM=2\nCRT=3\nICD=4"] = 3
-    elif re.search(r"\bICD\b", text):
-        row["PM…"] = 4
-    elif re.search(r"2-?K(?:ammer)?-?Schrittmacher|Dual|DDD|DDIR", text, re.IGNORECASE):
-        row["PM\nno=0\n1-C-PM=1\n2-C-PM=2\nCRT=3\nICD=4"] = 2
-    elif re.search(r"1-?K(?:ammer)?-?Schrittmacher|VVI|AAI", text, re.IGNORECASE):
-        row["PM\nno=0\n1-C-PM=1\n2-C-PM=2\nCRT=3\nICD=4"] = 1
-    else:
-        row["PM\nno=0\n1-C-PM=1\n2-C-PM=2\nCRT=3\nICD=4"] = 0
-
+    Choice(SEX, [(r"\bPatientin\b", 1), (r"\bPatient\b", 0)]),
+    # Größe / Gewicht (KOF -> derive.py)
+    Rule("size", r"Größ(?:e|\.)\s*(\d{2,3})\s*cm", _int),
+    Rule("weight", r"Gewicht\s*(\d{2,3})\s*kg", _int),
+]
+
+# --- CVRFs / Vorgeschichte ---
+CVRF = [
+    Flag("hypertension", r"Hyperton"),
+    Flag("diabetes", r"Diabetes|HbA1c"),
+    Flag("dyslipidemia", r"Hyperlipid|LDL|Statin"),
+    Flag("lung_disease", r"COPD|Asthma"),
+    Flag("hf_diagnosis", r"Herzinsuffizienz|HFmrEF|HFrEF|HFpEF"),
     # KHK/HKU Vorgeschichte
-    if re.search(r"\b(\d)\s*-\s*G(?:efäßerkrankung|E)\b", text):
-        row["previous known ICM\nno=0\n1-GE=1; 2-GE=2; 3-GE=3"] = to_int(re.search(r"\b(\d)\s*-\s*G", text).group(1))
-    elif re.search(r"Eingefäßerkrankung|1-GE", text, re.IGNORECASE):
-        row["previous known ICM…"] = 1
-    elif re.search(r"2-?GE|Zwei-Gefäß", text, re.IGNORECASE):
-        row["previous known ICM…"] = 2
-    elif re.search(r"3-?GE|Drei-Gefäß", text, re.IGNORECASE):
-        row["previous known ICM…"] = 3
-    else:
-        row["previous known ICM…"] = 0
-
-    row["prior MI\nno=0\nyes=1"] = 1 if re.search(r"Myokardinfarkt|STEMI|NSTEMI", text, re.IGNORECASE) else 0
-    row["prior PCI\nno=0\nyes=1"] = 1 if re.search(r"PCI|DES-Implantation|Stent", text, re.IGNORECASE) else 0
-    row["prior CABG\nno=0\nyes=1"] = 1 if re.search(r"Bypass|ACVB|CABG", text, re.IGNORECASE) else 0
-
-    # Klappen-OP/TAVI
-    if re.search(r"\bTAVI\b|Transkatheter-Aortenklappenimplantation", text, re.IGNORECASE) or \
-       re.search(r"Aortenklappenersatz|Mitralklappenrekonstruktion|TKR mittels Ring|MitraClip|Annuloplastie", text, re.IGNORECASE):
-        row["valve intervention/ surgery\nno=0\nyes=1"] = 1
-        # Freitext History (kurz)
-        m_hist = re.search(r"(Z\.n\..{0,200}?(?:Valve|Ring|AKE|TKR|Mitra|TAVI).{0,120})", text, re.IGNORECASE|re.DOTALL)
-        if m_hist: row["valve history freetext"] = re.sub(r"\s+", " ", m_hist.group(1)).strip()
-    else:
-        row["valve intervention/ surgery…"] = 0
-
+    Choice(ICM, [
+        (r"(?-i:\b(\d)\s*-\s*G(?:efäßerkrankung|E)\b)", lambda m: to_int(m.group(1))),
+        (r"Eingefäßerkrankung|1-GE", 1),
+        (r"2-?GE|Zwei-Gefäß", 2),
+        (r"3-?GE|Drei-Gefäß", 3),
+    ], default=0),
+    Flag("prior_mi", r"Myokardinfarkt|STEMI|NSTEMI"),
+    Flag("prior_pci", r"PCI|DES-Implantation|Stent"),
+    Flag("prior_cabg", r"Bypass|ACVB|CABG"),
+    # Klappen-OP/TAVI (+ Freitext History kurz)
+    Choice(VALVE, [(r"\bTAVI\b|Transkatheter-Aortenklappenimplantation|Aortenklappenersatz|"
+                    r"Mitralklappenrekonstruktion|TKR mittels Ring|MitraClip|Annuloplastie", 1)], default=0),
     # NYHA (auch Spannen)
-    m_nyha = re.search(r"NYHA\s*(I{1,4})(?:\s*(?:[-/–]|bis)\s*(I{1,4}))?", text, re.IGNORECASE)
-    if m_nyha:
-        a, b = m_nyha.group(1,2)
-        mapping = {"I":"1","II":"2","III":"3","IV":"4"}
-        row["NYHA"] = (str((float(mapping[a])+float(mapping[b]))/2) if b else mapping[a])
-
+    Rule("nyha", r"NYHA\s*(I{1,4})(?:\s*(?:[-/–]|bis)\s*(I{1,4}))?", _nyha),
     # Rauchen
-    if re.search(r"Ex-?\s*(Nikotin|Raucher)|Ex-Nikotinabusus|Former smoker", text, re.IGNORECASE):
-        row["smoking\nnever=0\nformer=1\ncurrent=2\n"] = 1
-    elif re.search(r"Nikotinabusus|Raucher\b", text, re.IGNORECASE):
-        row["smoking…"] = 2
-    elif re.search(r"Nichtraucher", text, re.IGNORECASE):
-        row["smoking…"] = 0
-
-    # Medikation (für APT/OAK/RAASi/… Marker)
-    meds_block = []
-    for line in text.splitlines():
-        if re.search(r"Medikament|Medikation|ASS|Apixaban|Edoxaban|Phenprocoumon|Falithrom|Apixaban|Rivaroxaban|Warfarin|\
-Simvastatin|Atorvastatin|Rosuvastatin|Pravastatin|Candesartan|Valsartan|Enalapril|Ramipril|Sacubitril|Carvedilol|Bisoprolol|Nebivolol|\
-Spironolacton|Eplerenon|Dapagliflozin|Empagliflozin|Torasemid|Furosemid|HCT", line, re.IGNORECASE):
-            meds_block.append(line.strip())
-    row["Medication"] = " | ".join(meds_block)[:1000]
-
-    has_ASS = bool(re.search(r"\bASS\b|Aspirin", text, re.IGNORECASE))
-    has_P2Y = bool(re.search(r"Clopidogrel|Prasugrel|Ticagrelor", text, re.IGNORECASE))
-    row["APT\nno=0\nASS=1\nP2y=2\nDAPT=3"] = 3 if (has_ASS and has_P2Y) else (1 if has_ASS else (2 if has_P2Y else 0))
-    row["OAK"] = 1 if re.search(r"Apixaban|Rivaroxaban|Edoxaban|Dabigatran|Phenprocoumon|Falithrom|Warfarin", text, re.IGNORECASE) else 0
-    row["RAASi"] = 1 if re.search(r"Ramipril|Enalapril|Lisinopril|Perindopril|Candesartan|Valsartan|Olmesartan|Losartan", text, re.IGNORECASE) else 0
-    row["ARNI"] = 1 if re.search(r"Sacubitril|Entresto", text, re.IGNORECASE) else 0
-    row["Betablocker"] = 1 if re.search(r"Bisoprolol|Nebivolol|Metoprolol|Carvedilol|Atenolol|Betablocker", text, re.IGNORECASE) else 0
-    row["MRA"] = 1 if re.search(r"Spironolacton|Eplerenon", text, re.IGNORECASE) else 0
-    row["SGLT2"] = 1 if re.search(r"Dapagliflozin|Empagliflozin|Ertugliflozin|SGLT2", text, re.IGNORECASE) else 0
-    row["Diuretics"] = 1 if re.search(r"Torasemid|Furosemid|Hydrochlorothiazid|HCT|Diuret", text, re.IGNORECASE) else 0
-    row["Statin"] = 1 if re.search(r"Simvastatin|Atorvastatin|Rosuvastatin|Pravastatin|Statin", text, re.IGNORECASE) else 0
-
-    # ----- Labs (Baseline & Follow-up) -----
-    def _grab_lab(pattern, key, dest_row):
-        m = re.search(pattern, text, re.IGNORECASE)
-        if m:
-            dest_row[key] = str(num(m.group(1)))
+    Choice(SMOKING, [
+        (r"Ex-?\s*(Nikotin|Raucher)|Ex-Nikotinabusus|Former smoker", 1),
+        (r"Nikotinabusus|Raucher\b", 2),
+        (r"Nichtraucher", 0),
+    ]),
+]
+VALVE_HIST = Rule("valve_history", r"(Z\.n\..{0,200}?(?:Valve|Ring|AKE|TKR|Mitra|TAVI).{0,120})",
+                  _valve_hist, flags=re.IGNORECASE|re.DOTALL)
+
+AF_RULES = [
+    Choice(AF, [
+        (r"permanent(?:es)? Vorhofflimmern|perm\.*\s*VHF", 3),
+        (r"persistierend(?:es)? Vorhofflimmern|persist", 2),
+        (r"paroxysmal(?:es)? Vorhofflimmern|parox", 1),
+        (r"Vorhofflimmern|VHF|AF", 1),  # fallback
+    ]),
+]
+
+DEVICES = [
+    Choice(PM, [
+        (r"\bCRT(?:-D|D)?\b", 3),
+        (r"(?-i:\bICD\b)", 4),
+        (r"2-?K(?:ammer)?-?Schrittmacher|Dual|DDD|DDIR", 2),
+        (r"1-?K(?:ammer)?-?Schrittmacher|VVI|AAI", 1),
+    ], default=0),
+]
+
+# --- Medikation (für APT/OAK/RAASi/… Marker) ---
+# Medikamentennamen + Wirkstoffklassen: drug_lexicon.csv (ein Scan, keine Regex pro Klasse)
+MED_MARKER = Rule(None, r"Medikament|Medikation")
+CLASS_COLS = {"oak": "oak", "raasi": "raasi", "arni": "arni", "betablocker": "betablocker", "mra": "mra",
+              "sglt2": "sglt2", "diuretic": "diuretics", "statin": "statin"}
+
+# --- Labs (Baseline & Follow-up) ---
+def _lab_values(prefix):
+    return [
+        Rule(prefix+"_gfr", r"GFR[\/ ]?\/?CKD"+_gap(NEAR)+r":\s*("+DEC+")", _dec),
+        Rule(prefix+"_ldl", r"LDL[- ]?Cholesterin"+_gap(NEAR)+r":\s*("+DEC+")", _dec),
+        Rule(prefix+"_hb", r"\bHämoglobin\b"+_gap(NEAR)+r":\s*("+DEC+")", _dec),
+        Rule(prefix+"_ntprobnp", r"(?:NT-?pro-?BNP|N-?terminales pro BNP)"+_gap(NEAR)+r":\s*("+DEC+")", _dec),
+    ]
+LABS = [
     # baseline block marker (wenn ausdrücklich „Labor:“)
-    if re.search(r"\bLabor\b[:\s]", text, re.IGNORECASE):
-        row["labs\nbaseline"] = 1
-    _grab_lab(r"GFR[\/ ]?\/?CKD.*?:\s*("+DEC+")", "GFR", row)
-    _grab_lab(r"LDL[- ]?Cholesterin.*?:\s*("+DEC+")", "LDL-C", row)
-    _grab_lab(r"\bHämoglobin\b.*?:\s*("+DEC+")", "Hb", row)
-    _grab_lab(r"(?:NT-?pro-?BNP|N-?terminales pro BNP).*?:\s*("+DEC+")", "NTproBNP", row)
-
-    # follow-up lab with date near the lab list
-    m_follow_date = re.search(r"\b(\d{2}\.\d{2}\.\d{4})\b(?:(?!\n\n).){0,120}Kalium|LDL|GFR|NT-?pro", text, re.IGNORECASE|re.DOTALL)
-    if m_follow_date:
-        row["labs latest\nfollow-up"] = 1
-        row["date"] = m_follow_date.group(1)
-        _grab_lab(r"GFR[\/ ]?\/?CKD.*?:\s*("+DEC+")", "GFR", row)           # same text scope, ok
-        _grab_lab(r"LDL[- ]?Cholesterin.*?:\s*("+DEC+")", "LDL-C", row)
-        _grab_lab(r"\bHämoglobin\b.*?:\s*("+DEC+")", "Hb", row)
-        _grab_lab(r"(?:NT-?pro-?BNP|N-?terminales pro BNP).*?:\s*("+DEC+")", "NTproBNP", row)
-
-    # ----- Echo baseline (rest) -----
-    base_date = find_date_near_keyword(text, r"Echokardiographie.*?vom") or find_any_date(text)
-    if base_date: row["date"] = base_date
-
-    # Rhythm
-    if re.search(r"\bSR\b|Sinusrhythmus", text, re.IGNORECASE):
-        row["rhythm\nSR=0\nAF=1\nHSM=2"] = 0
-    elif re.search(r"\bVHF\b|Vorhofflimmern|\bAF\b", text, re.IGNORECASE):
-        row["rhythm…"] = 1
-    elif re.search(r"Schrittmacher|HSM|VVI|DDD|DDIR", text, re.IGNORECASE):
-        row["rhythm…"] = 2
-
+    Choice("labs_bl", [(r"\bLabor\b[:\s]", 1)]),
+    *_lab_values("labs_bl"),
+]
+# Follow-up: letzter Laborabschnitt, nur wenn das Dokument mehrere hat (s. LATEST)
+LABS_FU_GATE = Rule(None, r"GFR|LDL|Hämoglobin|NT-?pro|Kalium")
+LABS_FU = [DateNear("labs_fu_date", r"Labor"+_gap(NEAR)+r"(?:vom|am)"), *_lab_values("labs_fu")]
+
+# --- Echo baseline (rest) ---
+REST_ECHO = [
+    DateNear("echo_bl_date", r"Echokardiographie"+_gap(NEAR)+"vom"),
+    Choice(RHYTHM, [
+        (r"\bSR\b|Sinusrhythmus", 0),
+        (r"\bVHF\b|Vorhofflimmern|\bAF\b", 1),
+        (r"Schrittmacher|HSM|VVI|DDD|DDIR", 2),
+    ]),
     # EF / Volumina / TAPSE / LAVI
-    m_ef = re.search(r"EF(?:\s*biplan)?\s*(\d{1,2})\s*%", text, re.IGNORECASE)
-    if m_ef: row["LVEF"] = to_int(m_ef.group(1))
-    m_lvedv = re.search(r"LVEDV\s*("+DEC+")\s*ml", text, re.IGNORECASE)
-    if m_lvedv: row["LVEDV"] = to_int(m_lvedv.group(1))
-    m_lvesv = re.search(r"LVESV\s*("+DEC+")\s*ml", text, re.IGNORECASE)
-    if m_lvesv: row["LVESV"] = to_int(m_lvesv.group(1))
-    m_tapse = re.search(r"TAPSE\s*("+DEC+")\s*mm", text, re.IGNORECASE)
-    if m_tapse: row["TAPSE"] = to_int(m_tapse.group(1))
-    m_lavi = re.search(r"(?:LA(?:EDV|-?Index)?\s*("+DEC+")\s*ml/m²|LAESVI\s*<?>?\s*("+DEC+")\s*ml/m²)", text, re.IGNORECASE)
-    if m_lavi:
-        row["LAVI"] = to_int(first(*m_lavi.groups()))
-
-    # Diastole
-    m_ea = re.search(r"(?:E\s*/\s*A|E/A)\s*("+DEC+")", text, re.IGNORECASE)
-    if m_ea: row["E/A"] = str(num(m_ea.group(1)))
-    m_ee = re.search(r"E\s*/\s*e['′]?\s*<??>?\s*("+DEC+")", text, re.IGNORECASE)
-    if m_ee:
-        row["E/e'"] = str(num(m_ee.group(1)))
-        row["e' reduced\nno=0\nyes=1"] = 1 if num(m_ee.group(1)) and num(m_ee.group(1))>=14 else 0
-
-    # E/A
-    m_ea = re.search(r"(?:E\s*/\s*A|E/A)\s*[:=]?\s*(\d+(?:[.,]\d+)?)", text, re.IGNORECASE)
-    if not m_ea:
-        # fallback: Muster "E/A\n 0,77"
-        m_ea = re.search(r"E/A\s*\(?\s*(\d+(?:[.,]\d+)?)", text, re.IGNORECASE)
-    if m_ea:
-        result["E/A"] = m_ea.group(1).replace(",", ".")
-
-    # E/e'
-    m_ee = re.search(r"(?:E\s*/\s*e['′]?)\s*[:=]?\s*(\d+(?:[.,]\d+)?)", text, re.IGNORECASE)
-    if not m_ee:
-        # fallback: Muster "E/E‘ 9" (mit Sonderzeichen Apostroph)
-        m_ee = re.search(r"E\s*/\s*E[‘']\s*(\d+(?:[.,]\d+)?)", text, re.IGNORECASE)
-    if m_ee:
-        result["E/e'"] = m_ee.group(1).replace(",", ".")
-
-
-    # TR Vmax -> Flag
-    m_trv = re.search(r"(?:TR\s*Vmax|TRVmax|TR\s*V\s*max)\s*("+DEC+")\s*m/s", text, re.IGNORECASE)
-    if m_trv:
-        row["TR Vmax\n0= <2,8\n1= >2,8"] = 1 if num(m_trv.group(1)) and num(m_trv.group(1))>=2.8 else 0
-
-    # AS/AI/MR/TR Grades & Werte
-    as_pmean = re.search(r"(?:P\s*mean\s*:?\s*(\d{1,2})\s*mm\s*Hg|Pmean\s*(\d{1,2}))", text, re.IGNORECASE)
-    if as_pmean: row["AS\nPmean"] = to_int(first(*as_pmean.groups()))
-    as_koef = re.search(r"(K[ÖO]F)\s*:?\s*("+DEC+")\s*cm²", text, re.IGNORECASE)
-    if as_koef: row["AS\nKÖF"] = str(num(as_koef.group(2)))
-    ai = _extract_grade(text, r"\bAI\b", max_scale=3)
-    if ai: row["AI\n0-3"] = ai
-    mr = _extract_grade(text, r"\bMI\b|\bMR\b", max_scale=3)
-    if mr: row["MR\n0-3"] = mr
-    tr = _extract_grade(text, r"\bTI\b|\bTR\b", max_scale=5)
-    if tr: row["TR\n0-5"] = tr
-    # vereinfachte AS Grad aus Pmean/KÖF falls nicht explizit
-    if not row.get("AS\n0-3") and (row.get("AS\nPmean") or row.get("AS\nKÖF")):
-        pmean = row.get("AS\nPmean")
-        koef = float(row["AS\nKÖF"]) if row.get("AS\nKÖF") else None
-        if pmean and pmean>=40 or (koef and koef<1.0): row["AS\n0-3"] = "3"
-        elif pmean and pmean>=20 or (koef and koef<1.5): row["AS\n0-3"] = "2"
-        else: row["AS\n0-3"] = "1"
-    
-    # ---- Negativformulierung: keine MI => MR = 0 (nur wenn noch nichts erkannt) ----
-    if "MR\n0-3" not in result:
-        if re.search(r"(?:keine|ohne)\s+(?:MI|Mitralinsuffizienz(?:en)?)", text, re.IGNORECASE):
-        result["MR\n0-3"] = "0"
-    if "AI\n0-3" not in result:
-        if re.search(r"(?:keine|ohne)\s+(?:AI|Aorteninsuffizienz(?:en)?)", text, re.IGNORECASE):
-            result["AI\n0-3"] = "0"
-
-    if "TR\n0-5" not in result:
-        if re.search(r"(?:keine|ohne)\s+(?:TI|Trikuspidalinsuffizienz(?:en)?)", text, re.IGNORECASE):
-            result["TR\n0-5"] = "0"
-
-    # ---- Negativformulierung: keine AS ----
-    if "AS\n0-3" not in result:
-        if re.search(r"(?:keine|ohne)\s+(?:AS|Aortenklappenstenose)", text, re.IGNORECASE):
-            result["AS\n0-3"] = "0"
-
-
-    # ---------- Wandbewegung (REST) ----------
-    # Spaltennamen der Segmente exakt wie in deiner Tabelle
-    seg_cols = {
-        r"antero[- ]?septal": "antero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        r"antero[- ]?lateral": "antero- \nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        r"\banterior\b":       "anterior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        r"infero[- ]?septal":  "infero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        r"infero[- ]?lateral": "infero-\nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-        r"\binferior\b":       "inferior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3",
-    }
-
-    # alle Segmente default = "0", falls sie in der Tabelle stehen
-    for col in seg_cols.values():
-        result[col] = result.get(col, "0")
-
+    Rule("echo_bl_lvef", r"EF(?:\s*biplan)?\s*(\d{1,2})\s*%", _int),
+    Rule("echo_bl_lvedv", r"LVEDV\s*("+DEC+r")\s*ml", _int),
+    Rule("echo_bl_lvesv", r"LVESV\s*("+DEC+r")\s*ml", _int),
+    Rule("echo_bl_tapse", r"TAPSE\s*("+DEC+r")\s*mm", _int),
+    Rule("echo_bl_lavi", r"(?:LA(?:EDV|-?Index)?\s*("+DEC+")\s*ml/m²|LAESVI\s*<?>?\s*("+DEC+")\s*ml/m²)", _int),
+    # Diastole (e' reduced -> derive.py)
+    Rule("echo_bl_ee", r"E\s*/\s*e['′]?\s*<??>?\s*("+DEC+")", _dec),
+    # E/A, E/e' – auch "E/A: 0,77", "E/A\n 0,77", "E/E‘ 9" (Sonderzeichen Apostroph)
+    Rule("echo_bl_ea", [r"(?:E\s*/\s*A|E/A)\s*[:=]?\s*(\d+(?:[.,]\d+)?)", r"E/A\s*\(?\s*(\d+(?:[.,]\d+)?)"],
+         lambda m: m.group(1).replace(",", ".")),
+    Rule("echo_bl_ee", [r"(?:E\s*/\s*e['′]?)\s*[:=]?\s*(\d+(?:[.,]\d+)?)", r"E\s*/\s*E[‘']\s*(\d+(?:[.,]\d+)?)"],
+         lambda m: m.group(1).replace(",", ".")),
+    # TR Vmax (Flag -> derive.py)
+    Rule("echo_bl_trvmax", r"(?:TR\s*Vmax|TRVmax|TR\s*V\s*max)\s*("+DEC+r")\s*m/s", _dec),
+]
+
+# --- AS/AI/MR/TR Grades & Werte ---
+VALVES = [
+    Rule("echo_bl_as_pmean", r"(?:P\s*mean\s*:?\s*(\d{1,2})\s*mm\s*Hg|Pmean\s*(\d{1,2}))", _int),
+    Rule("echo_bl_as_koef", r"(K[ÖO]F)\s*:?\s*("+DEC+r")\s*cm²", lambda m: str(num(m.group(2)))),
+    _grade("echo_bl_ai", r"\bAI\b", max_scale=3),
+    _grade("echo_bl_mr", r"\bMI\b|\bMR\b", max_scale=3),
+    _grade("echo_bl_tr", r"\bTI\b|\bTR\b", max_scale=5),
+]
+# Negativformulierung: keine MI => MR = 0 (nur wenn noch nichts erkannt)
+VALVES_NEG = [
+    Rule("echo_bl_mr", r"(?:keine|ohne)\s+(?:MI|Mitralinsuffizienz(?:en)?)", lambda m: "0", fill=True),
+    Rule("echo_bl_ai", r"(?:keine|ohne)\s+(?:AI|Aorteninsuffizienz(?:en)?)", lambda m: "0", fill=True),
+    Rule("echo_bl_tr", r"(?:keine|ohne)\s+(?:TI|Trikuspidalinsuffizienz(?:en)?)", lambda m: "0", fill=True),
+    Rule("echo_bl_as", r"(?:keine|ohne)\s+(?:AS|Aortenklappenstenose)", lambda m: "0", fill=True),
+]
+
+# --- Wandbewegung (REST) ---
+NO_REGIONAL = Rule(None, r"(?:keine|ohne)\s+regional(?:en|e)\s+(?:Kinetik|Wandbewegungs)stör")
+# Intensität: Hypo=1, Akin=2, Dyskin=3
+SEVERITY = Choice(None, [(r"\bDyskin", "3"), (r"\bAkines", "2"), (r"\bHypokines", "1")])
+WMA_MENTION = Rule(None, r"Kinetikstör|Wandbewegungsstör")
+GLOBAL_HYPO = Flag("wm_rest_global_hypo", r"globale\s+Hypokinesie")
+SEGMENTS = [Rule(col, pat) for pat, col in SEG_COLS.items()]
+
+# --- Stressecho baseline ---
+STRESS_GATE = Rule(None, r"Stressechokardiograph")
+STRESS = [
+    DateNear("se_date", r"Stressechokardiographie"+_gap(NEAR)+"vom"),
+    Flag("se_dobutamine", r"Dobutamin"),
+    Rule("se_dobutamine_dose", r"(\d{1,2})\s*ug\/?kg(?:KG)?\/?min"+_gap(WINDOW)+r"(?:3\s*min|Min)", _int,
+         flags=re.IGNORECASE|re.DOTALL),
+    # HF/BP
+    Rule("se_hr_max", r"(?:Bei Abbruch\s*|Herzfrequenz"+_gap(WINDOW)+r"Bei Abbruch\s*)(\d{2,3})\/?min|max\.\s*HF"+_gap(NEAR)+r"(\d{2,3})", _int),
+    Flag("se_hr_target_reached", r"Zielfrequenz"+_gap(NEAR)+"erreicht"),
+    Rule(("se_rr_sys_rest","se_rr_dia_rest"), r"Ausgangs-?RR[: ]\s*(\d{2,3})\s*/\s*(\d{2,3})",
+         lambda m: (to_int(m.group(1)), to_int(m.group(2)))),
+    Rule(("se_rr_sys_max","se_rr_dia_max"),
+         r"RR"+_gap(WINDOW)+r"bis\s*(\d{2,3})\s*\(?(\d{2,3})?\)?\s*mm\s*Hg|RR-Verhalten"+_gap(WINDOW)+r"maximal\s*(\d{2,3})/(\d{2,3})",
+         _rr_max, flags=re.IGNORECASE|re.DOTALL),
+    # Symptome/Abbruch
+    Flag("se_dyspnea", r"Dyspnoe"),
+    Flag("se_ap", r"Angina pectoris|AP"),
+    Flag("se_fatigue", r"Ermüdung|Fatigue|Erschöpfung"),
+    Choice(ENDED, [(r"Abbruchgrund"+_span(NEAR)+"AP", 2), (r"Abbruchgrund"+_span(NEAR)+"Dyspnoe", 1),
+                   (r"Abbruchgrund"+_span(NEAR)+"mus", 3), (r"Abbruchgrund", 4)]),
+]
+STRESS_WMA = Rule(None, r"unter"+_span(NEAR)+"Dobutamin"+_span(NEAR)+r"Hypokinesie|Ischämie")
+STRESS_SEGMENTS = [
+    Rule("wm_stress_anteroseptal", r"anteroseptal", lambda m: "1"),
+    Rule("wm_stress_anterior", r"anterior", lambda m: "1"),
+    Rule("wm_stress_inferior", r"inferior", lambda m: "1"),
+]
+
+# --- CT / MRT / Cath (erste nach Baseline) ---
+CT_GATE = Rule(None, r"\bCT\b|CTA")
+CT = [
+    DateNear("ct_date", r"CT"+_gap(NEAR)+r"(?:vom|am)"),
+    # Koronarstenosen aus CT (selten explizit), meist nur notiert wenn >50%
+    *[Flag(col, art+_gap(NEAR)+r"(?:> ?50|hochgradig|signifikant)")
+      for art, col in [("LAD","ct_sten_lad"), ("LCX","ct_sten_lcx"),
+                       ("LM","ct_sten_lm"), ("RCA","ct_sten_rca")]],
+]
+MRT_GATE = Rule(None, r"\bMRT\b|Cardio-?MRI|Stress-?MRT")
+MRT = [DateNear("mrt_date", r"MRT"+_gap(NEAR)+r"(?:vom|am)")]
+CATH_GATE = Rule(None, r"HK-?Untersuchung|Koronarangiographie|Herzkatheter")
+CATH = [
+    DateNear("cath_date", r"(?:HK|Herzkatheter|Koronarangiographie)"+_span(NEAR)+r"(?:vom|am)"),
+    # Gefäße
+    Flag("cath_sten_lad", r"LAD"+_gap(NEAR)+STENOSIS),
+    Flag("cath_sten_lcx", r"(LCX|RCX)"+_gap(NEAR)+STENOSIS),
+    Flag("cath_sten_lm", r"\bLM\b"+_gap(NEAR)+STENOSIS),
+    Flag("cath_sten_rca", r"\bRCA\b"+_gap(NEAR)+STENOSIS),
+    Flag("cath_revasc", r"PCI|Stent|Bifurkationsstent|Rotablation|Bypass"),
+    Flag("cath_bypass", r"Bypass|CABG|ACVB"),
+    # Einzel-PCI Felder
+    Flag("cath_pci_lad", _vessel_pci("LAD")),
+    Flag("cath_pci_lcx", _vessel_pci("(LCX|RCX)")),
+    Flag("cath_pci_lm", _vessel_pci(r"\bLM\b")),
+    Flag("cath_pci_rca", _vessel_pci(r"\bRCA\b")),
+]
+
+# --- Follow-up (letztes Echo/klinisch) – einfache Heuristik ---
+FU_GATE = Rule(None, r"Verlaufskontrolle|kardiologische Kontrolle|latest follow-up")
+# Latest follow-up Echo (wenn zweites Echo vorkommt)
+FU_ECHO_GATE = Rule(None, rf"Befund Echokardiographie vom\s*({DATE})")
+EF_ALL = Rule(None, r"EF(?:\s*biplan)?\s*(\d{1,2})\s*%")
+
+# ---------- Ableitungen / zusammengesetzte Felder ----------
+def _valve_history(hits, row):
+    if row[VALVE] == 1:
+        VALVE_HIST.apply(hits, row)
+
+def _medication(hits, row):
+    # jede Zeile mit Medikament (oder „Medikation“) einmal, in Textreihenfolge
+    found = LEXICON.matches(hits)
+    text, meds_block, line_end = hits.text, [], -1
+    for p in sorted({p for p, _, _ in found} | set(hits.positions(MED_MARKER.anchors[0]))):
+        if p <= line_end: continue
+        start = max(text.rfind("\n", 0, p) + 1, hits.start)
+        line_end = text.find("\n", p, hits.end)
+        if line_end < 0: line_end = hits.end
+        meds_block.append(text[start:line_end].strip())
+    row["medication"] = " | ".join(meds_block)[:1000]
+    classes = {cls for _, _, cls in found}
+    for cls, col in CLASS_COLS.items():
+        row[col] = 1 if cls in classes else 0
+    has_ASS, has_P2Y = "ass" in classes, "p2y12" in classes
+    row[APT] = 3 if (has_ASS and has_P2Y) else (1 if has_ASS else (2 if has_P2Y else 0))
+
+def _wall_motion_rest(hits, row):
+    # alle Segmente default = "0"
+    for col in SEG_COLS.values():
+        row[col] = row[col] or "0"
     # „keine/ohne regionalen Kinetik-/Wandbewegungsstörungen“ => alles 0
-    no_regional = re.search(
-        r"(?:keine|ohne)\s+regional(?:en|e)\s+(?:Kinetik|Wandbewegungs)stör",
-        text, re.IGNORECASE
-    )
-    if no_regional:
-        result["wall motion\nrest "] = 0
-        result["global hypokinesie\nno=0\nyes=1"] = 0
-        result["number of segments with ischemia"] = 0
-    else:
-        # Intensität: Hypo=1, Akin=2, Dyskin=3 (Standard falls unklar: 1)
-        severity = None
-        if re.search(r"\bDyskin", text, re.IGNORECASE):
-            severity = "3"
-        elif re.search(r"\bAkines", text, re.IGNORECASE):
-            severity = "2"
-        elif re.search(r"\bHypokines", text, re.IGNORECASE):
-            severity = "1"
-
-        matched_any = False
-        if severity:
-            for pat, col in seg_cols.items():
-                if re.search(pat, text, re.IGNORECASE):
-                    result[col] = severity
-                    matched_any = True
-
-        # Falls Kinetikstörung erwähnt, aber kein Segment genannt -> nur Flag setzen
-        if severity:
-            result["wall motion\nrest "] = 1
-        elif re.search(r"Kinetikstör|Wandbewegungsstör", text, re.IGNORECASE):
-            result["wall motion\nrest "] = 1
-
-        # global hypokinesie Flag
-        result["global hypokinesie\nno=0\nyes=1"] = 1 if re.search(r"globale\s+Hypokinesie", text, re.IGNORECASE) else 0
-
-        # „number of segments with ischemia“ gehört eigentlich zum STRESS-Teil.
-        # Für REST setzen wir nur, wenn ausdrücklich gefordert – sonst nicht anfassen.
-        # Wenn du für REST sicher 0 willst, kommentier die nächste Zeile ein:
-        # result["number of segments with ischemia"] = 0
-
-
-    # ----- Stressecho baseline -----
-    if re.search(r"Stressechokardiograph", text, re.IGNORECASE):
-        row["stress echo\nbaseline"] = 1
-        se_date = find_date_near_keyword(text, r"Stressechokardiographie.*?vom") or find_any_date(text)
-        if se_date: row["date"] = se_date
-        row["dynamic=0\ndobut=1"] = 1 if re.search(r"Dobutamin", text, re.IGNORECASE) else 0
-        m_dose = re.search(r"(\d{1,2})\s*ug\/?kg(?:KG)?\/?min.*?(?:3\s*min|Min)", text, re.IGNORECASE|re.DOTALL)
-        if m_dose: row["dobutamin max dose ug/kgKG"] = to_int(m_dose.group(1))
-        # HF/BP
-        m_hfmax = re.search(r"(?:Bei Abbruch\s*|Herzfrequenz.*?Bei Abbruch\s*)(\d{2,3})\/?min|max\.\s*HF.*?(\d{2,3})", text, re.IGNORECASE)
-        row["Heart rate max"] = to_int(first(*(m_hfmax.groups() if m_hfmax else [])))
-        row["Heart rate aim reached?\nNo=0\nyes=1"] = 1 if re.search(r"Zielfrequenz.*?erreicht", text, re.IGNORECASE) else 0
-        # RR
-        m_rr_rest = re.search(r"Ausgangs-?RR[: ]\s*(\d{2,3})\s*/\s*(\d{2,3})", text, re.IGNORECASE)
-        if m_rr_rest:
-            row["RR sys rest"], row["RR dia rest"] = to_int(m_rr_rest.group(1)), to_int(m_rr_rest.group(2))
-        m_rr_max = re.search(r"RR.*?bis\s*(\d{2,3})\s*\(?(\d{2,3})?\)?\s*mm\s*Hg|RR-Verhalten.*?maximal\s*(\d{2,3})/(\d{2,3})", text, re.IGNORECASE|re.DOTALL)
-        if m_rr_max:
-            vals = [g for g in m_rr_max.groups() if g]
-            if len(vals)>=2:
-                row["RR sys max"], row["RR dia max"] = to_int(vals[0]), to_int(vals[1])
-        # Symptome/Abbruch
-        row["dyspnoe\nno=0\nyes=1"] = 1 if re.search(r"Dyspnoe", text, re.IGNORECASE) else 0
-        row["AP\nno=0\nyes=1"] = 1 if re.search(r"Angina pectoris|AP", text, re.IGNORECASE) else 0
-        row["muscular \nfatigue\nno=0\nyes=1"] = 1 if re.search(r"Ermüdung|Fatigue|Erschöpfung", text, re.IGNORECASE) else 0
-        if re.search(r"Abbruchgrund.*AP", text, re.IGNORECASE): row["ended prema-turely\nno=0; dyspnoe=1; AP=2; muscular=3; other=4"] = 2
-        elif re.search(r"Abbruchgrund.*Dyspnoe", text, re.IGNORECASE): row["ended prema-…"] = 1
-        elif re.search(r"Abbruchgrund.*mus", text, re.IGNORECASE): row["ended prema-…"] = 3
-        elif re.search(r"Abbruchgrund", text, re.IGNORECASE): row["ended prema-…"] = 4
-        # WMA unter Stress
-        if re.search(r"unter.*Dobutamin.*Hypokinesie|Ischämie", text, re.IGNORECASE):
-            row["wall motion\nstress "] = 1
-            if re.search(r"anteroseptal", text, re.IGNORECASE): row["antero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"] = "1"
-            if re.search(r"anterior", text, re.IGNORECASE): row["anterior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"] = "1"
-            if re.search(r"inferior", text, re.IGNORECASE): row["inferior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"] = "1"
-
-    # ----- CT / MRT / Cath (erste nach Baseline) -----
-    # CT
-    if re.search(r"\bCT\b|CTA", text, re.IGNORECASE):
-        row["first CT after \nbaseline echo"] = 1
-        row["date of CT"] = find_date_near_keyword(text, r"CT.*?(?:vom|am)") or find_any_date(text)
-        # Koronarstenosen aus CT (selten explizit), meist nur notiert wenn >50%
-        for art, col in [("LAD","stenosis >50%\nLAD\nno=0\nyes=1"),
-                         ("LCX","stenosis >50%\nLCX\nno=0\nyes=1"),
-                         ("LM","stenosis >50%\nLM\nno=0\nyes=1"),
-                         ("RCA","stenosis >50%\nRCA\nno=0\nyes=1")]:
-            if re.search(fr"{art}.*?(?:> ?50|hochgradig|signifikant)", text, re.IGNORECASE):
-                row[col] = 1
-            else:
-                row[col] = row.get(col,"") or 0
-
-    # MRT
-    if re.search(r"\bMRT\b|Cardio-?MRI|Stress-?MRT", text, re.IGNORECASE):
-        row["first MRT after baseline SE"] = 1
-        row["date of MRT"] = find_date_near_keyword(text, r"MRT.*?(?:vom|am)") or find_any_date(text)
-
-    # Cath / HKU
-    if re.search(r"HK-?Untersuchung|Koronarangiographie|Herzkatheter", text, re.IGNORECASE):
-        row["first cath after \nbaseline echo"] = 1
-        row["date of cath"] = find_date_near_keyword(text, r"(?:HK|Herzkatheter|Koronarangiographie).*(?:vom|am)") or find_any_date(text)
-        # Gefäße
-        lad = 1 if re.search(r"LAD.*?(> ?50|signifikant|Stenose)", text, re.IGNORECASE) else 0
-        lcx = 1 if re.search(r"(LCX|RCX).*?(> ?50|signifikant|Stenose)", text, re.IGNORECASE) else 0
-        lm  = 1 if re.search(r"\bLM\b.*?(> ?50|signifikant|Stenose)", text, re.IGNORECASE) else 0
-        rca = 1 if re.search(r"\bRCA\b.*?(> ?50|signifikant|Stenose)", text, re.IGNORECASE) else 0
-        row["stenosis >50%\nLAD\nno=0\nyes=1"] = lad
-        row["stenosis >/=50%\nLCX\nno=0\nyes=1"] = lcx
-        row["stenosis >50%\nLM\nno=0\nyes=1"] = lm
-        row["stenosis >50%\nRCA\nno=0\nyes=1"] = rca
-        row["revasc\nno=0\nyes=1"] = 1 if re.search(r"PCI|Stent|Bifurkationsstent|Rotablation|Bypass", text, re.IGNORECASE) else 0
-        row["Bypass\nno=0\nyes=1"] = 1 if re.search(r"Bypass|CABG|ACVB", text, re.IGNORECASE) else 0
-        # Einzel-PCI Felder
-        row["PCI\nLAD\nno=0\nyes=1 "] = 1 if re.search(r"PCI.*LAD|Stent.*LAD", text, re.IGNORECASE) else 0
-        row["PCI\nLCX\nno=0\nyes=1 "] = 1 if re.search(r"PCI.*(LCX|RCX)|Stent.*(LCX|RCX)", text, re.IGNORECASE) else 0
-        row["PCI\nLM\nno=0\nyes=1 "] = 1 if re.search(r"PCI.*\bLM\b|Stent.*\bLM\b", text, re.IGNORECASE) else 0
-        row["PCI\nRCA\nno=0\nyes=1 "] = 1 if re.search(r"PCI.*\bRCA\b|Stent.*\bRCA\b", text, re.IGNORECASE) else 0
-
-    # Follow-up (letztes Echo/klinisch) – einfache Heuristik
-    if re.search(r"Verlaufskontrolle|kardiologische Kontrolle|latest follow-up", text, re.IGNORECASE):
-        row["latest\nfollow-up"] = 1
-        row["date of \nlatest FU"] = find_any_date(text)
-
-    # Latest follow-up Echo (wenn zweites Echo vorkommt)
-    if re.search(r"Befund Echokardiographie vom\s*\d{2}\.\d{2}\.\d{4}", text, re.IGNORECASE):
+    if NO_REGIONAL.test(hits):
+        row["wm_rest"] = 0
+        row["wm_rest_global_hypo"] = 0
+        row["wm_rest_ischemic_segments"] = 0
+        return
+    severity = SEVERITY.value(hits)
+    if severity:
+        for rule in SEGMENTS:
+            if rule.test(hits):
+                row[rule.col] = severity
+        row["wm_rest"] = 1
+    elif WMA_MENTION.test(hits):
+        # Kinetikstörung erwähnt, aber kein Schweregrad -> nur Flag setzen
+        row["wm_rest"] = 1
+    GLOBAL_HYPO.apply(hits, row)
+
+def _stress_wma(hits, row):
+    if STRESS_WMA.test(hits):
+        row["wm_stress"] = 1
+        for rule in STRESS_SEGMENTS:
+            rule.apply(hits, row)
+
+def _followup(hits, row):
+    if FU_GATE.test(hits):
+        row["fu"] = 1
+        row["fu_date"] = hits.any_date()
+    if FU_ECHO_GATE.test(hits):
         # nimm die letzte EF im Text als „latest“
-        ef_all = list(re.finditer(r"EF(?:\s*biplan)?\s*(\d{1,2})\s*%", text, re.IGNORECASE))
+        ef_all = list(EF_ALL.finditer(hits))
         if ef_all:
-            row["echo\nlatest follow up"] = 1
-            row["LVEF"] = to_int(ef_all[-1].group(1))  # überschreibt ggf. baseline – bei Bedarf duplizieren in UI
+            row["echo_fu"] = 1
+            row["echo_fu_lvef"] = to_int(ef_all[-1].group(1))
+            row["echo_fu_date"] = list(FU_ECHO_GATE.finditer(hits))[-1].group(1)
+
+def _section(flag_col, gate, rules):
+    # Abschnitt nur auswerten, wenn das Gate-Stichwort vorkommt
+    def apply(hits, row):
+        if gate.test(hits):
+            row[flag_col] = 1
+            for rule in rules:
+                rule.apply(hits, row) if isinstance(rule, Rule) else rule(hits, row)
+    apply.__name__ = f"{flag_col}_section"
+    return apply
+
+# Reihenfolge = Reihenfolge, in der die Gruppen Spalten schreiben.
+# Zweite Spalte: Abschnitt(e) aus segmenter, über die die Gruppe läuft
+# (None bzw. Abschnitt fehlt -> ganzes Dokument).
+GROUPS = [
+    ("demographics", None, DEMOGRAPHICS),
+    ("cvrf", None, CVRF + [_valve_history]),
+    ("af", None, AF_RULES),
+    ("devices", None, DEVICES),
+    ("medication", ("medication",), [_medication]),
+    ("labs", ("labs",), LABS),
+    ("labs_followup", ("labs",), [_section("labs_fu", LABS_FU_GATE, LABS_FU)]),
+    ("rest_echo", ("echo",), REST_ECHO),
+    ("valves", ("echo",), VALVES + VALVES_NEG),
+    ("wall_motion", ("echo",), [_wall_motion_rest]),
+    ("stress_echo", ("stress_echo",), [_section("se", STRESS_GATE, STRESS + [_stress_wma])]),
+    ("ct", ("ct",), [_section("ct", CT_GATE, CT)]),
+    ("mrt", ("mrt",), [_section("mrt", MRT_GATE, MRT)]),
+    ("cath", ("cath",), [_section("cath", CATH_GATE, CATH)]),
+    ("followup", None, [_followup]),
+]
+# Gruppen über den letzten ihrer Abschnitte – nur wenn es mehr als einen gibt
+LATEST = {"labs_followup"}
+
+_ALL_RULES = [
+    *iter_rules(step for _, _, steps in GROUPS for step in steps),
+    VALVE_HIST, MED_MARKER, NO_REGIONAL, SEVERITY, WMA_MENTION, GLOBAL_HYPO, *SEGMENTS,
+    STRESS_GATE, *STRESS, STRESS_WMA, *STRESS_SEGMENTS, CT_GATE, *CT, MRT_GATE, *MRT, CATH_GATE, *CATH,
+    LABS_FU_GATE, FU_GATE, FU_ECHO_GATE, EF_ALL,
+]
+SCANNER = Scanner(_ALL_RULES, LEXICON.words)
+
+# ---------- Main parser ----------
+def _label(step):
+    col = getattr(step, "col", None) or getattr(step, "__name__", "?")
+    return col.split("\n")[0] if isinstance(col, str) else "/".join(c.split("\n")[0] for c in col)
 
+def _parse_document(hits, doc, budget=None, profile=None, derive=True):
+    # derive=False: nur Rohwerte, abgeleitete Spalten später (derive.derive_columns)
+    row = init_row()
+    for group, kinds, steps in GROUPS:
+        view = _group_view(hits, doc, group, kinds)
+        if view is None:
+            continue
+        if profile is not None:
+            _run_profiled(group, steps, view, row, budget, profile)
+            continue
+        for step in steps:
+            fn = step.apply if isinstance(step, Rule) else step
+            if budget is None:
+                fn(view, row)
+            else:
+                budget.run(group, _label(step), fn, view, row)
+    if derive and profile is not None:
+        with profile.group("derive", row):
+            derive_row(row)
+    elif derive:
+        derive_row(row)
+    if profile is not None:
+        profile.documents += 1
     return row
 
+def _group_view(hits, doc, group, kinds):
+    # Ausschnitt, über den eine Gruppe läuft (None = Gruppe entfällt)
+    if group in LATEST:
+        if doc.count(kinds) < 2:
+            return None
+        return hits.view(*doc.span(kinds, last=True))
+    return hits.view(*doc.span(kinds))
+
+def _run_profiled(group, steps, view, row, budget, profile):
+    # wie die Schleife in _parse_document, aber jeder Schritt gemessen (profiling.Profile)
+    with profile.group(group, row):
+        for step in steps:
+            label = _label(step)
+            fn = profile.timed(group, label, step.apply if isinstance(step, Rule) else step)
+            if budget is None:
+                fn(view, row)
+            else:
+                budget.run(group, label, fn, view, row)
+
+def _scan(text, profile):
+    if profile is None:
+        return SCANNER.scan(text)
+    t0 = time.perf_counter()
+    hits = SCANNER.scan(text)
+    profile.record("scan", "*", time.perf_counter() - t0, bool(hits.pos))
+    return hits
+
+def _segment(text, profile, split=True):
+    if profile is None:
+        return segment(text, split)
+    t0 = time.perf_counter()
+    docs = segment(text, split)
+    profile.record("segment", "*", time.perf_counter() - t0, bool(docs))
+    return docs
+
+def parse_report(text: str, budget=None, profile=None, derive=True) -> dict:
+    # ganzer Text = ein Dokument (Abschnitte werden trotzdem getrennt ausgewertet)
+    if not text or not isinstance(text, str):
+        return init_row()
+    doc = _segment(text, profile, split=False)[0]
+    if budget is None:
+        return _parse_document(_scan(text, profile), doc, profile=profile, derive=derive)
+    with budget.document(0):
+        return _parse_document(_scan(text, profile), doc, budget, profile, derive)
+
+def parse_reports(text: str, budget=None, profile=None, derive=True) -> list:
+    # mehrere eingefügte Briefe -> eine Zeile pro Dokument
+    # budget: optionales rule_engine.Budget (Zeitlimit pro Regel / Dokument)
+    # profile: optionales profiling.Profile (Zeit / Treffer pro Extraktor-Gruppe)
+    # derive=False: abgeleitete Spalten (KOF, AS-Grad, …) leer lassen, siehe derive.py
+    if not text or not isinstance(text, str):
+        return []
+    hits = _scan(text, profile)
+    if budget is None:
+        return [_parse_document(hits, doc, profile=profile, derive=derive) for doc in _segment(text, profile)]
+    rows = []
+    with budget:
+        for i, doc in enumerate(_segment(text, profile)):
+            budget.document(i)
+            rows.append(_parse_document(hits, doc, budget, profile, derive))
+    return rows
+
+# ---------- Untersuchungs-Zeitachse ----------
+# Jeder Labor-/Echo-/Stressecho-/HKU-/CT-/MRT-Abschnitt mit seinem eigenen Datum
+# (aus dem Abschnittskopf), statt einer Datumsspalte pro Untersuchungsart.
+TIMELINE_KINDS = ("labs", "echo", "stress_echo", "cath", "ct", "mrt")
+TIMELINE_HEAD = 120  # Datum muss so nah am Abschnittsanfang stehen
+
+def exam_timeline(hits, doc):
+    # -> [(art, datum|None, start)] in Textreihenfolge
+    out = []
+    for s in doc.sections:
+        if s.kind in TIMELINE_KINDS:
+            d = hits.view(s.start, s.end).date_after(s.start, TIMELINE_HEAD)
+            out.append((s.kind, d[2] if d else None, s.start))
+    return out
+
+def parse_timeline(text: str) -> list:
+    # pro Dokument (wie parse_reports) eine Liste {"exam", "date", "start"}
+    if not text or not isinstance(text, str):
+        return []
+    hits = Hits(text, {})  # nur der Token-Index wird gebraucht, kein Anker-Scan
+    return [[{"exam": k, "date": d, "start": p} for k, d, p in exam_timeline(hits, doc)]
+            for doc in segment(text)]
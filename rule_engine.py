@@ -0,0 +1,399 @@
+# rule_engine.py
+# Deklarative Regeln + Single-Pass-Scanner für report_parser.
+#
+# Jede Regel wird einmal beim Import kompiliert. Aus dem Muster werden die
+# Literal-Präfixe ("Anker") abgeleitet, mit denen jeder Treffer beginnen muss.
+# Der Scanner läuft genau einmal über den Text und sammelt die Positionen aller
+# Anker; eine Regel wird danach nur noch ab ihrem ersten Anker ausgewertet –
+# oder gar nicht, wenn keiner ihrer Anker vorkommt.
+import re
+import signal
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+try:
+    from re import _parser as _sre
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre
+
+MIN_ANCHOR = 2     # kürzere Präfixe treffen praktisch überall -> Volltextsuche
+MAX_ANCHORS = 64   # Schutz gegen kombinatorische Explosion bei vielen Alternativen
+DATE = r"\d{2}\.\d{2}\.\d{4}"
+
+# ---------- Anker-Ableitung ----------
+def _walk(seq, state):
+    # -> Liste (präfix, offen); offen = Muster geht nach dem Präfix noch literal weiter
+    outs = [("", True)]
+    for op, av in seq:
+        open_ = [p for p, more in outs if more]
+        if not open_:
+            break
+        if op is _sre.AT:
+            state["exact"] = False
+            continue
+        if op is _sre.LITERAL:
+            step = [(chr(av), True)]
+        elif op is _sre.IN and av and all(o is _sre.LITERAL for o, _ in av):
+            step = [(chr(c), True) for _, c in av]
+        elif op is _sre.SUBPATTERN:
+            if av[2] & re.IGNORECASE:  # (?-i:…) -> Groß-/Kleinschreibung zählt
+                state["exact"] = False
+            step = _walk(av[-1], state)
+        elif op is _sre.BRANCH:
+            step = [x for s in av[1] for x in _walk(s, state)]
+        elif op in (_sre.MAX_REPEAT, _sre.MIN_REPEAT) and av[0] == 0 and av[1] == 1:
+            # optionales Element (x?): mit und ohne weiterverfolgen
+            step = [("", True)] + _walk(av[2], state)
+        else:
+            state["exact"] = False
+            step = [("", False)]
+        outs = [(p, False) for p, more in outs if not more] + [(p + q, m) for p in open_ for q, m in step]
+        if len(outs) > MAX_ANCHORS:
+            state["exact"] = False
+            return [(p, False) for p, _ in outs]
+    return outs
+
+def derive_anchors(pattern, flags=0):
+    # -> (anker, exact); anker=None: Regel muss immer voll suchen.
+    # exact=True: Muster ist eine reine Literal-Alternation (ignorecase) –
+    # ein Ankertreffer ist dann bereits ein Regeltreffer.
+    state = {"exact": bool(flags & re.IGNORECASE)}
+    outs = _walk(_sre.parse(pattern, flags), state)
+    anchors = {p.lower() for p, _ in outs}
+    if not anchors or min(map(len, anchors)) < MIN_ANCHOR:
+        return None, False
+    return frozenset(anchors), state["exact"] and all(more for _, more in outs)
+
+def _trie_regex(words):
+    # Alternation als Präfixbaum, damit die Regex-Engine pro Position nur einen Ast prüft
+    root = {}
+    for w in words:
+        node = root
+        for c in w:
+            node = node.setdefault(c, {})
+        node[""] = {}
+    def build(node):
+        alts = [re.escape(c) + build(sub) for c, sub in sorted(node.items()) if c]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+    return build(root)
+
+# ---------- Regeln ----------
+class Rule:
+    # col: Zielspalte (oder Tupel von Spalten), patterns: ein Muster oder Liste
+    # (das erste mit Treffer gewinnt), post: Match -> Wert (None = nichts setzen),
+    # fill: nur setzen, wenn die Zelle noch leer ist.
+    __slots__ = ("col", "rxs", "post", "fill", "anchors", "exact")
+
+    def __init__(self, col, patterns, post=None, flags=re.IGNORECASE, fill=False):
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        self.col = col
+        self.rxs = [re.compile(p, flags) for p in patterns]
+        self.post = post
+        self.fill = fill
+        derived = [derive_anchors(p, flags) for p in patterns]
+        self.anchors = [a for a, _ in derived]
+        self.exact = [e for _, e in derived]
+
+    def find(self, hits):
+        for rx, anchors in zip(self.rxs, self.anchors):
+            pos = hits.first(anchors)
+            if pos is not None:
+                m = hits.search(rx, pos)
+                if m:
+                    return m
+        return None
+
+    def finditer(self, hits):
+        for rx, anchors in zip(self.rxs, self.anchors):
+            pos = hits.first(anchors)
+            if pos is not None:
+                yield from hits.finditer(rx, pos)
+
+    def test(self, hits):
+        for rx, anchors, exact in zip(self.rxs, self.anchors, self.exact):
+            pos = hits.first(anchors)
+            if pos is not None and (exact or hits.search(rx, pos)):
+                return True
+        return False
+
+    def value(self, hits):
+        m = self.find(hits)
+        if not m:
+            return None
+        return self.post(m) if self.post else m.group(1)
+
+    def apply(self, hits, row):
+        assign(row, self.col, self.value(hits), self.fill)
+
+class Flag(Rule):
+    # 1 bei Treffer, sonst 0 (wird immer gesetzt)
+    __slots__ = ()
+
+    def apply(self, hits, row):
+        assign(row, self.col, 1 if self.test(hits) else 0, self.fill)
+
+class Choice(Rule):
+    # Geordnete Alternativen [(muster, wert), …]; die erste mit Treffer gewinnt.
+    # wert darf ein Callable(match) sein. default=None -> Zelle bleibt unberührt.
+    __slots__ = ("values", "default")
+
+    def __init__(self, col, options, default=None, flags=re.IGNORECASE, fill=False):
+        super().__init__(col, [p for p, _ in options], flags=flags, fill=fill)
+        self.values = [v for _, v in options]
+        self.default = default
+
+    def value(self, hits):
+        for rx, anchors, exact, v in zip(self.rxs, self.anchors, self.exact, self.values):
+            pos = hits.first(anchors)
+            if pos is None:
+                continue
+            if callable(v):
+                m = hits.search(rx, pos)
+                if m:
+                    return v(m)
+            elif exact or hits.search(rx, pos):
+                return v
+        return self.default
+
+class DateNear(Rule):
+    # Datum (TT.MM.JJJJ) bis 40 Zeichen hinter dem Schlüsselwort, auch über Zeilenumbrüche;
+    # ohne Treffer das erste Datum irgendwo im Abschnitt
+    __slots__ = ()
+
+    def __init__(self, col, kw_regex):
+        super().__init__(col, rf"{kw_regex}[^0-9]{{0,40}}({DATE})", flags=re.IGNORECASE | re.DOTALL)
+
+    def value(self, hits):
+        return super().value(hits) or hits.any_date()
+
+def assign(row, col, value, fill=False):
+    if value is None:
+        return
+    if isinstance(col, tuple):
+        for c, v in zip(col, value):
+            assign(row, c, v, fill)
+    elif not fill or row.get(col) in ("", None):
+        row[col] = value
+
+def iter_rules(items):
+    for it in items:
+        if isinstance(it, Rule):
+            yield it
+        elif isinstance(it, (list, tuple)):
+            yield from iter_rules(it)
+
+# ---------- Token-Index ----------
+# Einheiten: Schreibweise (klein, ohne Leerraum) -> Schlüssel; im Muster längere
+# zuerst, damit "mmHg" nicht als "mm" endet
+UNITS = {"mmhg": "mmHg", "mm": "mm", "ml": "ml", "m/s": "m/s", "cm²": "cm²", "cm2": "cm²",
+         "cm": "cm", "kg": "kg", "%": "%"}
+_DATE_RX = re.compile(f"({DATE})")
+_NUM_RX = re.compile(r"(\d+(?:[.,]\d+)?)\s*(mm\s*hg|mm|ml|m/s|cm²|cm2|cm|kg|%)", re.IGNORECASE)
+_WS_RX = re.compile(r"\s+")
+
+class TokenIndex:
+    # Daten bzw. Zahlen mit Einheit aus text[start:end], je ein Durchlauf beim ersten
+    # Bedarf, nach Position sortiert. Abfragen („erstes Datum ab p“, „Zahl hinter
+    # Label“) dann per bisect statt neuer Regex-Suche.
+    __slots__ = ("text", "start", "end", "_dates", "_nums")
+
+    def __init__(self, text, start=0, end=None):
+        self.text = text
+        self.start = start
+        self.end = len(text) if end is None else end
+        self._dates = self._nums = None
+
+    @property
+    def dates(self):
+        # -> ([start…], [(start, ende, datum)…])
+        if self._dates is None:
+            ms = list(_DATE_RX.finditer(self.text, self.start, self.end))
+            self._dates = [m.start() for m in ms], [(m.start(), m.end(), m.group(1)) for m in ms]
+        return self._dates
+
+    @property
+    def nums(self):
+        # -> ([start…], [(start, ende, zahl, einheit)…])
+        if self._nums is None:
+            ms = list(_NUM_RX.finditer(self.text, self.start, self.end))
+            self._nums = [m.start() for m in ms], [(m.start(), m.end(), m.group(1), _unit(m.group(2))) for m in ms]
+        return self._nums
+
+def _unit(s):
+    s = s.lower()
+    return UNITS.get(s) or UNITS[_WS_RX.sub("", s)]
+
+# ---------- Scanner ----------
+class Hits:
+    # Ergebnis eines Scans: Text + Positionen aller Ankertreffer. view(start, end)
+    # liefert dieselben Treffer eingeschränkt auf einen Abschnitt (ohne neu zu scannen).
+    # Der Token-Index (Daten, Zahlen mit Einheit) entsteht beim ersten Bedarf einmal
+    # pro Abschnitt – nur Abschnitte, die tatsächlich abgefragt werden, werden
+    # tokenisiert; alle Views desselben Abschnitts teilen ihn.
+    __slots__ = ("text", "pos", "start", "end", "_tok")
+
+    def __init__(self, text, pos, start=0, end=None, tok=None):
+        self.text = text
+        self.pos = pos
+        self.start = start
+        self.end = len(text) if end is None else end
+        self._tok = tok if tok is not None else {}
+
+    def view(self, start, end):
+        return Hits(self.text, self.pos, start, end, self._tok)
+
+    @property
+    def tokens(self):
+        t = self._tok.get((self.start, self.end))
+        if t is None:
+            t = self._tok[(self.start, self.end)] = TokenIndex(self.text, self.start, self.end)
+        return t
+
+    def first(self, anchors):
+        if anchors is None:
+            return self.start
+        best = None
+        for a in anchors:
+            p = self.pos.get(a)
+            if p is None:
+                continue
+            i = bisect_left(p, self.start) if self.start else 0
+            if i < len(p) and p[i] < self.end and (best is None or p[i] < best):
+                best = p[i]
+        return best
+
+    def positions(self, anchors):
+        out = set()
+        for a in anchors:
+            p = self.pos.get(a, ())
+            out.update(p[bisect_left(p, self.start):bisect_left(p, self.end)])
+        return sorted(out)
+
+    def search(self, rx, pos):
+        return rx.search(self.text, pos, self.end)
+
+    def finditer(self, rx, pos):
+        return rx.finditer(self.text, pos, self.end)
+
+    def dates(self):
+        # -> [(start, ende, datum)] im Abschnitt
+        return self.tokens.dates[1]
+
+    def date_after(self, pos, within=None):
+        # -> erstes (start, ende, datum) ab pos im Abschnitt, höchstens within Zeichen entfernt
+        return _after(self.tokens.dates, max(pos, self.start), within)
+
+    def any_date(self):
+        d = _after(self.tokens.dates, self.start)
+        return d[2] if d else None
+
+    def number_after(self, pos, within=None):
+        # -> erste (start, ende, zahl, einheit) ab pos im Abschnitt
+        return _after(self.tokens.nums, max(pos, self.start), within)
+
+def _after(index, pos, within=None):
+    starts, toks = index
+    i = bisect_left(starts, pos)
+    if i < len(toks) and (within is None or toks[i][0] - pos <= within):
+        return toks[i]
+    return None
+
+class Scanner:
+    # rules: Regeln, deren Anker gesammelt werden; words: zusätzliche Literale
+    # (kleingeschrieben, z.B. Medikamentennamen aus drug_lexicon)
+    def __init__(self, rules, words=()):
+        words = set(words)
+        for r in rules:
+            for anchors in r.anchors:
+                words.update(anchors or ())
+        self.words = frozenset(words)
+        trie = _trie_regex(words) if words else "(?!)"
+        # Lookahead: überlappende Treffer (z.B. "statin" in "Simvastatin") bleiben erhalten
+        self._rx = re.compile(f"(?=({trie}))")
+        self._rx_i = re.compile(f"(?=({trie}))", re.IGNORECASE)
+        # alle Anker, die Präfix eines längeren Ankers sind, treffen an derselben Stelle
+        self._prefixes = {w: [p for p in words if w.startswith(p)] for w in words}
+
+    def scan(self, text):
+        low = text.lower()
+        if len(low) == len(text):
+            it = self._rx.finditer(low)
+        else:  # lower() hat die Länge verändert -> Positionen nicht übertragbar
+            it = self._rx_i.finditer(text)
+        pos = defaultdict(list)
+        prefixes = self._prefixes
+        for m in it:
+            start = m.start()
+            for w in prefixes.get(m[1].lower(), ()):
+                pos[w].append(start)
+        return Hits(text, dict(pos))
+
+# ---------- Zeitbudget ----------
+class RuleTimeout(Exception):
+    pass
+
+def _raise_timeout(signum, frame):
+    raise RuleTimeout()
+
+class Budget:
+    # Opt-in Zeitbudget pro Regel und pro Dokument (Sekunden). Überschreitungen
+    # landen in .timeouts als (dokument, gruppe, regel, "rule"|"document"), die
+    # Regel wird übersprungen und der Rest des Dokuments läuft weiter.
+    # Im Hauptthread (Bulk-Worker) bricht ein SIGALRM-Timer auch eine laufende
+    # Regex-Suche ab; sonst (z.B. Streamlit-Thread) wird nur nachträglich gemessen.
+    def __init__(self, rule_s=None, doc_s=None):
+        self.rule_s = rule_s
+        self.doc_s = doc_s
+        self.timeouts = []
+        self._doc = None
+        self._deadline = None
+        self._hard = hasattr(signal, "setitimer")
+
+    def document(self, doc_no=0):
+        self._doc = doc_no
+        self._deadline = time.perf_counter() + self.doc_s if self.doc_s else None
+        return self
+
+    def __enter__(self):
+        self._alarm = self._hard and threading.current_thread() is threading.main_thread()
+        if self._alarm:
+            self._old = signal.signal(signal.SIGALRM, _raise_timeout)
+        return self
+
+    def __exit__(self, *exc):
+        if self._alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._old)
+        return False
+
+    def run(self, group, label, fn, *args):
+        limit, kind = self.rule_s, "rule"
+        if self._deadline is not None:
+            left = self._deadline - time.perf_counter()
+            if left <= 0:
+                self.timeouts.append((self._doc, group, label, "document"))
+                return
+            if limit is None or left < limit:
+                limit, kind = left, "document"
+        if limit is None:
+            fn(*args)
+            return
+        if self._alarm:
+            signal.setitimer(signal.ITIMER_REAL, limit)
+            try:
+                fn(*args)
+            except RuleTimeout:
+                self.timeouts.append((self._doc, group, label, kind))
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        else:
+            t0 = time.perf_counter()
+            fn(*args)
+            if time.perf_counter() - t0 > limit:
+                self.timeouts.append((self._doc, group, label, kind))
@@ -0,0 +1,310 @@
+# schema.py
+# Spaltenschema der Studientabelle – einmal beim Import aufgebaut.
+# Jede Spalte hat eine stabile, eindeutige ID (auch wenn die Kopfzeile im
+# Studienblatt mehrfach vorkommt, z.B. "date", "GFR", "LVEF"), einen Datentyp
+# und die Kopfzeile wie im Studienblatt (header, mehrzeilig).
+# Interne Spalten (internal=True) werden gespeichert und für derive.py gebraucht,
+# gehören aber nicht zum Studienblatt: Export, Anzeige und Import benutzen
+# SCHEMA.layout (183 Spalten wie bisher init_row), damit ein Export weiter in das
+# bestehende Blatt passt.
+from collections import namedtuple
+
+FLAG, ORDINAL, FLOAT, DATE, TEXT = "flag", "ordinal", "float", "date", "text"
+DTYPES = (FLAG, ORDINAL, FLOAT, DATE, TEXT)
+
+Column = namedtuple("Column", "id header dtype internal", defaults=(False,))
+
+_SEGMENTS = [
+    ("anterior", "anterior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"),
+    ("anterolateral", "antero- \nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"),
+    ("anteroseptal", "antero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"),
+    ("inferior", "inferior\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"),
+    ("inferolateral", "infero-\nlateral\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"),
+    ("inferoseptal", "infero-\nseptal\nnormal=0\nhypokin=1\nakin=2\ndyskin=3"),
+]
+def _segments(prefix):
+    return [(f"{prefix}_{seg}", header, ORDINAL) for seg, header in _SEGMENTS]
+
+COLUMNS = [
+    # --- Patient / Meta ---
+    ("surname", "surname", TEXT),
+    ("first_name", "first name", TEXT),
+    ("dob", "DOB", DATE),
+    ("aufnahmenr", "Aufnahmenr", TEXT),
+    ("se_date_positive", "Date \nStressecho; positiv-> mark green", DATE),
+    ("fu_kind", "kind of FU\n1=in house\n2=tel/Tod\n3=to be done", ORDINAL),
+    ("fu_type", "Follow-Up\ndeceased=0\nHKU/CT only=1\nTTE/clinical only=2\nboth=3", ORDINAL),
+    ("se_indication", "Indikation\nStressecho\n0=khk\n1=AS\n2=AV-Klappen\n3=HFpEF", ORDINAL),
+    ("sex", "sex\n0=male\n1=female", FLAG),
+    ("size", "size", FLOAT),
+    ("weight", "weight", FLOAT),
+    ("kof", "KOF", FLOAT),
+    # --- CVRF / Vorgeschichte ---
+    ("cvrf", "CVRF", ORDINAL),
+    ("hypertension", "hyperten\nno=0\nyes=1", FLAG),
+    ("diabetes", "diabetes\nno=0\nyes=1", FLAG),
+    ("dyslipidemia", "dyslipid\nno=0\nyes=1", FLAG),
+    ("hf_diagnosis", "Heart failure diagnosis?", FLAG),
+    ("af", "AF\nno=0\nparox=1\npers=2\nperm=3", ORDINAL),
+    ("pm", "PM\nno=0\n1-C-PM=1\n2-C-PM=2\nCRT=3\nICD=4", ORDINAL),
+    ("lung_disease", "chronic lung\n disease\nno=0\nyes=1", FLAG),
+    ("icm", "previous known ICM\nno=0\n1-GE=1; 2-GE=2; 3-GE=3", ORDINAL),
+    ("prior_mi", "prior MI\nno=0\nyes=1", FLAG),
+    ("prior_pci", "prior PCI\nno=0\nyes=1", FLAG),
+    ("prior_cabg", "prior CABG\nno=0\nyes=1", FLAG),
+    ("valve_intervention", "valve intervention/ surgery\nno=0\nyes=1", FLAG),
+    ("valve_history", "valve history freetext", TEXT),
+    ("nyha", "NYHA", FLOAT),
+    ("smoking", "smoking\nnever=0\nformer=1\ncurrent=2\n", ORDINAL),
+    # --- Medikation ---
+    ("medication", "Medication", TEXT),
+    ("apt", "APT\nno=0\nASS=1\nP2y=2\nDAPT=3", ORDINAL),
+    ("oak", "OAK", FLAG),
+    ("raasi", "RAASi", FLAG),
+    ("arni", "ARNI", FLAG),
+    ("betablocker", "Betablocker", FLAG),
+    ("mra", "MRA", FLAG),
+    ("sglt2", "SGLT2", FLAG),
+    ("diuretics", "Diuretics", FLAG),
+    ("statin", "Statin", FLAG),
+    # --- Labor ---
+    ("labs_bl", "labs\nbaseline", FLAG),
+    ("labs_bl_gfr", "GFR", FLOAT),
+    ("labs_bl_ldl", "LDL-C", FLOAT),
+    ("labs_bl_hb", "Hb", FLOAT),
+    ("labs_bl_ntprobnp", "NTproBNP", FLOAT),
+    ("labs_fu", "labs latest\nfollow-up", FLAG),
+    ("labs_fu_date", "date", DATE),
+    ("labs_fu_gfr", "GFR", FLOAT),
+    ("labs_fu_ldl", "LDL-C", FLOAT),
+    ("labs_fu_hb", "Hb", FLOAT),
+    ("labs_fu_ntprobnp", "NTproBNP", FLOAT),
+    # --- Echo baseline (Ruhe) ---
+    ("echo_bl", "rest echo\nbaseline", FLAG),
+    ("echo_bl_date", "date", DATE),
+    ("echo_bl_rhythm", "rhythm\nSR=0\nAF=1\nHSM=2", ORDINAL),
+    ("echo_bl_lvef", "LVEF", FLOAT),
+    ("echo_bl_lvedv", "LVEDV", FLOAT),
+    ("echo_bl_lvesv", "LVESV", FLOAT),
+    ("echo_bl_tapse", "TAPSE", FLOAT),
+    ("echo_bl_lavi", "LAVI", FLOAT),
+    ("echo_bl_mr", "MR\n0-3", ORDINAL),
+    ("echo_bl_tr", "TR\n0-5", ORDINAL),
+    ("echo_bl_ea", "E/A", FLOAT),
+    ("echo_bl_ee", "E/e'", FLOAT),
+    ("echo_bl_e_reduced", "e' reduced\nno=0\nyes=1", FLAG),
+    ("echo_bl_trvmax", "TR Vmax (BL, Rohwert)", FLOAT, True),  # intern: Eingabe für echo_bl_trvmax_high
+    ("echo_bl_trvmax_high", "TR Vmax\n0= <2,8\n1= >2,8", FLAG),
+    ("echo_bl_as", "AS\n0-3", ORDINAL),
+    ("echo_bl_as_pmean", "AS\nPmean", FLOAT),
+    ("echo_bl_as_koef", "AS\nKÖF", FLOAT),
+    ("echo_bl_ai", "AI\n0-3", ORDINAL),
+    # --- Wandbewegung Ruhe ---
+    ("wm_rest", "wall motion\nrest ", FLAG),
+    *_segments("wm_rest"),
+    ("wm_rest_global_hypo", "global hypokinesie\nno=0\nyes=1", FLAG),
+    ("wm_rest_ischemic_segments", "number of segments with ischemia", ORDINAL),
+    # --- Stressecho baseline ---
+    ("se", "stress echo\nbaseline", FLAG),
+    ("se_date", "date", DATE),
+    ("se_dobutamine", "dynamic=0\ndobut=1", FLAG),
+    ("se_dobutamine_dose", "dobutamin max dose ug/kgKG", FLOAT),
+    ("se_hr_max", "Heart rate max", FLOAT),
+    ("se_hr_target_reached", "Heart rate aim reached?\nNo=0\nyes=1", FLAG),
+    ("se_rr_sys_rest", "RR sys rest", FLOAT),
+    ("se_rr_dia_rest", "RR dia rest", FLOAT),
+    ("se_rr_sys_max", "RR sys max", FLOAT),
+    ("se_rr_dia_max", "RR dia max", FLOAT),
+    ("se_watt", "Watt", FLOAT),
+    ("se_met", "MET", FLOAT),
+    ("se_dyspnea", "dyspnoe\nno=0\nyes=1", FLAG),
+    ("se_ap", "AP\nno=0\nyes=1", FLAG),
+    ("se_fatigue", "muscular \nfatigue\nno=0\nyes=1", FLAG),
+    ("se_ended_early", "ended prema-turely\nno=0; dyspnoe=1; AP=2; muscular=3; other=4", ORDINAL),
+    ("se_poor_image", "insufficient image quality\nno=0\nyes=1", FLAG),
+    ("se_freetext", "Freetext ", TEXT),
+    ("se_la_reservoir", "LA-reservoir \nstrain BL", FLOAT),
+    ("se_la_conduit", "LA conduit-\nstrain", FLOAT),
+    ("se_la_booster", "LA booster \npump", FLOAT),
+    ("se_lv_gls", "LV-strain \n(GLS)", FLOAT),
+    ("se_mr", "MR 0-3", ORDINAL),
+    ("se_tr", "TR 0-5", ORDINAL),
+    ("se_lvot_sv_rest", "LVOT SV\nrest", FLOAT),
+    ("se_lvot_svi_rest_calc", "LVOT SVI rest\nRechner", FLOAT),
+    ("se_lvot_svi_rest", "LVOT SVI \nrest", FLOAT),
+    ("se_lvot_sv_max", "LVOT SV\nmax", FLOAT),
+    ("se_lvot_svi_max_calc", "LVOT SVI max\nRechner", FLOAT),
+    ("se_svi_max", "SVI max", FLOAT),
+    ("se_as_pmean_max", "AS Pmean max\n(mmHg)", FLOAT),
+    ("se_as_koef_min", "AS KÖF min\n(cm2)", FLOAT),
+    # --- Wandbewegung Stress ---
+    ("wm_stress", "wall motion\nstress ", FLAG),
+    *_segments("wm_stress"),
+    ("wm_stress_ischemic_segments", "number of segments with ischemia", ORDINAL),
+    # --- CT ---
+    ("ct", "first CT after \nbaseline echo", FLAG),
+    ("ct_date", "date of CT", DATE),
+    ("ct_sten_lad", "stenosis >50%\nLAD\nno=0\nyes=1", FLAG),
+    ("ct_sten_lcx", "stenosis >50%\nLCX\nno=0\nyes=1", FLAG),
+    ("ct_sten_lm", "stenosis >50%\nLM\nno=0\nyes=1", FLAG),
+    ("ct_sten_rca", "stenosis >50%\nRCA\nno=0\nyes=1", FLAG),
+    ("ct_wma_aligns", "wall motion abnormality in baseline SE aligns\nno=0\nyes=1", FLAG),
+    # --- MRT ---
+    ("mrt", "first MRT after baseline SE", FLAG),
+    ("mrt_date", "date of MRT", DATE),
+    ("mrt_perf_lad", "perfusion deficit LAD", FLAG),
+    ("mrt_perf_lcx", "perfusion deficit LCX", FLAG),
+    ("mrt_perf_rca", "perfusion deficit RCA", FLAG),
+    ("mrt_aligns", "deficit aligns with SE", FLAG),
+    # --- Herzkatheter ---
+    ("cath", "first cath after \nbaseline echo", FLAG),
+    ("cath_date", "date of cath", DATE),
+    ("cath_sten_lad", "stenosis >50%\nLAD\nno=0\nyes=1", FLAG),
+    ("cath_sten_lcx", "stenosis >/=50%\nLCX\nno=0\nyes=1", FLAG),
+    ("cath_sten_lm", "stenosis >50%\nLM\nno=0\nyes=1", FLAG),
+    ("cath_sten_rca", "stenosis >50%\nRCA\nno=0\nyes=1", FLAG),
+    ("cath_wma_aligns", "wall motion abnormality in baseline SE aligns\nno=0\nyes=1", FLAG),
+    ("cath_revasc", "revasc\nno=0\nyes=1", FLAG),
+    ("cath_bypass", "Bypass\nno=0\nyes=1", FLAG),
+    ("cath_revasc_freetext", "revasc/ surgery freetext", TEXT),
+    ("cath_pci_lad", "PCI\nLAD\nno=0\nyes=1 ", FLAG),
+    ("cath_pci_lcx", "PCI\nLCX\nno=0\nyes=1 ", FLAG),
+    ("cath_pci_lm", "PCI\nLM\nno=0\nyes=1 ", FLAG),
+    ("cath_pci_rca", "PCI\nRCA\nno=0\nyes=1 ", FLAG),
+    # --- AS / TAVI ---
+    ("as_only", "AS\nONLY (discharge=   hospitalization for TAVI)", FLAG),
+    ("tavi", "TAVI\nno=0\nyes=date ", TEXT),
+    ("ake", "Aortenkl- surgery\nno=0\nyes=date", TEXT),
+    ("discharge_pmean", "Pmean discharge", FLOAT),
+    ("discharge_koef", "KÖF discharge", FLOAT),
+    ("discharge_as", "AS 0-3 discharge", ORDINAL),
+    ("discharge_ar", "AR 0-3 discharge", ORDINAL),
+    # --- Follow-up ---
+    ("fu", "latest\nfollow-up", FLAG),
+    ("fu_date", "date of \nlatest FU", DATE),
+    ("fu_deceased", "alive=0\ndeceased= date", TEXT),
+    ("fu_cause_of_death", "cause of death", TEXT),
+    ("fu_hf_hosp_count", "heart failure hospitalisation\nnumber since baseline", ORDINAL),
+    ("fu_hf_hosp_date", "date of first\n HF hospitalisation after baseline", DATE),
+    ("fu_mi", "myocardial infarction after baseline\nno=0\nyes=1", FLAG),
+    ("fu_coronary_intervention", "coronary intervention since initial cath\nno=0\nyes=1", FLAG),
+    ("fu_cabg", "CABG since initial cath\nno=0\nyes=1", FLAG),
+    ("fu_intervention_freetext", "freetext intervention/ surgery", TEXT),
+    ("fu_hf_diagnosis", "heart Failure diagnosis\nno=0\nyes=1 ", FLAG),
+    ("fu_hf_diagnosis_date", "date of HF diagnosis if new since baseline ", DATE),
+    ("fu_af", "AF\nno=0\nparox=1\npers=2\nperm=3", ORDINAL),
+    ("fu_nyha", "NYHA class", FLOAT),
+    # --- Echo Follow-up ---
+    ("echo_fu", "echo\nlatest follow up", FLAG),
+    ("echo_fu_date", "date of latest follow up echo", DATE),
+    ("echo_fu_rhythm", "rhythm\nSR=0\nAF=1\nHSM=2, others=3", ORDINAL),
+    ("echo_fu_lvef", "LVEF", FLOAT),
+    ("echo_fu_lvedv", "LVEDV", FLOAT),
+    ("echo_fu_lvesv", "LVESV", FLOAT),
+    ("echo_fu_tapse", "TAPSE", FLOAT),
+    ("echo_fu_lavi", "LAVI", FLOAT),
+    ("echo_fu_mr", "MR\n0-3", ORDINAL),
+    ("echo_fu_tr", "TR\n0-5", ORDINAL),
+    ("echo_fu_valve_freetext", "AV-valve intervention new, freetext ", TEXT),
+    ("echo_fu_ea", "E/A", FLOAT),
+    ("echo_fu_ee", "E/e'", FLOAT),
+    ("echo_fu_e_reduced", "e' reduced\nno=0\nyes=1", FLAG),
+    ("echo_fu_trvmax", "TR Vmax", FLOAT),
+    ("echo_fu_as", "AS\n0-3", ORDINAL),
+    ("echo_fu_as_pmean", "AS\nPmean", FLOAT),
+    ("echo_fu_as_koef", "AS\nKÖF (nicht indiziert)", FLOAT),
+    ("echo_fu_ai", "AI\n0-3", ORDINAL),
+]
+
+class Schema:
+    def __init__(self, columns):
+        self.columns = tuple(Column(*c) for c in columns)
+        self.ids = tuple(c.id for c in self.columns)
+        self.headers = tuple(c.header for c in self.columns)
+        self.dtypes = tuple(c.dtype for c in self.columns)
+        self.index = {cid: i for i, cid in enumerate(self.ids)}
+        # Studienblatt-Layout ohne interne Spalten (Positionen in Row.values)
+        self.layout = tuple(c for c in self.columns if not c.internal)
+        self.layout_ids = tuple(c.id for c in self.layout)
+        self.layout_headers = tuple(c.header for c in self.layout)
+        self.layout_index = tuple(self.index[cid] for cid in self.layout_ids)
+        if len(self.index) != len(self.columns):
+            raise ValueError("Spalten-IDs sind nicht eindeutig")
+        if set(self.dtypes) - set(DTYPES):
+            raise ValueError(f"unbekannter Datentyp: {set(self.dtypes) - set(DTYPES)}")
+        self._blank = [""] * len(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __getitem__(self, cid):
+        return self.columns[self.index[cid]]
+
+    def new_row(self):
+        return Row(self._blank.copy())
+
+    def ids_of(self, dtype):
+        return [c.id for c in self.columns if c.dtype == dtype]
+
+    def ids_for_header(self, header):
+        # mehrfach vorkommende Kopfzeilen -> alle IDs in Tabellenreihenfolge
+        return [c.id for c in self.columns if c.header == header]
+
+    def columnar(self, rows):
+        # Zeilen -> {id: [werte…]} (reines Umkopieren, keine Schlüsselsuche pro Zelle)
+        cols = zip(*(r.values for r in rows)) if rows else [[] for _ in self.ids]
+        return {cid: list(vals) for cid, vals in zip(self.ids, cols)}
+
+SCHEMA = Schema(COLUMNS)
+_INDEX = SCHEMA.index
+
+class Row:
+    # Eine Tabellenzeile: Werteliste in Schema-Reihenfolge. Verhält sich für
+    # Lesen/Schreiben wie ein dict mit den Spalten-IDs als Schlüssel.
+    __slots__ = ("values",)
+    schema = SCHEMA
+
+    def __init__(self, values):
+        self.values = values
+
+    def __getitem__(self, cid):
+        return self.values[_INDEX[cid]]
+
+    def __setitem__(self, cid, value):
+        self.values[_INDEX[cid]] = value
+
+    def __contains__(self, cid):
+        return cid in _INDEX
+
+    def __iter__(self):
+        return iter(SCHEMA.ids)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __eq__(self, other):
+        return isinstance(other, Row) and self.values == other.values
+
+    def __repr__(self):
+        filled = {k: v for k, v in self.items() if v not in ("", None)}
+        return f"Row({filled})"
+
+    def get(self, cid, default=None):
+        i = _INDEX.get(cid)
+        return default if i is None else self.values[i]
+
+    def keys(self):
+        return SCHEMA.ids
+
+    def items(self):
+        return zip(SCHEMA.ids, self.values)
+
+    def to_dict(self):
+        return dict(zip(SCHEMA.ids, self.values))
+
+    def by_header(self):
+        # [(kopfzeile, wert), …] in Tabellenreihenfolge (Kopfzeilen können doppelt sein)
+        return [(c.header, self.values[i]) for c, i in zip(SCHEMA.layout, SCHEMA.layout_index)]
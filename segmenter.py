@@ -0,0 +1,105 @@
+# segmenter.py
+# Zerlegt eingefügten Text in Dokumente (Arztbriefe) und jedes Dokument in
+# Abschnitte (Labor, Echo, Stressecho, HKU, CT, MRT, Medikation). report_parser
+# lässt jede Extraktor-Gruppe dann nur über ihren eigenen Abschnitt laufen.
+import re
+from collections import namedtuple
+
+Section = namedtuple("Section", "kind start end")
+
+HEADER_GAP = 400  # Kopfzeilen (Name / geb. / AufnahmeNr) so nah beieinander gehören zum selben Kopf
+
+# Patientenkopf: Zeile mit „geb. TT.MM.JJJJ“ oder „AufnahmeNr:“
+DOC_HEADER_RX = re.compile(
+    r"^[^\n]*?(?:\bgeb\.?\s*\d{2}\.\d{2}\.\d{4}|AufnahmeNr\.?\s*:\s*\d+)[^\n]*",
+    re.IGNORECASE | re.MULTILINE)
+HEADER_KEY_RX = re.compile(r"\bgeb\.?\s*(\d{2}\.\d{2}\.\d{4})|AufnahmeNr\.?\s*:\s*(\d+)", re.IGNORECASE)
+NAME_LINE_RX = re.compile(r"[ \t]*[A-ZÄÖÜ][a-zäöüß-]+,\s*[A-ZÄÖÜ][a-zäöüß-]+[^\n]*\n?")
+DOC_BREAK_RX = re.compile(r"\f")
+
+# Abschnittsköpfe stehen am Zeilenanfang (ggf. nach Aufzählungszeichen / „Befund“)
+SECTION_KINDS = {
+    "medication": r"(?:Aktuelle\s+|Entlass-?\s*)?Medikation|Medikamente",
+    "labs": r"Labor(?:werte|befund)?",
+    "stress_echo": r"(?:Dobutamin-?\s*)?Stress-?\s*echo(?:kardiographie)?",
+    "echo": r"(?:Transthorakale\s+)?Echokardiographie|TTE|TEE",
+    "ct": r"(?:Kardio-?|Koronar-?)?CTA?|CT-Koronarangiographie|Computertomographie",
+    "mrt": r"(?:Kardio-?|Stress-?)?MRT|Cardio-?MRI",
+    "cath": r"HKU|HK-?Untersuchung|(?:Links)?[Hh]erzkatheter(?:untersuchung)?|Koronarangiographie",
+}
+SECTION_RX = re.compile(
+    r"^[ \t]*(?:[-•*][ \t]*)?(?:Befund(?:e)?[ \t]+(?:der[ \t]+|des[ \t]+)?)?(?:"
+    + "|".join(f"(?P<{kind}>{pat})" for kind, pat in SECTION_KINDS.items())
+    + r")\b",
+    re.IGNORECASE | re.MULTILINE)
+
+class Document:
+    __slots__ = ("start", "end", "sections")
+
+    def __init__(self, start, end, sections):
+        self.start = start
+        self.end = end
+        self.sections = sections
+
+    def span(self, kinds=None, last=False):
+        # erster (last=True: letzter) Abschnitt einer der Arten, sonst das ganze Dokument
+        if kinds:
+            for s in (reversed(self.sections) if last else self.sections):
+                if s.kind in kinds:
+                    return s.start, s.end
+        return self.start, self.end
+
+    def count(self, kinds):
+        return sum(1 for s in self.sections if s.kind in kinds)
+
+    def kinds(self):
+        return {s.kind for s in self.sections}
+
+def _header_keys(line):
+    # -> {("geb", datum), ("nr", aufnahmenr)} einer Kopfzeile
+    return {("geb", a) if a else ("nr", b) for a, b in HEADER_KEY_RX.findall(line)}
+
+def _conflicts(line_keys, keys):
+    # gleiche Schlüsselart (DOB bzw. AufnahmeNr), aber anderer Wert -> anderer Patient
+    return any(kind in {k for k, _ in keys} and (kind, v) not in keys for kind, v in line_keys)
+
+def _doc_starts(text):
+    # neues Dokument bei jedem Patientenkopf, dessen DOB/AufnahmeNr nicht schon zum
+    # laufenden Dokument gehört (wiederholte Seitenköpfe trennen also nicht). Köpfe
+    # innerhalb von HEADER_GAP werden nur zusammengefasst, wenn sich DOB/AufnahmeNr nicht
+    # widersprechen – sonst verschluckt ein kurzer Brief den nächsten Patienten.
+    starts, keys, last_end = [0], set(), None
+    for m in DOC_HEADER_RX.finditer(text):
+        line_keys = _header_keys(m.group(0))
+        if last_end is None or (not _conflicts(line_keys, keys)
+                                and (line_keys & keys or m.start() - last_end <= HEADER_GAP)):
+            keys |= line_keys
+        else:
+            s = m.start()
+            # Namenszeile direkt davor gehört schon zum neuen Dokument (nicht aber der
+            # Seitenkopf des vorigen Briefs)
+            prev = text.rfind("\n", 0, max(s - 1, 0)) + 1
+            if prev >= last_end and NAME_LINE_RX.fullmatch(text, prev, s):
+                s = prev
+            starts.append(s)
+            keys = line_keys
+        last_end = m.end()
+    starts.extend(m.end() for m in DOC_BREAK_RX.finditer(text))
+    return sorted(set(starts))
+
+def sections_in(text, start, end):
+    heads = [(m.lastgroup, m.start()) for m in SECTION_RX.finditer(text, start, end)]
+    return [Section(kind, s, heads[i + 1][1] if i + 1 < len(heads) else end)
+            for i, (kind, s) in enumerate(heads)]
+
+def doc_bounds(text):
+    # -> [(start, ende)] der nicht-leeren Dokumente (ohne Abschnitte; z.B. für dump_reader)
+    starts = _doc_starts(text)
+    bounds = zip(starts, starts[1:] + [len(text)])
+    return [(s, e) for s, e in bounds if text[s:e].strip()]
+
+def segment(text, split=True):
+    # -> Liste von Document; split=False: ganzer Text ist ein Dokument
+    bounds = doc_bounds(text) if split else [(0, len(text))] if text.strip() else []
+    docs = [Document(s, e, sections_in(text, s, e)) for s, e in bounds]
+    return docs or [Document(0, len(text), [])]
@@ -0,0 +1,290 @@
+# service.py
+# Lokaler HTTP-Dienst für die Extraktion (nur 127.0.0.1, nur Standardbibliothek):
+# andere Systeme schicken Briefe per POST statt über das Eingabefeld der App.
+#
+#   python service.py --port 8765 --workers 4 --cache parse_cache.db
+#   curl -s localhost:8765/extract -H 'Content-Type: text/plain' --data-binary @brief.txt
+#   curl -s localhost:8765/extract -d '{"documents": ["<brief 1>", "<brief 2>"]}'
+#   curl -s localhost:8765/stats
+#
+# Antwort: {"columns": [spalten-ids…], "documents": [{"rows": [[werte…]], "error": null}, …]}
+# – Werte in Studienblatt-Reihenfolge wie init_row (SCHEMA.layout), ein Eintrag pro Dokument (ein Dokument
+# kann mehrere Briefe und damit mehrere Zeilen enthalten).
+#
+# Dokumente kommen in eine begrenzte Warteschlange (voll -> 429 mit Retry-After).
+# Ein Dispatcher-Thread fasst sie zu Batches zusammen und gibt sie an einen Pool
+# vorgewärmter Worker-Prozesse (parse_chunk wie bulk_extract); höchstens ein Batch
+# pro Worker ist unterwegs, der Rest wartet in der Warteschlange.
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bulk_extract import parse_chunk
+from schema import SCHEMA
+
+HOST = "127.0.0.1"
+QUEUE_DOCS = 256          # Dokumente in der Warteschlange, darüber 429
+BATCH_DOCS = 16           # Dokumente pro Worker-Auftrag
+BATCH_WAIT_S = 0.002      # so lange auf weitere Dokumente warten, bevor ein halber Batch losgeht
+MAX_BODY = 32 * 2**20
+REQUEST_TIMEOUT_S = 120
+LATENCY_WINDOW = 1000     # Anfragen für p50/p95/p99
+RATE_WINDOW_S = 60        # Durchsatz der letzten Minute
+
+_WARMUP = "Mustermann, Max, geb. 01.01.1950\nEchokardiographie: LVEF 55 %, keine AS."
+
+def _warm():
+    # Worker-Start: Module laden und Regeln einmal durchlaufen lassen
+    parse_chunk([("warmup", _WARMUP)])
+
+class _Request:
+    def __init__(self, n):
+        self.results = [None] * n   # (zeilen, fehler) pro Dokument
+        self.left = n
+        self.done = threading.Event()
+        if not n:
+            self.done.set()
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+class ExtractionService:
+    def __init__(self, workers=None, queue_docs=QUEUE_DOCS, batch_docs=BATCH_DOCS,
+                 batch_wait=BATCH_WAIT_S, doc_s=None, cache_path=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_docs, self.batch_docs, self.batch_wait = queue_docs, batch_docs, batch_wait
+        self.doc_s, self.cache_path = doc_s, cache_path
+        self._queue = deque()       # (anfrage, dokument-nr, text)
+        self._inflight = 0          # Batches im Pool
+        self._cond = threading.Condition()
+        self._closed = False
+        self._started = time.monotonic()
+        self._latency = deque(maxlen=LATENCY_WINDOW)   # Sekunden pro Anfrage
+        self._done_at = deque()                        # (zeitpunkt, dokumente) pro Batch
+        self._counts = dict.fromkeys(("requests", "rejected", "documents", "rows", "errors", "batches"), 0)
+        # spawn wie background.ParsePool: der Dienst hat schon Threads
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_warm)
+
+    def start(self):
+        # alle Worker sofort starten und vorwärmen, nicht erst bei der ersten Anfrage
+        for f in [self._executor.submit(int) for _ in range(self.workers)]:
+            f.result()
+        threading.Thread(target=self._dispatch, name="extract-dispatch", daemon=True).start()
+        return self
+
+    def submit(self, texts):
+        # -> _Request oder None, wenn die Warteschlange voll ist
+        with self._cond:
+            if len(self._queue) + len(texts) > self.queue_docs:
+                self._counts["rejected"] += 1
+                return None
+            req = _Request(len(texts))
+            self._queue.extend((req, i, t) for i, t in enumerate(texts))
+            self._counts["requests"] += 1
+            self._cond.notify_all()
+        return req
+
+    def extract(self, texts, timeout=REQUEST_TIMEOUT_S):
+        # blockierend: -> [(zeilen, fehler)] pro Dokument, None bei voller Warteschlange
+        t0 = time.monotonic()
+        req = self.submit(texts)
+        if req is None:
+            return None
+        if not req.done.wait(timeout):
+            raise TimeoutError(f"keine Antwort nach {timeout:.0f} s")
+        with self._cond:
+            self._latency.append(time.monotonic() - t0)
+        return req.results
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._closed and not (self._queue and self._inflight < self.workers):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Worker frei: kurz auf weitere Dokumente warten, damit der Batch voller wird
+                deadline = time.monotonic() + self.batch_wait
+                while len(self._queue) < self.batch_docs and not self._closed:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch = [self._queue.popleft() for _ in range(min(self.batch_docs, len(self._queue)))]
+                self._inflight += 1
+            chunk = [(str(k), text) for k, (_, _, text) in enumerate(batch)]
+            try:
+                fut = self._executor.submit(parse_chunk, chunk, None, self.doc_s, self.cache_path)
+            except Exception as e:  # Pool heruntergefahren / kaputt
+                self._done(batch, None, f"{type(e).__name__}: {e}")
+                continue
+            fut.add_done_callback(lambda f, batch=batch: self._done(batch, f))
+
+    def _done(self, batch, fut, err=None):
+        results = [([], err) for _ in batch]
+        if fut is not None:
+            try:
+                # parse_chunk: quelle "k" bzw. "k#2", "k#3", … für weitere Briefe im Dokument k
+                for source, row, e in fut.result():
+                    k = int(source.partition("#")[0])
+                    rows, first = results[k]
+                    if row is not None:
+                        rows.append([row.values[i] for i in SCHEMA.layout_index])
+                    results[k] = (rows, first or e)
+            except Exception as e:  # z.B. abgestürzter Worker-Prozess
+                results = [([], f"{type(e).__name__}: {e}") for _ in batch]
+        finished = []
+        with self._cond:
+            for (req, i, _), res in zip(batch, results):
+                req.results[i] = res
+                req.left -= 1
+                if not req.left:
+                    finished.append(req)
+            self._inflight -= 1
+            self._counts["batches"] += 1
+            self._counts["documents"] += len(batch)
+            self._counts["rows"] += sum(len(rows) for rows, _ in results)
+            self._counts["errors"] += sum(e is not None for _, e in results)
+            self._done_at.append((time.monotonic(), len(batch)))
+            self._cond.notify_all()
+        for req in finished:
+            req.done.set()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            while self._done_at and self._done_at[0][0] < now - RATE_WINDOW_S:
+                self._done_at.popleft()
+            recent = sum(n for _, n in self._done_at)
+            latency = sorted(self._latency)
+            counts, queued, inflight = dict(self._counts), len(self._queue), self._inflight
+        uptime = now - self._started
+        ms = lambda s: None if s is None else round(s * 1000, 1)
+        return {
+            **counts,
+            "uptime_s": round(uptime, 1),
+            "workers": self.workers,
+            "queue": {"depth": queued, "capacity": self.queue_docs, "batches_inflight": inflight},
+            "batch": {"max_docs": self.batch_docs,
+                      "mean_docs": round(counts["documents"] / counts["batches"], 1) if counts["batches"] else None},
+            "latency_ms": {"p50": ms(_percentile(latency, 0.5)), "p95": ms(_percentile(latency, 0.95)),
+                           "p99": ms(_percentile(latency, 0.99)), "max": ms(latency[-1] if latency else None),
+                           "window": len(latency)},
+            "throughput_docs_s": {"last_minute": round(recent / min(RATE_WINDOW_S, uptime or 1), 1),
+                                  "overall": round(counts["documents"] / (uptime or 1), 1)},
+        }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# ---------- HTTP ----------
+def _documents(body, content_type):
+    # text/plain: ein Dokument; JSON: {"text": "…"} oder {"documents": ["…", …]}
+    if not content_type.startswith("application/json") and not body.lstrip().startswith(b"{"):
+        return [body.decode("utf-8", errors="replace")]
+    usage = 'erwartet {"text": "…"} oder {"documents": ["…", …]}'
+    data = json.loads(body)
+    if not isinstance(data, dict):  # gültiges JSON, aber z.B. Liste oder Zahl
+        raise ValueError(usage)
+    docs = [data["text"]] if "text" in data else data.get("documents")
+    if not isinstance(docs, list) or not all(isinstance(d, str) for d in docs):
+        raise ValueError(usage)
+    return docs
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "EchoExtract/1"
+    quiet = True
+
+    def _send(self, status, payload, headers=()):
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/stats":
+            self._send(200, service.stats())
+        elif self.path == "/health":
+            self._send(200, {"ok": True})
+        elif self.path == "/columns":
+            self._send(200, {"columns": list(SCHEMA.layout_ids), "headers": list(SCHEMA.layout_headers)})
+        else:
+            self._send(404, {"error": "unbekannter Pfad"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path != "/extract":
+            return self._send(404, {"error": "unbekannter Pfad"})
+        size = int(self.headers.get("Content-Length") or 0)
+        if size > MAX_BODY:
+            return self._send(413, {"error": f"Anfrage größer als {MAX_BODY // 2**20} MB"})
+        try:
+            docs = _documents(self.rfile.read(size), self.headers.get("Content-Type", ""))
+        except (ValueError, KeyError) as e:
+            return self._send(400, {"error": str(e)})
+        if len(docs) > service.queue_docs:
+            return self._send(413, {"error": f"höchstens {service.queue_docs} Dokumente pro Anfrage"})
+        try:
+            results = service.extract(docs)
+        except TimeoutError as e:
+            return self._send(504, {"error": str(e)})
+        if results is None:
+            return self._send(429, {"error": "Warteschlange voll, bitte später erneut senden"},
+                              [("Retry-After", "1")])
+        self._send(200, {"columns": list(SCHEMA.layout_ids),
+                         "documents": [{"rows": rows, "error": err} for rows, err in results]})
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+def serve(service, port, quiet=True):
+    Handler.quiet = quiet
+    httpd = ThreadingHTTPServer((HOST, port), Handler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    return httpd
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Lokaler HTTP-Dienst für parse_report (nur 127.0.0.1).")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=None, help="Anzahl Worker-Prozesse (Standard: CPU-Kerne)")
+    ap.add_argument("--queue", type=int, default=QUEUE_DOCS, help="max. wartende Dokumente, darüber 429")
+    ap.add_argument("--batch", type=int, default=BATCH_DOCS, help="Dokumente pro Worker-Auftrag")
+    ap.add_argument("--batch-wait-ms", type=float, default=BATCH_WAIT_S * 1000,
+                    help="Wartezeit auf weitere Dokumente, bevor ein halber Batch startet")
+    ap.add_argument("--doc-budget-ms", type=float, help="Zeitlimit pro Dokument (Fehler wird mitgeliefert)")
+    ap.add_argument("--cache", metavar="DB", help="SQLite-Parse-Cache der Worker")
+    ap.add_argument("-v", "--verbose", action="store_true", help="jede Anfrage protokollieren")
+    args = ap.parse_args(argv)
+    service = ExtractionService(args.workers, args.queue, args.batch, args.batch_wait_ms / 1000,
+                                args.doc_budget_ms / 1000 if args.doc_budget_ms else None, args.cache).start()
+    httpd = serve(service, args.port, quiet=not args.verbose)
+    print(f"Extraktion auf http://{HOST}:{args.port} ({service.workers} Worker) – Strg+C beendet", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,480 @@
+# store.py
+# Persistenter Datensatz in SQLite – gleiche Schnittstelle wie dataset.Dataset
+# (upsert/upsert_many/row/columns/chunks/export/version), aber auf der Platte:
+# übersteht Neuladen und Neustart, wächst ohne Kopien und wird seitenweise gelesen.
+#
+# Eine Tabelle "rows": key (Upsert-Schlüssel, UNIQUE) + eine Spalte pro Schema-ID.
+# Indizes auf Nachname/Vorname/DOB und AufnahmeNr. upsert_many schreibt in einer
+# Transaktion pro Block; overwrite=False füllt wie bisher nur leere Zellen, overwrite=True
+# ersetzt gefüllte – leere Zellen eines Briefs löschen aber nie etwas (wie dedup).
+# Tabelle "links": Blocking-Schlüssel aus linkage.py -> rid, damit ein neuer Brief
+# seinen Patienten per Index findet (auch „Mueller“ statt „Müller“, ohne DOB).
+# Quellarchiv: "sources" hält jeden Brieftext einmal (SHA-256, zlib), "row_sources"
+# verknüpft Brief + Dokument-Nr mit seiner Zeile, samt damaligem Parse-Ergebnis und
+# Regelversion – Grundlage für die Neu-Extraktion nach Regeländerungen (reextract.py).
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+
+from dataset import row_key
+from derive import DERIVED, INPUTS, changed_rows, derive_columns, derive_row
+from export import export_bytes
+from frames import typed_frame
+from linkage import IDENT_COLS, LinkIndex, blocks, clusters, link_key, merge_values, pick
+from parse_cache import RULES_VERSION
+from schema import SCHEMA, Row
+
+BATCH_ROWS = 500
+
+def _q(cid):
+    return f'"{cid}"'
+
+def source_hash(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+# Briefe sind kurz und teilen viele Phrasen (Kopf, Befundvorlagen) – einzeln komprimiert
+# bringt zlib wenig. Ab ZDICT_LETTERS Briefen wird einmal ein Preset-Wörterbuch aus den
+# vorhandenen Texten gebaut (Tabelle zdicts); jeder Eintrag merkt sich, mit welchem er gepackt ist.
+ZDICT_LETTERS = 50
+ZDICT_BYTES = 32 * 1024
+
+def _compress(text, zdict=None):
+    data = text.encode("utf-8", "surrogatepass")
+    if zdict is None:
+        return zlib.compress(data, 9)
+    c = zlib.compressobj(9, zdict=zdict)
+    return c.compress(data) + c.flush()
+
+def _decompress(blob, zdict=None):
+    d = zlib.decompressobj(zdict=zdict) if zdict is not None else zlib.decompressobj()
+    return (d.decompress(blob) + d.flush()).decode("utf-8", "surrogatepass")
+
+def _pack(values):
+    return zlib.compress(json.dumps(values, separators=(",", ":")).encode("utf-8"))
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+class SqliteDataset:
+    def __init__(self, path):
+        self.path = path
+        self.ids = SCHEMA.ids
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (rid INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, "
+                         + ", ".join(_q(c) for c in self.ids) + ")")
+        self._db.execute('CREATE INDEX IF NOT EXISTS rows_patient ON rows("surname", "first_name", "dob")')
+        self._db.execute('CREATE INDEX IF NOT EXISTS rows_aufnahmenr ON rows("aufnahmenr")')
+        self._db.execute("CREATE TABLE IF NOT EXISTS links (block TEXT NOT NULL, rid INTEGER NOT NULL, "
+                         "PRIMARY KEY (block, rid)) WITHOUT ROWID")
+        self._db.execute("CREATE INDEX IF NOT EXISTS links_rid ON links(rid)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, hash TEXT NOT NULL UNIQUE, "
+                         "text BLOB NOT NULL, size INTEGER NOT NULL, zdict INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS zdicts (id INTEGER PRIMARY KEY, data BLOB NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS row_sources (hash TEXT NOT NULL, doc INTEGER NOT NULL, "
+                         "rid INTEGER NOT NULL, version TEXT NOT NULL, parsed BLOB NOT NULL, "
+                         "PRIMARY KEY (hash, doc, rid)) WITHOUT ROWID")
+        self._db.execute("CREATE INDEX IF NOT EXISTS row_sources_rid ON row_sources(rid)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS row_sources_version ON row_sources(version)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._add_missing_columns()
+        cols = ", ".join(_q(c) for c in self.ids)
+        marks = ", ".join("?" * (len(self.ids) + 1))
+        insert = f"INSERT INTO rows (key, {cols}) VALUES ({marks}) ON CONFLICT(key) DO UPDATE SET "
+        # overwrite wie merge_values: leere Zellen des neuen Briefs lassen den alten Wert stehen
+        self._sql_overwrite = insert + ", ".join(
+            f"{_q(c)}=CASE WHEN excluded.{_q(c)} IS NULL OR excluded.{_q(c)}='' THEN rows.{_q(c)} ELSE excluded.{_q(c)} END"
+            for c in self.ids)
+        self._sql_fill = insert + ", ".join(
+            f"{_q(c)}=CASE WHEN rows.{_q(c)} IS NULL OR rows.{_q(c)}='' THEN excluded.{_q(c)} ELSE rows.{_q(c)} END"
+            for c in self.ids)
+        self._select = f"SELECT key, {cols} FROM rows"
+        self._ident = ", ".join(_q(c) for c in IDENT_COLS)
+        self._writes = 0
+        self._zdicts = {}   # id -> Preset-Wörterbuch (gelesen bei Bedarf)
+        self._frame = None
+        self._exports = {}
+        if not self._db.execute("SELECT 1 FROM links LIMIT 1").fetchone():
+            # Datei von vor der Verknüpfung: Index einmal aufbauen
+            self._db.execute("BEGIN IMMEDIATE")
+            self._index_links("SELECT rid, " + self._ident + " FROM rows")
+            self._db.execute("COMMIT")
+
+    def _add_missing_columns(self):
+        # neue Schema-Spalten in einer bestehenden Datei nachziehen
+        have = {r[1] for r in self._db.execute("PRAGMA table_info(rows)")}
+        for cid in self.ids:
+            if cid not in have:
+                self._db.execute(f"ALTER TABLE rows ADD COLUMN {_q(cid)} DEFAULT ''")
+
+    @property
+    def version(self):
+        # eigene Schreibvorgänge + Commits anderer Verbindungen auf dieselbe Datei
+        with self._lock:
+            return self._writes, self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM rows WHERE key=?", (key,)).fetchone() is not None
+
+    @property
+    def keys(self):
+        with self._lock:
+            return [k for k, in self._db.execute("SELECT key FROM rows ORDER BY rid")]
+
+    # ---------- Schreiben ----------
+    def upsert(self, row, overwrite=False, key=None):
+        return self.upsert_many([row], overwrite, [key])[0]
+
+    def upsert_many(self, rows, overwrite=False, keys=None, batch=BATCH_ROWS):
+        # eine Transaktion pro Block
+        with self._lock:
+            out = self._upsert(rows, overwrite, keys, batch)
+            self._changed()
+        return out
+
+    def _upsert(self, rows, overwrite, keys, batch, tx=True):
+        # tx=False: Aufrufer hält schon eine Transaktion (upsert_letters), hier kein BEGIN/COMMIT
+        rows = list(rows)
+        keys = list(keys) if keys is not None else [None] * len(rows)
+        sql = self._sql_overwrite if overwrite else self._sql_fill
+        out, seen = [], set()
+        n = self.serial
+        for s in range(0, len(rows), batch):
+            params, pending = [], LinkIndex()  # pending: Schlüssel dieses Blocks (noch nicht in links)
+            for row, key in zip(rows[s:s + batch], keys[s:s + batch]):
+                # fortlaufende Ersatzschlüssel wie Dataset: row_{serial+1}
+                ident = [row[c] for c in IDENT_COLS]
+                if not key:
+                    key = row_key(row, n)
+                    if key not in seen and key not in self:
+                        key = pending.match(ident) or self._match(ident) or key
+                if key not in seen and key not in self:
+                    n += 1
+                seen.add(key)
+                pending.add(key, ident)
+                out.append(key)
+                params.append((key, *row.values))
+            touched = list(dict.fromkeys(p[0] for p in params))
+            if tx:
+                self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(sql, params)
+                self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('serial', ?)", (n,))
+                self._index_links(f"SELECT rid, {self._ident} FROM rows WHERE key IN "
+                                  f"({', '.join('?' * len(touched))})", touched)
+            except BaseException:
+                if tx:
+                    self._db.execute("ROLLBACK")
+                raise
+            if tx:
+                self._db.execute("COMMIT")
+        return out
+
+    @property
+    def serial(self):
+        # Zähler für row_key wie Dataset.serial, in Tabelle meta gespeichert (übersteht
+        # dedup und Neustart); ältere Dateien: Zeilenzahl bzw. höchstes vorhandenes row_N
+        with self._lock:
+            got = self._db.execute("SELECT value FROM meta WHERE name='serial'").fetchone()
+            if got:
+                return got[0]
+            count = self._db.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+            top = self._db.execute("SELECT MAX(CAST(substr(key, 5) AS INTEGER)) FROM rows "
+                                   "WHERE key GLOB 'row_[0-9]*'").fetchone()[0]
+            return max(count, top or 0)
+
+    def clear(self):
+        with self._lock:
+            for table in ("rows", "links", "row_sources", "sources", "meta"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._changed()
+
+    # ---------- Patientenabgleich ----------
+    def _match(self, ident):
+        # -> Schlüssel der Zeile desselben Patienten (linkage.pick) über den links-Index
+        k = link_key(ident)
+        bl = blocks(k)
+        if not bl:
+            return None
+        res = self._db.execute(f"SELECT key, {self._ident} FROM rows WHERE rid IN "
+                               f"(SELECT rid FROM links WHERE block IN ({', '.join('?' * len(bl))})) ORDER BY rid", bl)
+        return pick(k, ((key, link_key(ident)) for key, *ident in res))
+
+    def _index_links(self, select, params=()):
+        rows = self._db.execute(select, params).fetchall()
+        self._db.executemany("INSERT OR IGNORE INTO links (block, rid) VALUES (?, ?)",
+                             [(b, rid) for rid, *ident in rows for b in blocks(link_key(ident))])
+
+    def dedup(self, overwrite=False):
+        # Bulk-Dedup wie Dataset.dedup (erste Zeile bleibt) -> Anzahl entfernter Zeilen
+        cols = ", ".join(_q(c) for c in self.ids)
+        with self._lock:
+            res = self._db.execute(f"SELECT rid, {self._ident} FROM rows ORDER BY rid").fetchall()
+            groups = [[res[i][0] for i in g] for g in clusters([r[1:] for r in res], overwrite)]
+            if not groups:
+                return 0
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for rids in groups:
+                    marks = ", ".join("?" * len(rids))
+                    full = {rid: vals for rid, *vals in
+                            self._db.execute(f"SELECT rid, {cols} FROM rows WHERE rid IN ({marks})", rids)}
+                    values = full[rids[0]]
+                    for rid in rids[1:]:
+                        values = merge_values(values, full[rid], overwrite)
+                    derive_row(Row(values))
+                    self._db.execute(f"UPDATE rows SET {', '.join(f'{_q(c)}=?' for c in self.ids)} WHERE rid=?",
+                                     (*values, rids[0]))
+                    others = f"({', '.join('?' * (len(rids) - 1))})"
+                    self._db.execute("DELETE FROM rows WHERE rid IN " + others, rids[1:])
+                    self._db.execute("DELETE FROM links WHERE rid IN " + others, rids[1:])
+                    self._db.execute("UPDATE OR REPLACE row_sources SET rid=? WHERE rid IN " + others, rids)
+                    self._index_links(f"SELECT rid, {self._ident} FROM rows WHERE rid=?", (rids[0],))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self._changed()
+        return sum(len(g) - 1 for g in groups)
+
+    def rederive(self, **thresholds):
+        # abgeleitete Spalten mit neuen Grenzwerten neu berechnen (ein NumPy-Durchlauf,
+        # nur geänderte Zeilen werden geschrieben) -> Anzahl geänderter Zeilen
+        names = list(dict.fromkeys(INPUTS + DERIVED))
+        with self._lock:
+            res = self._db.execute(f"SELECT rid, {', '.join(_q(c) for c in names)} FROM rows").fetchall()
+            if not res:
+                return 0
+            cols = dict(zip(["rid", *names], map(list, zip(*res))))
+            new = derive_columns(cols, **thresholds)
+            params = [(*vals, rid) for rid, vals, changed in zip(cols["rid"], zip(*(new[c] for c in DERIVED)),
+                                                                 changed_rows(new, cols)) if changed]
+            if params:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._db.executemany(f"UPDATE rows SET {', '.join(f'{_q(c)}=?' for c in DERIVED)} WHERE rid=?",
+                                         params)
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+                self._changed()
+        return len(params)
+
+    # ---------- Quellarchiv ----------
+    def upsert_letters(self, letters, overwrite=False, version=RULES_VERSION):
+        # letters: [(brieftext, [Row])] wie ParseJob.take_letters -> Schlüssel wie upsert_many.
+        # Die Brieftexte kommen komprimiert ins Archiv und werden mit ihren Zeilen verknüpft –
+        # Zeilen und Archiv in einer Transaktion, sonst gäbe es nach einem Abbruch Zeilen
+        # ohne Quelle, die reextract.py nie wieder anfasst.
+        letters = list(letters)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                keys = self._upsert([r for _, rows in letters for r in rows], overwrite, None, BATCH_ROWS, tx=False)
+                uniq, rid = list(dict.fromkeys(keys)), {}
+                for s in range(0, len(uniq), BATCH_ROWS):
+                    part = uniq[s:s + BATCH_ROWS]
+                    rid.update(self._db.execute(f"SELECT key, rid FROM rows WHERE key IN "
+                                                f"({', '.join('?' * len(part))})", part))
+                zid = self._zdict_for([text for text, _ in letters])
+                zdict = self._zdicts.get(zid)
+                sources, links, it = {}, [], iter(keys)
+                for text, rows in letters:
+                    h = source_hash(text)
+                    sources[h] = (h, _compress(text, zdict), len(text), zid)
+                    links.extend((h, doc, rid[next(it)], version, _pack(row.values)) for doc, row in enumerate(rows))
+                self._db.executemany("INSERT OR IGNORE INTO sources (hash, text, size, zdict) VALUES (?, ?, ?, ?)",
+                                     list(sources.values()))
+                self._db.executemany("INSERT OR REPLACE INTO row_sources VALUES (?, ?, ?, ?, ?)", links)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self._changed()
+        return keys
+
+    def _zdict_for(self, texts):
+        # -> id des Wörterbuchs für neue Einträge (0 = ohne); legt es einmal an, sobald genug
+        # Briefe da sind. Die zuletzt angehängten Bytes nutzt zlib am liebsten -> Ende der Probe.
+        row = self._db.execute("SELECT id, data FROM zdicts ORDER BY id DESC LIMIT 1").fetchone()
+        if row is not None:
+            self._zdicts[row[0]] = row[1]
+            return row[0]
+        have = self._db.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        if have + len(texts) < ZDICT_LETTERS:
+            return 0
+        old = [_decompress(blob) for blob, in
+               self._db.execute("SELECT text FROM sources WHERE zdict=0 LIMIT ?", (ZDICT_LETTERS,))]
+        data = "\n".join(old + texts).encode("utf-8", "surrogatepass")[-ZDICT_BYTES:]
+        zid = self._db.execute("INSERT INTO zdicts (data) VALUES (?)", (data,)).lastrowid
+        self._zdicts[zid] = data
+        return zid
+
+    def _text(self, blob, zid):
+        if zid and zid not in self._zdicts:
+            self._zdicts[zid] = self._db.execute("SELECT data FROM zdicts WHERE id=?", (zid,)).fetchone()[0]
+        return _decompress(blob, self._zdicts.get(zid) if zid else None)
+
+    def letters_for(self, key):
+        # -> Brieftexte, aus denen die Zeile entstanden ist (in Archiv-Reihenfolge)
+        with self._lock:
+            res = self._db.execute("SELECT DISTINCT s.id, s.text, s.zdict FROM row_sources r JOIN sources s "
+                                   "ON s.hash = r.hash JOIN rows ON rows.rid = r.rid WHERE rows.key=? ORDER BY s.id",
+                                   (key,)).fetchall()
+            return [self._text(blob, zid) for _, blob, zid in res]
+
+    def archive_stats(self, version=RULES_VERSION):
+        # -> Briefe im Archiv, Zeichen, komprimierte Bytes, Briefe mit älterer Regelversion
+        with self._lock:
+            letters, chars, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length(text)), 0) FROM sources").fetchone()
+            stale = self._db.execute("SELECT COUNT(DISTINCT hash) FROM row_sources WHERE version != ?",
+                                     (version,)).fetchone()[0]
+        return {"letters": letters, "chars": chars, "bytes": stored, "stale": stale}
+
+    def stale_letters(self, version=RULES_VERSION, after=0, limit=64):
+        # -> [(id, hash, brieftext)] mit mindestens einer Verknüpfung aus älterer Regelversion,
+        # in Archiv-Reihenfolge ab id > after (Keyset, damit ein laufender Job weiterblättern kann)
+        with self._lock:
+            res = self._db.execute(
+                "SELECT id, hash, text, zdict FROM sources WHERE id > ? AND EXISTS (SELECT 1 FROM row_sources r "
+                "WHERE r.hash = sources.hash AND r.version != ?) ORDER BY id LIMIT ?",
+                (after, version, limit)).fetchall()
+            return [(i, h, self._text(blob, zid)) for i, h, blob, zid in res]
+
+    def apply_reparse(self, results, version=RULES_VERSION):
+        # results: {hash: [neue Wertelisten je Dokument]}. Zelle für Zelle gegen das damalige
+        # Ergebnis des Briefs: geänderte Werte werden geschrieben, wenn die Zelle noch den alten
+        # Wert hat oder leer ist; sonst (von Hand korrigiert / aus anderem Brief) übersprungen.
+        # -> {"changed": Counter je Spalte, "skipped": Counter je Spalte, "rows": n, "unmatched": n}
+        changed, skipped, unmatched = Counter(), Counter(), 0
+        if not results:
+            return {"changed": changed, "skipped": skipped, "rows": 0, "unmatched": 0}
+        cols = ", ".join(_q(c) for c in self.ids)
+        with self._lock:
+            hashes = list(results)
+            links = self._db.execute(f"SELECT hash, doc, rid, parsed FROM row_sources WHERE hash IN "
+                                     f"({', '.join('?' * len(hashes))}) AND version != ?", (*hashes, version)).fetchall()
+            rids = list({rid for _, _, rid, _ in links})
+            current = {rid: list(vals) for rid, *vals in self._db.execute(
+                f"SELECT rid, {cols} FROM rows WHERE rid IN ({', '.join('?' * len(rids))})", rids)}
+            touched, done = {}, []
+            for h, doc, rid, parsed in links:
+                new = results[h][doc] if doc < len(results[h]) else None
+                cur = current.get(rid)
+                if new is None or cur is None:
+                    # Brief zerfällt jetzt in weniger Dokumente: Zeile bleibt, gilt aber als geprüft
+                    unmatched += 1
+                    done.append((version, parsed, h, doc, rid))
+                    continue
+                for i, (old, n) in enumerate(zip(_unpack(parsed), new)):
+                    if old == n or cur[i] == n:
+                        continue
+                    if cur[i] == old or cur[i] in ("", None):
+                        cur[i] = n
+                        touched.setdefault(rid, set()).add(i)
+                        changed[self.ids[i]] += 1
+                    else:
+                        skipped[self.ids[i]] += 1
+                done.append((version, _pack(new), h, doc, rid))
+            ident = {SCHEMA.index[c] for c in IDENT_COLS}
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for rid, idx in touched.items():
+                    idx = sorted(idx)
+                    self._db.execute(f"UPDATE rows SET {', '.join(f'{_q(self.ids[i])}=?' for i in idx)} WHERE rid=?",
+                                     (*(current[rid][i] for i in idx), rid))
+                    if ident & set(idx):
+                        self._index_links(f"SELECT rid, {self._ident} FROM rows WHERE rid=?", (rid,))
+                self._db.executemany("UPDATE row_sources SET version=?, parsed=? WHERE hash=? AND doc=? AND rid=?",
+                                     done)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            if touched:
+                self._changed()
+        return {"changed": changed, "skipped": skipped, "rows": len(touched), "unmatched": unmatched}
+
+    def _changed(self):
+        self._writes += 1
+        self._frame = None
+        self._exports.clear()
+
+    # ---------- Lesen ----------
+    def row(self, key):
+        with self._lock:
+            r = self._db.execute(self._select + " WHERE key=?", (key,)).fetchone()
+        if r is None:
+            raise KeyError(key)
+        return dict(zip(self.ids, r[1:]))
+
+    def find(self, surname=None, first_name=None, dob=None, aufnahmenr=None):
+        # -> Schlüssel passender Zeilen (nutzt die Patienten-Indizes)
+        where = {"surname": surname, "first_name": first_name, "dob": dob, "aufnahmenr": aufnahmenr}
+        where = {c: v for c, v in where.items() if v not in (None, "")}
+        if not where:
+            return []
+        sql = "SELECT key FROM rows WHERE " + " AND ".join(f"{_q(c)}=?" for c in where) + " ORDER BY rid"
+        with self._lock:
+            return [k for k, in self._db.execute(sql, tuple(where.values()))]
+
+    def page(self, offset=0, limit=100):
+        # -> (schlüssel, {id: [werte…]}) für eine Tabellenseite
+        with self._lock:
+            res = self._db.execute(self._select + " ORDER BY rid LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return self._split(res)
+
+    def chunks(self, size):
+        # -> (schlüssel, {id: [werte…]}) in Blöcken zu size Zeilen (Keyset über rid statt OFFSET)
+        last = 0
+        while True:
+            with self._lock:
+                res = self._db.execute(f"SELECT rid, key, {', '.join(_q(c) for c in self.ids)} FROM rows "
+                                       "WHERE rid > ? ORDER BY rid LIMIT ?", (last, size)).fetchall()
+            if not res:
+                return
+            last = res[-1][0]
+            yield self._split([r[1:] for r in res])
+
+    def columns(self):
+        with self._lock:
+            return self._split(self._db.execute(self._select + " ORDER BY rid").fetchall())[1]
+
+    def _split(self, res):
+        keys = [r[0] for r in res]
+        cols = zip(*(r[1:] for r in res)) if res else [[] for _ in self.ids]
+        return keys, {cid: list(vals) for cid, vals in zip(self.ids, cols)}
+
+    def page_frame(self, offset=0, limit=100):
+        # typisiert wie Dataset.to_frame (frames.py)
+        return typed_frame(*self.page(offset, limit))
+
+    def to_frame(self):
+        # ganzer Datensatz – für große Dateien lieber page_frame()
+        version = self.version
+        if self._frame is None or self._frame[0] != version:
+            self._frame = (version, self.page_frame(0, -1))
+        return self._frame[1]
+
+    def export(self, fmt="csv"):
+        # Bytes für den Download; gecacht bis zur nächsten Änderung (auch durch andere Sitzungen)
+        version = self.version
+        hit = self._exports.get(fmt)
+        if hit is None or hit[0] != version:
+            hit = self._exports[fmt] = (version, export_bytes(self, fmt))
+        return hit[1]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,247 @@
+# study_import.py
+# Bestehendes Studienblatt (CSV/XLSX mit den Kopfzeilen aus schema.py) in einen
+# Datensatz übernehmen, damit neue Briefe dort weiter eingetragen werden statt in
+# eine leere Tabelle. Gelesen wird blockweise (csv.reader bzw. openpyxl read_only),
+# geschrieben per upsert_many – der Speicher bleibt unabhängig von der Dateigröße.
+# Mehrfach vorkommende Kopfzeilen ("date", "GFR", "LVEF", …) werden über ihre
+# Position zugeordnet: das k-te "GFR" im Blatt ist das k-te "GFR" im Schema.
+# Jede Blattzeile bleibt eine Zeile; der Patientenabgleich (linkage.py) wird dabei
+# aufgebaut, spätere Briefe landen also in der passenden bestehenden Zeile.
+#
+#   report = import_sheet(dataset, "studienblatt.xlsx")
+#   python study_import.py studienblatt.csv --dataset data/echo_dataset.db
+#   python study_import.py --check      # Export -> Import landet Zelle für Zelle in derselben Spalte
+import argparse
+import csv
+import datetime as dt
+import io
+import os
+import sys
+
+from dataset import ident_key
+from schema import DATE, FLAG, FLOAT, ORDINAL, SCHEMA
+
+CHUNK_ROWS = 2000
+DATE_FORMAT = "%d.%m.%Y"
+
+def _norm(header):
+    # Zeilenumbrüche / Leerraum / Groß-Klein wie in Excel oft verändert
+    return " ".join(str(header or "").split()).lower()
+
+def map_headers(headers):
+    # Kopfzeile des Blatts -> Spalten-ID je Position (None = unbekannt, z.B. "source").
+    # Blatt und SCHEMA.layout werden gemeinsam abgelaufen: jede Kopfzeile nimmt die nächste
+    # passende Schema-Spalte hinter der zuletzt zugeordneten (exakte Kopfzeile, normalisierte
+    # Kopfzeile oder Spalten-ID wie bei Parquet/bulk_extract). So bleibt ein doppeltes "GFR"
+    # oder "TR Vmax" in seinem Block, auch wenn im Blatt Spalten davor fehlen.
+    # Steht eine Kopfzeile außer der Reihe, wird sie nur zugeordnet, wenn sie eindeutig ist.
+    layout, taken, out, at = SCHEMA.layout, set(), [], 0
+    for h in headers:
+        h = "" if h is None else str(h)
+        if h in SCHEMA.index and h not in SCHEMA.layout_ids:  # interne Spalte, nur per ID
+            cid = h if h not in taken else None
+        else:
+            key = _norm(h)
+            hits = [j for j, c in enumerate(layout) if h and (c.header == h or _norm(c.header) == key or c.id == h)]
+            ahead = [j for j in hits if j >= at and layout[j].id not in taken]
+            if ahead:
+                at = ahead[0] + 1
+                cid = layout[ahead[0]].id
+            elif len(hits) == 1 and layout[hits[0]].id not in taken:
+                cid = layout[hits[0]].id
+            else:
+                cid = None
+        taken.add(cid)
+        out.append(cid)
+    return out
+
+def _number(s):
+    # "2,22" / "2.22" / "180" -> float, sonst None (z.B. "II-III", "n.a.")
+    try:
+        return float(s.replace(",", "."))
+    except ValueError:
+        return None
+
+def _cell(v, dtype):
+    # Zellwert als Zahl wie vom Parser: leer = "", Datum "TT.MM.JJJJ", "1"/1.0 in Flag/Grad -> 1,
+    # "2,22"/2 in Messwert -> 2.22/2.0; Text, der keine Zahl ist, bleibt Text
+    if v is None:
+        return ""
+    if isinstance(v, (dt.datetime, dt.date)):
+        return v.strftime(DATE_FORMAT)
+    if isinstance(v, str):
+        v = v.strip()
+        if not v or dtype not in (FLAG, ORDINAL, FLOAT):
+            return v
+        n = _number(v)
+        if n is None:
+            return v
+        v = n
+    if isinstance(v, float) and dtype in (FLAG, ORDINAL) and v.is_integer():
+        return int(v)
+    if isinstance(v, int) and dtype == FLOAT:
+        return float(v)
+    return v
+
+# ---------- Lesen ----------
+def _csv_records(source):
+    # source: Pfad oder Binärdatei (z.B. Streamlit-Upload); Semikolon-Export aus Excel erkennen
+    f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    try:
+        sample = text.read(64 * 1024)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(text, dialect)
+    finally:
+        text.detach()
+        if f is not source:
+            f.close()
+
+def _xlsx_records(source):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("XLSX-Import benötigt openpyxl (pip install openpyxl)")
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+READERS = {"csv": _csv_records, "xlsx": _xlsx_records}
+
+def sheet_format(name):
+    ext = os.path.splitext(str(name))[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return "xlsx"
+    if ext in (".csv", ".txt", ""):
+        return "csv"
+    raise ValueError(f"unbekanntes Format: {ext} (csv oder xlsx)")
+
+def iter_sheet(source, fmt=None, chunk_rows=CHUNK_ROWS):
+    # -> (kopfzeile, spalten-id je position, Blöcke [Row…]) ohne das ganze Blatt zu laden
+    records = READERS[fmt or sheet_format(getattr(source, "name", source))](source)
+    header = next(records, None)
+    if header is None:
+        raise ValueError("Blatt ist leer")
+    ids = map_headers(header)
+    if not any(ids):
+        raise ValueError("keine Kopfzeile des Studienblatts gefunden")
+    slots = [(pos, SCHEMA.index[cid], SCHEMA[cid].dtype) for pos, cid in enumerate(ids) if cid]
+
+    def chunks():
+        chunk = []
+        for rec in records:
+            if not any(v not in (None, "") for v in rec):
+                continue  # Leerzeilen (Excel formatiert gern tausende davon)
+            row = SCHEMA.new_row()
+            values = row.values
+            for pos, i, dtype in slots:
+                if pos < len(rec):
+                    values[i] = _cell(rec[pos], dtype)
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    return header, ids, chunks()
+
+# ---------- Übernehmen ----------
+def import_sheet(dataset, source, fmt=None, overwrite=False, chunk_rows=CHUNK_ROWS, progress=None):
+    # Blatt blockweise in dataset (Dataset / store.SqliteDataset) übernehmen.
+    # Jede Blattzeile bekommt einen eigenen Schlüssel (Nachname|Vorname|DOB, bei
+    # Wiederholung mit "#2", …); gibt es ihn im Datensatz schon, gilt die Upsert-Regel.
+    # Zeilen ohne Identifikatoren bekommen vom Datensatz den nächsten row_N (Zähler wie
+    # bei Briefen, nicht die Zeilenzahl – die sinkt nach einem dedup).
+    # progress(zeilen_bisher) nach jedem Block. -> {"rows", "columns", "unmapped"}
+    header, ids, chunks = iter_sheet(source, fmt, chunk_rows)
+    n, used = 0, {}
+    for chunk in chunks:
+        keys = []
+        for row in chunk:
+            key = ident_key(row)
+            if key is not None:
+                used[key] = used.get(key, 0) + 1
+                key = key if used[key] == 1 else f"{key}#{used[key]}"
+            keys.append(key)
+            n += 1
+        dataset.upsert_many(chunk, overwrite, keys)
+        if progress is not None:
+            progress(n)
+    unmapped = [str(h) for h, cid in zip(header, ids) if cid is None and h not in (None, "")]
+    return {"rows": n, "columns": sum(cid is not None for cid in ids), "unmapped": unmapped}
+
+# ---------- Prüfung ----------
+def _probe_row():
+    # eine Zeile mit je Spalte unterscheidbarem Wert passend zum Typ
+    row = SCHEMA.new_row()
+    for i, c in enumerate(SCHEMA.layout):
+        row[c.id] = {FLAG: i, ORDINAL: i, FLOAT: i + 0.5,
+                     DATE: f"{1 + i % 28:02d}.{1 + i % 12:02d}.{1900 + i}"}.get(c.dtype, f"t{i}")
+    return row
+
+def check(formats=("csv", "xlsx"), out=sys.stdout):
+    # Blatt im Layout des Studienblatts (183 Spalten, doppelte Kopfzeilen) exportieren und
+    # wieder importieren -> [(format, spalten-id, exportiert, importiert)] der Abweichungen
+    from dataset import Dataset
+    from export import WRITERS
+    failed = []
+    for fmt in formats:
+        src, dst = Dataset(), Dataset()
+        src.upsert(_probe_row())
+        buf = io.BytesIO()
+        try:
+            WRITERS[fmt](src, buf)
+        except RuntimeError as e:  # openpyxl fehlt
+            print(f"{fmt}: übersprungen ({e})", file=out)
+            continue
+        buf.seek(0)
+        import_sheet(dst, buf, fmt)
+        before, after = src.row(src.keys[0]), dst.row(dst.keys[0])
+        bad = [(fmt, cid, before[cid], after[cid]) for cid in SCHEMA.layout_ids if before[cid] != after[cid]]
+        failed.extend(bad)
+        print(f"{fmt}: {len(SCHEMA.layout_ids) - len(bad)}/{len(SCHEMA.layout_ids)} Spalten ok", file=out)
+        for _, cid, a, b in bad:
+            print(f"  {cid}: {a!r} -> {b!r}", file=out)
+    # Blätter ohne die erste von mehreren gleichen Kopfzeilen (z.B. nur das Follow-up-"GFR")
+    headers, ids = SCHEMA.layout_headers, SCHEMA.layout_ids
+    for h in dict.fromkeys(h for h in headers if headers.count(h) > 1):
+        drop = headers.index(h)
+        want = ids[:drop] + ids[drop + 1:]
+        got = map_headers(headers[:drop] + headers[drop + 1:])
+        if list(got) != list(want):
+            failed.extend(("header", w, w, g) for w, g in zip(want, got) if w != g)
+            print(f"ohne erstes {h!r}: falsch zugeordnet", file=out)
+    return failed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bestehendes Studienblatt (CSV/XLSX) in einen SQLite-Datensatz übernehmen.")
+    ap.add_argument("sheet", nargs="?", help="Studienblatt (.csv oder .xlsx)")
+    ap.add_argument("--dataset", help="SQLite-Datei des Datensatzes (wie in der App unter data/)")
+    ap.add_argument("--format", choices=list(READERS), help="Standard: aus Dateiendung")
+    ap.add_argument("--overwrite", action="store_true", help="vorhandene Zellen überschreiben (sonst nur leere füllen)")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--check", action="store_true", help="Export/Import-Rundreise im Studienblatt-Layout prüfen")
+    args = ap.parse_args(argv)
+    if args.check:
+        return 1 if check() else 0
+    if not args.sheet or not args.dataset:
+        ap.error("sheet und --dataset sind nötig (oder --check)")
+    from store import SqliteDataset
+    dataset = SqliteDataset(args.dataset)
+    report = import_sheet(dataset, args.sheet, args.format, args.overwrite, args.chunk_rows,
+                          progress=lambda n: print(f"\r{n} Zeilen", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    print(f"{report['rows']} Zeilen, {report['columns']} Spalten übernommen", file=sys.stderr)
+    if report["unmapped"]:
+        print("nicht zugeordnet: " + ", ".join(repr(h) for h in report["unmapped"]), file=sys.stderr)
+    dataset.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
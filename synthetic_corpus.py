@@ -0,0 +1,435 @@
+# synthetic_corpus.py
+# Synthetische Arztbriefe (Echo / Stressecho / HKU / CT / MRT / Follow-up) mit
+# Soll-Werten je Spalten-ID (schema.py) – Testdaten für benchmark.py.
+#
+#   python synthetic_corpus.py -n 1000 -o corpus.jsonl
+#   python synthetic_corpus.py -n 200 --mix stress=0.8 cath=0.6 --noise 0.3 --txt-dir briefe/
+#
+# Jede Zeile der JSONL-Datei: {"id": …, "text": …, "truth": {spalten_id: wert}}.
+# truth enthält alle Spalten aus LABELED; "" heißt „darf nicht befüllt sein“.
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+# Abschnitts-Anteile (Wahrscheinlichkeit pro Brief)
+MIX = {"medication": 0.9, "labs": 0.8, "echo": 0.95, "stress": 0.4, "cath": 0.35,
+       "ct": 0.15, "mrt": 0.1, "followup": 0.3}
+# Zahlenformat: Dezimalkomma, römische Grade, NYHA-Spannen („II-III“)
+FORMAT = {"comma": 0.8, "roman": 0.7, "nyha_range": 0.3}
+
+LABELED = [
+    "surname", "first_name", "dob", "aufnahmenr", "sex", "size", "weight", "kof",
+    "hypertension", "diabetes", "dyslipidemia", "lung_disease", "hf_diagnosis", "af", "pm", "icm",
+    "prior_mi", "prior_pci", "prior_cabg", "valve_intervention", "nyha", "smoking",
+    "apt", "oak", "raasi", "arni", "betablocker", "mra", "sglt2", "diuretics", "statin",
+    "labs_bl", "labs_bl_gfr", "labs_bl_ldl", "labs_bl_hb", "labs_bl_ntprobnp",
+    "labs_fu", "labs_fu_date", "labs_fu_gfr", "labs_fu_ldl", "labs_fu_hb", "labs_fu_ntprobnp",
+    "echo_bl_date", "echo_bl_rhythm", "echo_bl_lvef", "echo_bl_lvedv", "echo_bl_lvesv", "echo_bl_tapse",
+    "echo_bl_lavi", "echo_bl_mr", "echo_bl_tr", "echo_bl_ea", "echo_bl_ee", "echo_bl_e_reduced",
+    "echo_bl_trvmax", "echo_bl_trvmax_high", "echo_bl_as", "echo_bl_as_pmean", "echo_bl_as_koef", "echo_bl_ai",
+    "wm_rest", "wm_rest_anterior", "wm_rest_anterolateral", "wm_rest_anteroseptal", "wm_rest_inferior",
+    "wm_rest_inferolateral", "wm_rest_inferoseptal", "wm_rest_global_hypo",
+    "se", "se_date", "se_dobutamine", "se_dobutamine_dose", "se_hr_max", "se_hr_target_reached",
+    "se_rr_sys_rest", "se_rr_dia_rest", "se_rr_sys_max", "se_rr_dia_max", "se_watt",
+    "se_dyspnea", "se_ap", "se_ended_early", "wm_stress",
+    "ct", "ct_date", "ct_sten_lad", "ct_sten_lcx", "ct_sten_lm", "ct_sten_rca",
+    "mrt", "mrt_date",
+    "cath", "cath_date", "cath_sten_lad", "cath_sten_lcx", "cath_sten_lm", "cath_sten_rca",
+    "cath_revasc", "cath_bypass", "cath_pci_lad", "cath_pci_lcx", "cath_pci_lm", "cath_pci_rca",
+    "fu", "fu_date", "echo_fu", "echo_fu_date", "echo_fu_lvef",
+]
+
+SURNAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz",
+            "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Schröder", "Neumann", "Schwarz", "Zimmermann",
+            "Braun", "Krüger", "Hofmann", "Hartmann", "Lange", "Werner", "Krause", "Lehmann", "Köhler"]
+FEMALE = ["Erika", "Ursula", "Monika", "Renate", "Helga", "Gisela", "Ingrid", "Petra", "Sabine", "Brigitte"]
+MALE = ["Hans", "Peter", "Klaus", "Wolfgang", "Jürgen", "Dieter", "Manfred", "Horst", "Werner", "Günter"]
+
+# klasse -> [(wirkstoff/handelsname, dosis)]
+DRUGS = {
+    "ass": [("ASS", "100 mg 1-0-0"), ("Aspirin", "100 mg 1-0-0")],
+    "p2y12": [("Clopidogrel", "75 mg 1-0-0"), ("Ticagrelor", "90 mg 1-0-1"), ("Prasugrel", "10 mg 1-0-0")],
+    "oak": [("Apixaban", "5 mg 1-0-1"), ("Eliquis", "2,5 mg 1-0-1"), ("Rivaroxaban", "20 mg 1-0-0"),
+            ("Xarelto", "15 mg 1-0-0"), ("Edoxaban", "60 mg 1-0-0"), ("Phenprocoumon", "nach INR")],
+    "raasi": [("Ramipril", "5 mg 1-0-0"), ("Candesartan", "8 mg 1-0-0"), ("Valsartan", "80 mg 1-0-1")],
+    "arni": [("Sacubitril/Valsartan", "49/51 mg 1-0-1"), ("Entresto", "24/26 mg 1-0-1")],
+    "betablocker": [("Bisoprolol", "5 mg 1-0-0"), ("Metoprolol", "47,5 mg 1-0-1"), ("Nebivolol", "5 mg 1-0-0")],
+    "mra": [("Spironolacton", "25 mg 1-0-0"), ("Eplerenon", "25 mg 1-0-0")],
+    "sglt2": [("Dapagliflozin", "10 mg 1-0-0"), ("Empagliflozin", "10 mg 1-0-0"), ("Jardiance", "10 mg 1-0-0")],
+    "diuretics": [("Torasemid", "10 mg 1-0-0"), ("Furosemid", "40 mg 1-0-0"), ("HCT", "12,5 mg 1-0-0")],
+    "statin": [("Atorvastatin", "40 mg 0-0-1"), ("Rosuvastatin", "10 mg 0-0-1"), ("Simvastatin", "20 mg 0-0-1")],
+}
+OTHER_DRUGS = [("Pantoprazol", "40 mg 1-0-0"), ("Metformin", "1000 mg 1-0-1"), ("L-Thyroxin", "75 µg 1-0-0"),
+               ("Allopurinol", "100 mg 1-0-0")]
+SEGMENTS = ["anterior", "anterolateral", "anteroseptal", "inferior", "inferolateral", "inferoseptal"]
+VESSELS = {"lad": ["LAD", "LAD"], "lcx": ["LCX", "RCX"], "lm": ["LM", "LM"], "rca": ["RCA", "RCA"]}
+ROMAN = {0: "0", 1: "I", 2: "II", 3: "III", 4: "IV"}
+FILLER = [
+    "Der weitere stationäre Verlauf gestaltete sich komplikationslos.",
+    "Die Entlassung erfolgte in gebessertem Allgemeinzustand.",
+    "Wir bedanken uns für die freundliche Zuweisung.",
+    "Bei Rückfragen stehen wir gerne zur Verfügung.",
+]
+
+class _Letter:
+    def __init__(self, rng, fmt):
+        self.rng = rng
+        self.fmt = fmt
+        self.parts = []
+        self.truth = dict.fromkeys(LABELED, "")
+
+    def p(self, prob):
+        return self.rng.random() < prob
+
+    def dec(self, v, nd=1):
+        s = f"{v:.{nd}f}"
+        return s.replace(".", ",") if self.p(self.fmt["comma"]) else s
+
+    def grade(self, g):
+        return ROMAN[g] if self.p(self.fmt["roman"]) else str(g)
+
+def _d(d):
+    return d.strftime("%d.%m.%Y")
+
+def _header(L, admit):
+    rng, t = L.rng, L.truth
+    female = L.p(0.45)
+    t["surname"] = rng.choice(SURNAMES)
+    t["first_name"] = rng.choice(FEMALE if female else MALE)
+    t["sex"] = 1 if female else 0
+    dob = date(rng.randint(1930, 1975), rng.randint(1, 12), rng.randint(1, 28))
+    t["dob"] = _d(dob)
+    t["aufnahmenr"] = str(rng.randint(100000, 999999))
+    L.parts.append(f"{t['surname']}, {t['first_name']} geb. {t['dob']} AufnahmeNr.: {t['aufnahmenr']}")
+    who = "die o.g. Patientin, die" if female else "den o.g. Patient, der"
+    L.parts.append(f"Sehr geehrte Kollegen, wir berichten über {who} sich vom {_d(admit)} bis "
+                   f"{_d(admit + timedelta(days=rng.randint(2, 9)))} in stationärer Behandlung befand.")
+
+def _history(L):
+    rng, t = L.rng, L.truth
+    dx = []
+    icm = rng.choice([0, 0, 1, 2, 3])
+    t["icm"] = icm
+    if icm:
+        dx.append(rng.choice([f"KHK, {icm}-Gefäßerkrankung", f"KHK: {icm}-GE"]))
+        t["prior_pci"] = int(L.p(0.4))
+        t["prior_cabg"] = int(L.p(0.1))
+        if t["prior_pci"]:
+            dx.append(f"Z.n. PCI mit DES-Implantation RIVA {rng.randint(2010, 2022)}")
+        if t["prior_cabg"]:
+            dx.append(f"Z.n. ACVB-Operation {rng.randint(2000, 2020)}")
+    else:
+        t["prior_pci"] = t["prior_cabg"] = 0
+    t["prior_mi"] = int(L.p(0.2))
+    if t["prior_mi"]:
+        dx.append(f"Z.n. {rng.choice(['NSTEMI', 'STEMI', 'Myokardinfarkt'])} {rng.randint(2005, 2022)}")
+    cvrf = []
+    for col, prob, text in (("hypertension", 0.7, "Arterielle Hypertonie"),
+                            ("diabetes", 0.35, "Diabetes mellitus Typ 2"),
+                            ("dyslipidemia", 0.5, "Hyperlipidämie")):
+        t[col] = int(L.p(prob))
+        if t[col]:
+            cvrf.append(text)
+    if cvrf:
+        dx.append(", ".join(cvrf))
+    t["af"] = rng.choice([0, 0, 0, 1, 2, 3])
+    if t["af"]:
+        dx.append({1: "Paroxysmales", 2: "Persistierendes", 3: "Permanentes"}[t["af"]]
+                  + f" Vorhofflimmern, CHA2DS2-VASc {rng.randint(1, 6)}")
+    t["hf_diagnosis"] = int(L.p(0.4))
+    if t["hf_diagnosis"]:
+        lo = rng.randint(1, 3)
+        if L.p(L.fmt["nyha_range"]):
+            nyha, t["nyha"] = f"NYHA {ROMAN[lo]}-{ROMAN[lo + 1]}", lo + 0.5
+        else:
+            nyha, t["nyha"] = f"NYHA {ROMAN[lo]}", lo
+        dx.append(f"Herzinsuffizienz mit {rng.choice(['HFrEF', 'HFmrEF', 'HFpEF'])}, {nyha}")
+    t["pm"] = rng.choice([0] * 8 + [1, 2, 3, 4])
+    if t["pm"]:
+        dx.append({1: "VVI-Schrittmacher", 2: "DDD-Schrittmacher", 3: "CRT-D-Implantation",
+                   4: "ICD-Implantation"}[t["pm"]] + f" {rng.randint(2010, 2022)}")
+    t["smoking"] = rng.choice(["", 0, 1, 2])
+    if t["smoking"] != "":
+        dx.append({0: "Nichtraucher", 1: "Ex-Raucher", 2: f"Nikotinabusus ({rng.randint(10, 60)} py)"}[t["smoking"]])
+    t["lung_disease"] = int(L.p(0.15))
+    if t["lung_disease"]:
+        dx.append(rng.choice(["COPD GOLD II", "Asthma bronchiale"]))
+    t["valve_intervention"] = int(L.p(0.08))
+    if t["valve_intervention"]:
+        dx.append(f"Z.n. TAVI {rng.randint(2015, 2022)} (Edwards Sapien 26 mm Valve)")
+    rng.shuffle(dx)
+    L.parts.append("Diagnosen:\n" + "\n".join("- " + d for d in dx))
+    h, w = rng.randint(150, 195), rng.randint(50, 120)
+    t["size"], t["weight"] = h, w
+    t["kof"] = round(((h * w) / 3600.0) ** 0.5, 2)
+    L.parts.append(f"Größe {h} cm, Gewicht {w} kg")
+
+def _medication(L, section):
+    rng, t = L.rng, L.truth
+    # Liste in DRUGS-Reihenfolge, kein set: sonst hinge der Korpus bei gleichem --seed von PYTHONHASHSEED ab
+    classes = [c for c in DRUGS if L.p(0.35)] if section else []
+    if t["af"] and section and L.p(0.8) and "oak" not in classes:
+        classes.append("oak")
+    for col in ("oak", "raasi", "arni", "betablocker", "mra", "sglt2", "diuretics", "statin"):
+        t[col] = int(col in classes)
+    has_ass, has_p2y = "ass" in classes, "p2y12" in classes
+    t["apt"] = 3 if has_ass and has_p2y else 1 if has_ass else 2 if has_p2y else 0
+    if not section:
+        return
+    lines = [rng.choice(DRUGS[c]) for c in classes] + rng.sample(OTHER_DRUGS, rng.randint(0, 2))
+    rng.shuffle(lines)
+    L.parts.append(rng.choice(["Medikation:", "Entlassmedikation:", "Aktuelle Medikation:"]) + "\n"
+                   + "\n".join(f"{n} {d}" for n, d in lines))
+
+def _labs(L, prefix, when=None):
+    rng, t = L.rng, L.truth
+    t[prefix] = 1
+    gfr, ldl, hb, bnp = rng.randint(25, 110), rng.randint(50, 190), rng.uniform(9.0, 16.5), rng.randint(80, 9000)
+    t[prefix + "_gfr"], t[prefix + "_ldl"] = gfr, ldl
+    t[prefix + "_hb"], t[prefix + "_ntprobnp"] = round(hb, 1), bnp
+    head = f"Labor vom {_d(when)}:" if when else "Labor:"
+    L.parts.append(f"{head}\nGFR/CKD-EPI: {gfr} ml/min\nLDL-Cholesterin: {ldl} mg/dl\n"
+                   f"Hämoglobin: {L.dec(hb)} g/dl\nNT-pro-BNP: {bnp} pg/ml")
+
+def _valve(L, short, col, max_grade):
+    # „MI Grad II“, „TI I°“, „AI 1“ bzw. „keine MI“
+    g = L.rng.choice([0] * 3 + list(range(1, max_grade + 1)))
+    L.truth[col] = g
+    if g == 0:
+        return f"keine {short}"
+    style = L.rng.randint(0, 2)
+    if style == 0:
+        return f"{short} Grad {L.grade(g)}"
+    return f"{short} {L.grade(g)}°" if style == 1 else f"{short} {g}"
+
+def _echo(L, when):
+    rng, t = L.rng, L.truth
+    t["echo_bl_date"] = _d(when)
+    s = []
+    rhythm = 1 if t["af"] in (2, 3) and L.p(0.7) else 2 if t["pm"] and L.p(0.5) else 0
+    t["echo_bl_rhythm"] = rhythm
+    s.append(["Sinusrhythmus.", "Vorhofflimmern.", "Schrittmacherrhythmus."][rhythm])
+    ef = rng.randint(20, 70)
+    edv = rng.randint(80, 240)
+    esv = int(edv * (100 - ef) / 100)
+    t.update(echo_bl_lvef=ef, echo_bl_lvedv=edv, echo_bl_lvesv=esv)
+    s.append(f"LV {rng.choice(['normal dimensioniert', 'dilatiert'])}, EF biplan {ef} %, LVEDV {edv} ml, LVESV {esv} ml.")
+    roll = rng.random()
+    if roll < 0.25:
+        sev, word = rng.choice([("1", "Hypokinesie"), ("2", "Akinesie"), ("3", "Dyskinesie")])
+        segs = rng.sample(SEGMENTS, rng.randint(1, 3))
+        for seg in SEGMENTS:
+            t["wm_rest_" + seg] = sev if seg in segs else "0"
+        t["wm_rest"], t["wm_rest_global_hypo"] = 1, 0
+        s.append(f"{word} " + " und ".join(segs) + ".")
+    elif roll < 0.32:
+        for seg in SEGMENTS:
+            t["wm_rest_" + seg] = "0"
+        t["wm_rest"], t["wm_rest_global_hypo"] = 1, 1
+        s.append("Globale Hypokinesie.")
+    else:
+        for seg in SEGMENTS:
+            t["wm_rest_" + seg] = "0"
+        t["wm_rest"], t["wm_rest_global_hypo"] = 0, 0
+        s.append("Keine regionalen Wandbewegungsstörungen.")
+    tapse, lavi = rng.randint(10, 28), rng.randint(20, 70)
+    t.update(echo_bl_tapse=tapse, echo_bl_lavi=lavi)
+    s.append(f"TAPSE {tapse} mm. " + rng.choice([f"LAESVI {lavi} ml/m².", f"LA-Index {lavi} ml/m²."]))
+    ea, ee = rng.uniform(0.5, 2.2), rng.uniform(5, 25)
+    t.update(echo_bl_ea=round(ea, 1), echo_bl_ee=round(ee, 1), echo_bl_e_reduced=int(round(ee, 1) >= 14))
+    s.append(f"E/A {L.dec(ea)}, E/e' {L.dec(ee)}.")
+    vmax = rng.uniform(1.8, 4.0)
+    t["echo_bl_trvmax"], t["echo_bl_trvmax_high"] = round(vmax, 1), int(round(vmax, 1) >= 2.8)
+    s.append(f"TR Vmax {L.dec(vmax)} m/s.")
+    s.append(", ".join([_valve(L, "MI", "echo_bl_mr", 3), _valve(L, "TI", "echo_bl_tr", 3),
+                        _valve(L, "AI", "echo_bl_ai", 2)]) + ".")
+    if L.p(0.2):
+        pmean, koef = rng.randint(10, 60), rng.uniform(0.6, 1.9)
+        t.update(echo_bl_as_pmean=pmean, echo_bl_as_koef=round(koef, 1))
+        t["echo_bl_as"] = 3 if pmean >= 40 or round(koef, 1) < 1.0 else 2 if pmean >= 20 or round(koef, 1) < 1.5 else 1
+        s.append(f"Aortenklappenstenose: Pmean {pmean} mmHg, KÖF {L.dec(koef)} cm².")
+    else:
+        t["echo_bl_as"] = 0
+        s.append("Keine AS.")
+    L.parts.append(f"Befund Echokardiographie vom {_d(when)}:\n" + " ".join(s))
+
+def _stress(L, when):
+    rng, t = L.rng, L.truth
+    t.update(se=1, se_date=_d(when))
+    dobut = L.p(0.7)
+    t["se_dobutamine"] = int(dobut)
+    s = []
+    sys_r, dia_r = rng.randint(110, 160), rng.randint(60, 95)
+    sys_m, dia_m = sys_r + rng.randint(10, 50), dia_r + rng.randint(0, 15)
+    t.update(se_rr_sys_rest=sys_r, se_rr_dia_rest=dia_r, se_rr_sys_max=sys_m, se_rr_dia_max=dia_m)
+    s.append(f"Ausgangs-RR: {sys_r}/{dia_r}.")
+    if dobut:
+        dose = rng.choice([20, 30, 40])
+        t["se_dobutamine_dose"] = dose
+        s.append(f"Steigerung bis {dose} ug/kg/min über je 3 min.")
+    else:
+        watt = rng.choice([50, 75, 100, 125, 150])
+        t["se_watt"] = watt
+        s.append(f"Fahrradergometrie bis {watt} Watt.")
+    hr = rng.randint(100, 165)
+    t["se_hr_max"] = hr
+    reached = L.p(0.7)
+    t["se_hr_target_reached"] = int(reached)
+    s.append(f"Bei Abbruch {hr}/min, Zielfrequenz {'erreicht' if reached else 'nicht erreicht'}.")
+    s.append(f"RR-Verhalten maximal {sys_m}/{dia_m} mmHg.")
+    t["se_dyspnea"], t["se_ap"] = int(L.p(0.3)), int(L.p(0.15))
+    s.append(("Leichte Dyspnoe" if t["se_dyspnea"] else "Keine Dyspnoe") + ", "
+             + ("pektanginöse Beschwerden (Angina pectoris)." if t["se_ap"] else "kein Thoraxdruck."))
+    ended = rng.choice([0, 0, 1, 2, 3, 4])
+    t["se_ended_early"] = ended
+    s.append(["Kein vorzeitiger Abbruch.", "Abbruchgrund: Dyspnoe.", "Abbruchgrund: AP.",
+              "Abbruchgrund: muskuläre Erschöpfung.", "Abbruchgrund: hypertensive Entgleisung."][ended])
+    if L.p(0.3):
+        t["wm_stress"] = 1
+        s.append(f"Unter {'Dobutamin' if dobut else 'Belastung'} neue Hypokinesie {rng.choice(SEGMENTS)}, V.a. Ischämie.")
+    else:
+        t["wm_stress"] = 0
+        s.append("Keine neuen Wandbewegungsstörungen.")
+    kind = "Dobutamin" if dobut else "Ergometrie"
+    L.parts.append(f"Stressechokardiographie vom {_d(when)} ({kind}):\n" + " ".join(s))
+
+def _vessel_findings(L, prefix, kw):
+    rng, t, s, sten = L.rng, L.truth, [], []
+    for v, names in VESSELS.items():
+        hit = L.p(0.1 if v == "lm" else 0.35)
+        t[f"{prefix}_sten_{v}"] = int(hit)
+        if hit:
+            sten.append(v)
+            name = rng.choice(names)
+            s.append(rng.choice([f"{name} {rng.randint(60, 95)} % Stenose", f"{name} {kw}"]))
+    if not sten:
+        s.append("Keine relevanten Koronarstenosen")
+    return s, sten
+
+def _cath(L, when):
+    rng, t = L.rng, L.truth
+    t.update(cath=1, cath_date=_d(when))
+    s, sten = _vessel_findings(L, "cath", "signifikant stenosiert")
+    treated = [v for v in sten if L.p(0.6)]
+    for v in VESSELS:
+        t[f"cath_pci_{v}"] = int(v in treated)
+    t["cath_bypass"] = int(len(sten) >= 3 and not treated and L.p(0.5))
+    t["cath_revasc"] = int(bool(treated) or t["cath_bypass"])
+    text = ", ".join(s) + "."
+    if treated:
+        text += " " + " ".join(f"PCI der {VESSELS[v][0]} mit DES." for v in treated)
+    if t["cath_bypass"]:
+        text += " Empfehlung zur Bypass-Operation."
+    head = rng.choice(["Koronarangiographie", "Herzkatheteruntersuchung", "HKU"])
+    L.parts.append(f"{head} vom {_d(when)}: {text}")
+
+def _ct(L, when):
+    t = L.truth
+    t.update(ct=1, ct_date=_d(when))
+    s, _ = _vessel_findings(L, "ct", "mit hochgradiger Stenose")
+    L.parts.append(f"Koronar-CT vom {_d(when)}: " + ", ".join(s) + ".")
+
+def _mrt(L, when):
+    L.truth.update(mrt=1, mrt_date=_d(when))
+    L.parts.append(f"Kardio-MRT vom {_d(when)}: " + L.rng.choice(
+        ["Kein Perfusionsdefizit.", "Perfusionsdefizit inferior.", "Late Enhancement anteroseptal."]))
+
+def _followup(L, when, with_echo, with_labs):
+    rng, t = L.rng, L.truth
+    t.update(fu=1, fu_date=_d(when))
+    L.parts.append(f"Verlaufskontrolle vom {_d(when)}:\nKlinisch stabiler Verlauf.")
+    if with_labs:
+        t["labs_fu_date"] = _d(when)
+        _labs(L, "labs_fu", when)
+    if with_echo:
+        ef = rng.randint(20, 70)
+        t.update(echo_fu=1, echo_fu_date=_d(when), echo_fu_lvef=ef)
+        L.parts.append(f"Befund Echokardiographie vom {_d(when)}:\nEF biplan {ef} %.")
+
+def _noise(L, level):
+    rng = L.rng
+    if not level:
+        return
+    for _ in range(rng.randint(0, int(4 * level) + 1)):
+        L.parts.insert(rng.randint(2, len(L.parts)), rng.choice(FILLER))
+    if rng.random() < level / 2:
+        # wiederholter Seitenkopf mitten im Brief
+        t = L.truth
+        L.parts.insert(rng.randint(3, len(L.parts)), f"{t['surname']}, {t['first_name']} geb. {t['dob']}")
+
+def letter(rng, mix=MIX, fmt=FORMAT, noise=0.1):
+    # -> (text, truth)
+    L = _Letter(rng, fmt)
+    admit = date(rng.randint(2018, 2024), rng.randint(1, 12), rng.randint(1, 28))
+    _header(L, admit)
+    _history(L)
+    _medication(L, L.p(mix["medication"]))
+    if L.p(mix["labs"]):
+        _labs(L, "labs_bl")
+    day = admit + timedelta(days=1)
+    if L.p(mix["echo"]):
+        _echo(L, day)
+    for key, fn in (("stress", _stress), ("cath", _cath), ("ct", _ct), ("mrt", _mrt)):
+        if L.p(mix[key]):
+            day += timedelta(days=1)
+            fn(L, day)
+    if L.p(mix["followup"]):
+        _followup(L, admit + timedelta(days=rng.randint(90, 400)),
+                  with_echo=bool(L.truth["echo_bl_date"]) and L.p(0.6),
+                  with_labs=L.truth["labs_bl"] == 1 and L.p(0.5))
+    _noise(L, noise)
+    sep = "\n\n" if not rng.random() < noise / 2 else "\n\n\n"
+    text = sep.join(L.parts) + "\n"
+    if rng.random() < noise / 4:
+        text = text.replace("\n", "\r\n")  # Windows-Export
+    return text, L.truth
+
+def generate(n, seed=0, mix=MIX, fmt=FORMAT, noise=0.1):
+    rng = random.Random(seed)
+    for i in range(n):
+        text, truth = letter(rng, mix, fmt, noise)
+        yield {"id": f"syn-{seed}-{i:06d}", "text": text, "truth": truth}
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _kv(items, defaults):
+    out = dict(defaults)
+    for it in items or ():
+        k, _, v = it.partition("=")
+        if k not in out:
+            raise SystemExit(f"unbekannter Schlüssel: {k} (erlaubt: {', '.join(out)})")
+        out[k] = float(v)
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Synthetische Arztbriefe mit Soll-Werten erzeugen.")
+    ap.add_argument("-n", type=int, default=500, help="Anzahl Briefe")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--output", help="JSONL-Datei (Standard: stdout)")
+    ap.add_argument("--txt-dir", help="Briefe zusätzlich als .txt-Dateien ablegen (für bulk_extract)")
+    ap.add_argument("--mix", nargs="*", metavar="ABSCHNITT=P", help=f"Abschnitts-Anteile, Standard {MIX}")
+    ap.add_argument("--format", nargs="*", metavar="OPTION=P", help=f"Zahlenformat-Anteile, Standard {FORMAT}")
+    ap.add_argument("--noise", type=float, default=0.1, help="0 = sauber … 1 = viel Rauschen")
+    args = ap.parse_args(argv)
+    mix, fmt = _kv(args.mix, MIX), _kv(args.format, FORMAT)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    if args.txt_dir:
+        os.makedirs(args.txt_dir, exist_ok=True)
+    try:
+        for doc in generate(args.n, args.seed, mix, fmt, args.noise):
+            out.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            if args.txt_dir:
+                with open(os.path.join(args.txt_dir, doc["id"] + ".txt"), "w", encoding="utf-8") as f:
+                    f.write(doc["text"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())